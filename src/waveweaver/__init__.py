@@ -12,4 +12,15 @@ __description__ = "Audio stem separation application powered by Demucs AI"
 # se a vida
 # não é programada
 # e as melhores coisas
-# não tem lógica?
\ No newline at end of file
+# não tem lógica?
+
+
+__all__ = ['separate', 'separate_async', 'SeparatedAudio']
+
+
+def __getattr__(name):
+    """Import the separation API on first use, keeping ``import waveweaver`` light."""
+    if name in __all__:
+        from .core import api
+        return getattr(api, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
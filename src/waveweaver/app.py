@@ -5,16 +5,17 @@ Application bootstrap and main entry point.
 import sys
 import os
 from pathlib import Path
-from PySide6.QtWidgets import QApplication
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QIcon
 
-from .gui.main_window import MainWindow
-from .config.settings import Settings
+from .config.settings import ConfigError
+from .cli import COMMANDS, load_settings, main as cli_main
 
 
 def setup_application():
     """Configure QApplication with proper settings."""
+    from PySide6.QtWidgets import QApplication
+    from PySide6.QtCore import Qt
+    from PySide6.QtGui import QIcon
+
     app = QApplication(sys.argv)
     
     # Enable high DPI scaling
@@ -39,9 +40,23 @@ def setup_application():
 
 def main():
     """Main application entry point."""
+    # Config options may come before the subcommand
+    if any(arg in COMMANDS for arg in sys.argv[1:]):
+        return cli_main(sys.argv[1:])
+    
+    # The interface starts from the same settings layers as the CLI
+    try:
+        settings = load_settings(sys.argv[1:])
+    except ConfigError as e:
+        print(f"Invalid configuration: {e}", file=sys.stderr)
+        return 2
+    
+    # Headless commands don't need Qt, so the interface is imported here
+    from .gui.main_window import MainWindow
+    from .core.registry import load_models
+
     try:
-        # Initialize settings
-        settings = Settings()
+        load_models(settings.model.registry_file)
         
         # Setup QApplication
         app = setup_application()
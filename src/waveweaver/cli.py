@@ -0,0 +1,588 @@
+"""
+Command line interface for headless separation jobs.
+"""
+
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from .config.defaults import (DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_CLIP_SECONDS,
+                              DEFAULT_SETTLE_SECONDS, DEFAULT_TUNE_SECONDS)
+from .config.settings import ConfigError, Settings, format_toml
+from .utils.file_handler import FileHandler
+
+
+COMMANDS = ('separate', 'watch', 'tune', 'coordinate', 'work', 'config')
+
+
+def collect_audio_files(paths: List[str]) -> List[str]:
+    """Expand files and directories into a sorted list of audio files."""
+    audio_files = []
+    for path_str in paths:
+        path = Path(path_str)
+        if path.is_dir():
+            audio_files.extend(
+                str(child) for child in sorted(path.rglob('*'))
+                if child.is_file() and FileHandler.is_audio_file(str(child))
+            )
+        elif FileHandler.is_audio_file(path_str):
+            audio_files.append(path_str)
+    return audio_files
+
+
+def add_config_arguments(parser: argparse.ArgumentParser):
+    """Add the options choosing the settings every subcommand starts from."""
+    parser.add_argument('--config', metavar='FILE',
+                        help='TOML config file (default: ~/.waveweaver/config.toml)')
+    parser.add_argument('--profile', help='Profile section of the config file to apply')
+    parser.add_argument('--set', action='append', metavar='SECTION.KEY=VALUE',
+                        help='Override a setting, e.g. performance.queue_depth=4')
+
+
+def parse_overrides(values: Optional[List[str]]) -> Dict[str, str]:
+    """Parse --set options into setting overrides."""
+    overrides = {}
+    for value in values or []:
+        name, separator, setting = value.partition('=')
+        if not separator or '.' not in name:
+            raise ConfigError(f"Expected SECTION.KEY=VALUE, got {value}")
+        overrides[name.strip()] = setting
+    return overrides
+
+
+def load_settings(argv: Optional[List[str]]) -> Settings:
+    """
+    Load the settings chosen by the config options among arguments, ignoring the others.
+
+    Raises:
+        ConfigError: If an override or a layer of the settings is invalid
+    """
+    parser = argparse.ArgumentParser(add_help=False)
+    add_config_arguments(parser)
+    args, _ = parser.parse_known_args(argv)
+    return Settings(args.config, args.profile, parse_overrides(args.set))
+
+
+def build_parser(settings: Settings) -> argparse.ArgumentParser:
+    """Build the argument parser for all subcommands."""
+    parser = argparse.ArgumentParser(prog='waveweaver')
+    add_config_arguments(parser)
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    separate = subparsers.add_parser('separate', help='Separate audio files into stems')
+    separate.add_argument('inputs', nargs='+', help='Audio files or directories')
+    separate.add_argument('-o', '--output', required=True, help='Output directory')
+    separate.add_argument('-m', '--model', default=settings.model.default_model,
+                          help='Model key')
+    separate.add_argument('-e', '--ensemble', metavar='SPEC',
+                          help='Average several models, e.g. htdemucs_ft:2,mdx_extra@cuda:1')
+    separate.add_argument('-s', '--stems', nargs='+',
+                          help='Stems to extract (default: all stems of the model)')
+    separate.add_argument('--batch-seconds', type=float,
+                          default=DEFAULT_MAX_CLIP_SECONDS,
+                          help='Clips up to this length are batched together')
+    separate.add_argument('--batch-size', type=int,
+                          help='Maximum number of clips per forward pass '
+                               f'(default: tuned for the model, else {DEFAULT_MAX_BATCH_SIZE})')
+    separate.add_argument('--segment-cache', default=settings.performance.segment_cache_dir,
+                          help='Directory caching separated segments for fast re-runs')
+    separate.add_argument('--pcm-cache', default=settings.performance.pcm_cache_dir,
+                          help='Directory caching decoded compressed inputs for fast re-runs')
+    separate.add_argument('--name-template', default=settings.output.name_template,
+                          help='Output path of each stem, using {name}, {short_name}, '
+                               '{stem} and {model} (default: %(default)s)')
+    separate.add_argument('--keep-existing', action='store_true',
+                          default=settings.output.keep_existing,
+                          help='Number new outputs instead of replacing earlier ones')
+    separate.add_argument('--single-file', action='store_true',
+                          default=settings.output.single_file,
+                          help='Save all stems of a track as channel groups of one file')
+    separate.add_argument('--check', action='store_true',
+                          help='Only validate the inputs and estimate the processing time')
+    separate.add_argument('--journal', metavar='FILE',
+                          help='Job journal; re-running with it resumes an interrupted batch')
+    separate.add_argument('--dataset', action='store_true',
+                          help='Export stems as sharded .npy arrays with an index '
+                               'instead of audio files')
+    separate.add_argument('--shard-size', type=int, default=1024, metavar='MB',
+                          help='Size of each dataset shard (default: %(default)s MB)')
+    separate.add_argument('--skip-silence', action='store_true',
+                          default=settings.performance.skip_silence,
+                          help='Fill silent regions with silence instead of separating them')
+    separate.add_argument('--residual', metavar='STEM', default=settings.postprocess.residual_stem,
+                          help='Also save the mix without this stem as no_STEM')
+    separate.add_argument('--normalize', choices=['peak', 'rms'],
+                          default=settings.postprocess.normalize or None,
+                          help='Normalize every saved stem')
+    separate.add_argument('--target-db', type=float,
+                          default=settings.postprocess.normalize_target_db,
+                          help='Normalization target in dBFS (default: -1 peak, -20 rms)')
+    separate.add_argument('--limit', action='store_true', default=settings.postprocess.limiter,
+                          help='Apply a soft limiter to every saved stem')
+
+    watch = subparsers.add_parser('watch', help='Separate audio files dropped into directories')
+    watch.add_argument('inputs', nargs='+', help='Directories to watch')
+    watch.add_argument('-o', '--output', required=True,
+                       help='Output directory mirroring the watched directories')
+    watch.add_argument('-m', '--model', default=settings.model.default_model,
+                       help='Model key')
+    watch.add_argument('-s', '--stems', nargs='+',
+                       help='Stems to extract (default: all stems of the model)')
+    watch.add_argument('--state', help='State file remembering handled files '
+                                       '(default: .waveweaver-watch.json in the output directory)')
+    watch.add_argument('--settle', type=float, default=DEFAULT_SETTLE_SECONDS,
+                       help='Seconds a file must stay unchanged before it is separated')
+    watch.add_argument('--poll', action='store_true',
+                       help='Poll directories instead of using inotify')
+
+    tune = subparsers.add_parser('tune', help='Benchmark this machine and save the fastest '
+                                              'configuration of each model')
+    tune.add_argument('-m', '--models', nargs='+', default=[settings.model.default_model],
+                      help='Model keys to tune (default: %(default)s)')
+    tune.add_argument('--seconds', type=float, default=DEFAULT_TUNE_SECONDS,
+                      help='Seconds of audio separated by each trial')
+    tune.add_argument('--devices', nargs='+',
+                      help='Devices to consider (default: every available device)')
+    tune.add_argument('--output', default=settings.model.tuned_file,
+                      help='Tuned settings file (default: %(default)s)')
+
+    distributed = settings.distributed
+    coordinate = subparsers.add_parser('coordinate', help='Hand audio files out to workers '
+                                                          'started with "waveweaver work"')
+    coordinate.add_argument('inputs', nargs='+', help='Audio files or directories')
+    coordinate.add_argument('-o', '--output', required=True, help='Output directory')
+    coordinate.add_argument('-m', '--model', default=settings.model.default_model,
+                            help='Model key')
+    coordinate.add_argument('-s', '--stems', nargs='+',
+                            help='Stems to extract (default: all stems of the model)')
+    coordinate.add_argument('--listen', default=distributed.address, metavar='HOST:PORT',
+                            help='Address workers connect to (default: %(default)s)')
+    coordinate.add_argument('--transfer', choices=['shared', 'stream'],
+                            default=distributed.transfer,
+                            help='Workers write to the shared output directory, or stream '
+                                 'inputs and stems over the connection (default: %(default)s)')
+    coordinate.add_argument('--journal', metavar='FILE',
+                            help='Job journal; re-running with it resumes an interrupted batch')
+    coordinate.add_argument('--prefetch', type=int, default=1,
+                            help='Jobs each worker holds at once (default: %(default)s)')
+
+    work = subparsers.add_parser('work', help='Separate files handed out by a coordinator')
+    work.add_argument('--connect', default=distributed.address, metavar='HOST:PORT',
+                      help='Coordinator address (default: %(default)s)')
+    work.add_argument('--name', help='Name shown by the coordinator (default: host:pid)')
+    work.add_argument('--wait', type=float, default=60.0,
+                      help='Seconds to wait for the coordinator to start listening')
+
+    subparsers.add_parser('config', help='Show the effective settings and where they come from')
+
+    return parser
+
+
+def run_separate(args: argparse.Namespace, settings: Settings) -> int:
+    """Run the separate subcommand."""
+    from .core.engine import SeparationEngine
+    from .core.ensemble import EnsembleEngine, common_stems, parse_ensemble
+    from .core.journal import JobJournal
+    from .core.probe import probe_files
+    from .core.registry import load_models
+    from .core.models import AvailableModels
+    from .core.postprocess import residual_name
+    from .core.pcm_cache import PcmCache
+    from .core.segment_cache import SegmentCache
+    from .core.shards import ShardWriter
+    from .utils.helpers import format_duration
+    from .utils.naming import check_template
+
+    try:
+        load_models(settings.model.registry_file)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load model registry: {e}", file=sys.stderr)
+        return 1
+
+    if args.ensemble:
+        try:
+            members = parse_ensemble(args.ensemble)
+            model_stems = common_stems([member.model_name for member in members])
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+        model_label = args.ensemble
+    else:
+        model_info = AvailableModels.get_model(args.model)
+        if model_info is None:
+            print(f"Unknown model: {args.model}", file=sys.stderr)
+            return 1
+        model_stems = model_info.stems
+        model_label = args.model
+
+    if args.residual and args.residual not in model_stems:
+        print(f"Model {model_label} has no stem {args.residual} for the residual", file=sys.stderr)
+        return 1
+    settings.postprocess.residual_stem = args.residual or ""
+    settings.postprocess.normalize = args.normalize or ""
+    settings.postprocess.normalize_target_db = args.target_db
+    settings.postprocess.limiter = args.limit
+
+    if args.residual:
+        model_stems = model_stems + [residual_name(args.residual)]
+    stems = args.stems or model_stems
+    unknown = [stem for stem in stems if stem not in model_stems]
+    if unknown:
+        print(f"Model {model_label} has no stems: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    if args.dataset and args.journal:
+        print("A dataset export can't be resumed with a journal", file=sys.stderr)
+        return 1
+
+    try:
+        check_template(args.name_template)
+    except ValueError as e:
+        print(str(e), file=sys.stderr)
+        return 1
+    settings.output.name_template = args.name_template
+    settings.output.keep_existing = args.keep_existing
+    settings.output.single_file = args.single_file
+    settings.performance.skip_silence = args.skip_silence
+
+    input_files = collect_audio_files(args.inputs)
+    if not input_files:
+        print("No audio files found", file=sys.stderr)
+        return 1
+
+    # Reject unreadable inputs before any model is loaded
+    report = probe_files(input_files, settings.performance.probe_workers)
+    for path, error in report.errors.items():
+        print(f"SKIP  {path}: {error}")
+    print(f"{len(report.files)} files, {format_duration(report.total_duration)} of audio")
+
+    def on_result(result):
+        if result.success:
+            print(f"OK    {result.input_file} ({result.processing_time:.1f}s)")
+        else:
+            print(f"FAIL  {result.input_file}: {result.error_message}")
+
+    segment_cache = SegmentCache(args.segment_cache) if args.segment_cache else None
+    pcm_cache = None
+    if args.pcm_cache:
+        pcm_cache = PcmCache(args.pcm_cache, settings.performance.pcm_cache_max_mb * 1024 * 1024)
+    if args.ensemble:
+        engine = EnsembleEngine.from_settings(settings, members, segment_cache=segment_cache,
+                                              pcm_cache=pcm_cache)
+    else:
+        engine = SeparationEngine.from_settings(settings, args.model,
+                                                segment_cache=segment_cache,
+                                                pcm_cache=pcm_cache)
+    estimate = engine.estimate_seconds(report.total_duration)
+    if estimate:
+        print(f"Estimated time on {engine.device}: {format_duration(estimate)}")
+    if args.check or not report.files:
+        return 1 if report.errors else 0
+
+    if not FileHandler.ensure_directory_exists(args.output):
+        print(f"Cannot create output directory: {args.output}", file=sys.stderr)
+        return 1
+
+    dataset = None
+    if args.dataset:
+        try:
+            dataset = ShardWriter(args.output, engine.output_stems(stems),
+                                  args.shard_size * 1024 * 1024)
+        except ValueError as e:
+            print(str(e), file=sys.stderr)
+            return 1
+
+    batch_size = args.batch_size
+    if batch_size is None:
+        tuned = {} if args.ensemble else settings.tuned_profile(args.model)
+        batch_size = tuned.get('batch_size', DEFAULT_MAX_BATCH_SIZE)
+
+    journal = JobJournal(args.journal) if args.journal else None
+    try:
+        results = engine.separate_files(
+            report.paths,
+            args.output,
+            stems,
+            max_clip_seconds=args.batch_seconds,
+            max_batch_size=batch_size,
+            decoder_workers=settings.performance.decoder_workers,
+            encoder_workers=settings.performance.encoder_workers,
+            queue_depth=settings.performance.queue_depth,
+            on_result=on_result,
+            journal=journal,
+            audio_infos=report.files,
+            dataset=dataset
+        )
+    finally:
+        if journal:
+            journal.close()
+        if dataset:
+            dataset.close()
+
+    separated = sum(1 for result in results if result.success)
+    failed = len(results) - separated + len(report.errors)
+    skipped = len(report.files) - len(results)
+    print(f"{separated}/{len(input_files)} files separated")
+    if skipped:
+        print(f"{skipped} files already separated, skipped")
+    transfer_time = sum(result.transfer_time for result in results)
+    if transfer_time:
+        print(f"Device transfers: {transfer_time:.2f}s")
+    if results and args.skip_silence:
+        saved = sum(result.compute_saved for result in results) / len(results)
+        print(f"Silence skipped: {saved:.0%} of the audio")
+    if segment_cache:
+        print(f"Segment cache: {segment_cache.hits} reused, "
+              f"{segment_cache.misses} separated")
+    if dataset:
+        print(f"Dataset: {len(dataset.clips)} clips in {len(dataset.shards)} shards")
+    if pcm_cache:
+        print(f"Decoded audio cache: {pcm_cache.hits} reused, {pcm_cache.misses} decoded")
+    return 1 if failed else 0
+
+
+def run_watch(args: argparse.Namespace, settings: Settings) -> int:
+    """Run the watch subcommand."""
+    from .core.engine import SeparationEngine
+    from .core.models import AvailableModels
+    from .core.registry import load_models
+    from .core.watcher import WatchService, WatchState, create_watcher
+
+    try:
+        load_models(settings.model.registry_file)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load model registry: {e}", file=sys.stderr)
+        return 1
+
+    model_info = AvailableModels.get_model(args.model)
+    if model_info is None:
+        print(f"Unknown model: {args.model}", file=sys.stderr)
+        return 1
+    stems = args.stems or model_info.stems
+    unknown = [stem for stem in stems if stem not in model_info.stems]
+    if unknown:
+        print(f"Model {args.model} has no stems: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    missing = [path for path in args.inputs if not Path(path).is_dir()]
+    if missing:
+        print(f"Not a directory: {', '.join(missing)}", file=sys.stderr)
+        return 1
+    if not FileHandler.ensure_directory_exists(args.output):
+        print(f"Cannot create output directory: {args.output}", file=sys.stderr)
+        return 1
+
+    def on_result(result):
+        if result.success:
+            print(f"OK    {result.input_file} ({result.processing_time:.1f}s)", flush=True)
+        else:
+            print(f"FAIL  {result.input_file}: {result.error_message}", flush=True)
+
+    engine = SeparationEngine.from_settings(settings, args.model)
+    # Keep the model resident for the lifetime of the watch
+    engine.load_model()
+
+    state = WatchState(args.state or str(Path(args.output) / '.waveweaver-watch.json'))
+    service = WatchService(engine, args.inputs, args.output, stems, state,
+                           watcher=create_watcher(args.inputs, polling=args.poll),
+                           settle_seconds=args.settle, on_result=on_result)
+    print(f"Watching {', '.join(args.inputs)} ({type(service.watcher).__name__})", flush=True)
+    try:
+        service.run()
+    except KeyboardInterrupt:
+        pass
+    return 0
+
+
+def run_tune(args: argparse.Namespace, settings: Settings) -> int:
+    """Run the tune subcommand."""
+    from .config.settings import save_tuned_profile
+    from .core.models import AvailableModels
+    from .core.registry import load_models
+    from .core.tuning import Tuner
+
+    try:
+        load_models(settings.model.registry_file)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load model registry: {e}", file=sys.stderr)
+        return 1
+    unknown = [model for model in args.models if AvailableModels.get_model(model) is None]
+    if unknown:
+        print(f"Unknown model: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    def on_trial(config):
+        segment = f"{config.segment:.2f}s" if config.segment else "model"
+        cost = f"{config.rtf:.3f}s per second" if config.rtf else "does not fit"
+        print(f"  {config.device:5} threads={config.cpu_threads or '-':<3} "
+              f"segment={segment:<6} batch={config.batch_size}: {cost}", flush=True)
+
+    failed = False
+    for model in args.models:
+        print(f"Tuning {model}", flush=True)
+        try:
+            best = Tuner(model, args.seconds, on_trial=on_trial).tune(args.devices)
+        except RuntimeError as e:
+            print(str(e), file=sys.stderr)
+            failed = True
+            continue
+        save_tuned_profile(args.output, model, best.to_dict())
+        print(f"Fastest for {model}: {best.device}, {best.rtf:.3f}s per second of audio")
+    print(f"Saved to {args.output}")
+    return 1 if failed else 0
+
+
+def run_coordinate(args: argparse.Namespace, settings: Settings) -> int:
+    """Run the coordinate subcommand."""
+    from .core.distributed import Coordinator, parse_address
+    from .core.engine import SeparationEngine
+    from .core.journal import JobJournal
+    from .core.models import AvailableModels
+    from .core.probe import probe_files
+    from .core.registry import load_models
+    from .utils.helpers import format_duration
+
+    if not settings.distributed.authkey:
+        print("Set distributed.authkey or WAVEWEAVER_AUTHKEY on the coordinator "
+              "and every worker", file=sys.stderr)
+        return 1
+    try:
+        load_models(settings.model.registry_file)
+        address = parse_address(args.listen)
+    except (OSError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    model_info = AvailableModels.get_model(args.model)
+    if model_info is None:
+        print(f"Unknown model: {args.model}", file=sys.stderr)
+        return 1
+    stems = args.stems or model_info.stems
+    unknown = [stem for stem in stems if stem not in model_info.stems]
+    if unknown:
+        print(f"Model {args.model} has no stems: {', '.join(unknown)}", file=sys.stderr)
+        return 1
+
+    input_files = collect_audio_files(args.inputs)
+    if not input_files:
+        print("No audio files found", file=sys.stderr)
+        return 1
+    report = probe_files(input_files, settings.performance.probe_workers)
+    for path, error in report.errors.items():
+        print(f"SKIP  {path}: {error}")
+    print(f"{len(report.files)} files, {format_duration(report.total_duration)} of audio")
+    if not FileHandler.ensure_directory_exists(args.output):
+        print(f"Cannot create output directory: {args.output}", file=sys.stderr)
+        return 1
+
+    def on_result(result):
+        if result.success:
+            print(f"OK    {result.input_file} ({result.processing_time:.1f}s)", flush=True)
+        else:
+            print(f"FAIL  {result.input_file}: {result.error_message}", flush=True)
+
+    def on_worker(name, event):
+        print(f"Worker {name} {event}", flush=True)
+
+    # The model is not loaded, the engine only describes the job
+    engine = SeparationEngine.from_settings(settings, args.model)
+    journal = JobJournal(args.journal) if args.journal else None
+    parameters = engine.job_parameters(args.output, stems) if journal else None
+    try:
+        coordinator = Coordinator(
+            address, settings.distributed.authkey.encode(), args.model, args.output, stems,
+            transfer=args.transfer, journal=journal, parameters=parameters,
+            heartbeat_timeout=settings.distributed.heartbeat_timeout,
+            max_attempts=settings.distributed.max_attempts, prefetch=args.prefetch,
+            on_result=on_result, on_worker=on_worker, engine=engine)
+        host, port = coordinator.address
+        print(f"Waiting for workers on {host}:{port}", flush=True)
+        results = coordinator.run(report.files)
+    except OSError as e:
+        print(f"Cannot listen on {args.listen}: {e}", file=sys.stderr)
+        return 1
+    finally:
+        if journal:
+            journal.close()
+
+    separated = sum(1 for result in results if result.success)
+    failed = len(results) - separated + len(report.errors)
+    print(f"{separated}/{len(input_files)} files separated")
+    skipped = len(report.files) - len(results)
+    if skipped:
+        print(f"{skipped} files already separated, skipped")
+    return 1 if failed else 0
+
+
+def run_work(args: argparse.Namespace, settings: Settings) -> int:
+    """Run the work subcommand."""
+    from multiprocessing import AuthenticationError
+
+    from .core.distributed import DistributedWorker, parse_address
+    from .core.engine import SeparationEngine
+    from .core.registry import load_models
+
+    if not settings.distributed.authkey:
+        print("Set distributed.authkey or WAVEWEAVER_AUTHKEY on the coordinator "
+              "and every worker", file=sys.stderr)
+        return 1
+    try:
+        load_models(settings.model.registry_file)
+        address = parse_address(args.connect)
+    except (OSError, ValueError) as e:
+        print(str(e), file=sys.stderr)
+        return 1
+
+    performance = settings.performance
+    worker = DistributedWorker(
+        address, settings.distributed.authkey.encode(),
+        engine_factory=lambda model: SeparationEngine.from_settings(settings, model),
+        name=args.name,
+        heartbeat_interval=settings.distributed.heartbeat_seconds,
+        separate_options={
+            'decoder_workers': performance.decoder_workers,
+            'encoder_workers': performance.encoder_workers,
+            'queue_depth': performance.queue_depth,
+        })
+    try:
+        jobs = worker.serve(args.wait)
+    except (OSError, AuthenticationError) as e:
+        print(f"Cannot reach coordinator at {args.connect}: {e}", file=sys.stderr)
+        return 1
+    print(f"{jobs} jobs separated")
+    return 0
+
+
+def run_config(args: argparse.Namespace, settings: Settings) -> int:
+    """Run the config subcommand."""
+    print(f"# Config file: {settings.config_file or 'none'}")
+    if settings.profile:
+        print(f"# Profile: {settings.profile}")
+    print(format_toml(settings.as_dict()))
+    return 0
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Command line entry point."""
+    # Settings are the defaults of every other option, so load them first
+    try:
+        settings = load_settings(argv)
+    except ConfigError as e:
+        print(f"Invalid configuration: {e}", file=sys.stderr)
+        return 2
+    args = build_parser(settings).parse_args(argv)
+
+    if args.command == 'separate':
+        return run_separate(args, settings)
+    if args.command == 'watch':
+        return run_watch(args, settings)
+    if args.command == 'tune':
+        return run_tune(args, settings)
+    if args.command == 'coordinate':
+        return run_coordinate(args, settings)
+    if args.command == 'work':
+        return run_work(args, settings)
+    if args.command == 'config':
+        return run_config(args, settings)
+    return 1
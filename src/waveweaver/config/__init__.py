@@ -3,6 +3,6 @@
 Configuration module.
 """
 
-from .settings import Settings
+from .settings import ConfigError, Settings
 
-__all__ = ['Settings']
\ No newline at end of file
+__all__ = ['ConfigError', 'Settings']
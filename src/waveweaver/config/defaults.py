@@ -0,0 +1,15 @@
+"""
+Defaults shared by the engine and the command line, kept free of heavy imports.
+"""
+
+# Clips up to this length are considered for batching
+DEFAULT_MAX_CLIP_SECONDS = 30.0
+
+# Upper bound on the number of clips packed into one forward pass
+DEFAULT_MAX_BATCH_SIZE = 16
+
+# Seconds of audio separated by every tuning trial
+DEFAULT_TUNE_SECONDS = 10.0
+
+# Seconds a watched file's size and modification time must stay unchanged
+DEFAULT_SETTLE_SECONDS = 5.0
@@ -1,11 +1,83 @@
 """
 Application configuration and settings management.
+
+Settings are layered, each layer overriding the previous one: built-in
+defaults, the choices remembered by the interface (a JSON state file),
+the TOML config file (its ``[hosts.<hostname>]`` section, then the
+selected ``[profiles.<name>]`` section), environment variables and
+finally command line overrides.
 """
 
+import json
 import os
+import socket
+from dataclasses import dataclass, field, fields
 from pathlib import Path
-from typing import Dict, Any
-from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Union, get_args, get_origin
+
+from ..utils.helpers import load_toml
+
+
+class ConfigError(ValueError):
+    """Raised when a setting is unknown or has an invalid value."""
+
+
+def config_home() -> Path:
+    """Get the directory holding the config, state and tuned settings files."""
+    return Path(os.getenv("WAVEWEAVER_HOME") or Path.home() / ".waveweaver")
+
+
+def load_tuned_profiles(path: str) -> Dict[str, Dict[str, Any]]:
+    """Read the per-model configurations written by ``waveweaver tune``, empty if missing."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            return dict(json.load(f).get('models', {}))
+    except (OSError, ValueError, AttributeError):
+        return {}
+
+
+def save_tuned_profile(path: str, model_name: str, profile: Dict[str, Any]):
+    """Store the tuned configuration of a model, keeping those of other models."""
+    profiles = load_tuned_profiles(path)
+    profiles[model_name] = profile
+    Path(path).parent.mkdir(parents=True, exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, 'w', encoding='utf-8') as f:
+        json.dump({'models': profiles}, f, indent=2)
+    os.replace(temp_path, path)
+
+
+def _toml_value(value: Any) -> str:
+    """Format a string, number, boolean or list as a TOML value."""
+    if isinstance(value, bool):
+        return "true" if value else "false"
+    if isinstance(value, (int, float)):
+        return repr(value)
+    if isinstance(value, (list, tuple)):
+        return "[" + ", ".join(_toml_value(item) for item in value) + "]"
+    # JSON string escapes are valid TOML basic strings
+    return json.dumps(str(value), ensure_ascii=False)
+
+
+def format_toml(data: Dict[str, Dict[str, Any]]) -> str:
+    """Format sections of plain values as TOML."""
+    lines = []
+    for section, values in data.items():
+        lines.append(f"[{section}]")
+        lines.extend(f"{key} = {_toml_value(value)}" for key, value in values.items()
+                     if value is not None)
+        lines.append("")
+    return "\n".join(lines)
+
+
+def load_state(path: str) -> Dict[str, Any]:
+    """Read the choices remembered by the interface, empty if missing or unreadable."""
+    try:
+        with open(path, encoding='utf-8') as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return state if isinstance(state, dict) else {}
 
 
 @dataclass
@@ -23,6 +95,59 @@ class ModelSettings:
     default_model: str = "htdemucs_ft"
     cache_dir: str = "./models"
     shifts: int = 2
+    registry_file: str = ""
+    # Empty for tuned.json in the config home
+    tuned_file: str = ""
+
+
+@dataclass
+class PerformanceSettings:
+    """Batch processing and concurrency settings."""
+    decoder_workers: int = 2
+    encoder_workers: int = 2
+    queue_depth: int = 2
+    segment_cache_dir: str = ""
+    buffer_dtype: str = "int16"
+    probe_workers: int = 8
+    skip_silence: bool = False
+    silence_threshold_db: float = -60.0
+    min_silence_seconds: float = 2.0
+    shared_weights_dir: str = ""
+    pcm_cache_dir: str = ""
+    pcm_cache_max_mb: int = 4096
+    cpu_threads: int = 0
+    # Empty to use the tuned device, else CUDA when available
+    device: str = ""
+
+
+@dataclass
+class PostProcessSettings:
+    """Post-processing applied to separated stems."""
+    residual_stem: str = ""
+    normalize: str = ""
+    normalize_target_db: Optional[float] = None
+    limiter: bool = False
+    limiter_ceiling_db: float = -0.3
+
+
+@dataclass
+class OutputSettings:
+    """Naming of output files."""
+    name_template: str = "{name}/{short_name} - {stem}.wav"
+    keep_existing: bool = False
+    single_file: bool = False
+
+
+@dataclass
+class DistributedSettings:
+    """Coordinator and workers of distributed separation."""
+    address: str = "localhost:7360"
+    # Shared secret of the coordinator and its workers, required
+    authkey: str = ""
+    transfer: str = "shared"
+    heartbeat_seconds: float = 2.0
+    heartbeat_timeout: float = 30.0
+    max_attempts: int = 3
 
 
 @dataclass
@@ -31,30 +156,266 @@ class UISettings:
     theme: str = "dark"
     max_filename_display: int = 40
     progress_update_interval: int = 100
+    preview_seconds: float = 20.0
+    # Choices remembered between sessions of the interface
+    last_model: str = ""
+    last_stems: List[str] = field(default_factory=list)
+    last_output_dir: str = ""
+
+
+# Environment variables and the setting each one overrides
+ENVIRONMENT = {
+    "WAVEWEAVER_WINDOW_WIDTH": ("window", "width"),
+    "WAVEWEAVER_WINDOW_HEIGHT": ("window", "height"),
+    "DEFAULT_MODEL": ("model", "default_model"),
+    "DEMUCS_CACHE_DIR": ("model", "cache_dir"),
+    "DEMUCS_SHIFTS": ("model", "shifts"),
+    "WAVEWEAVER_MODEL_REGISTRY": ("model", "registry_file"),
+    "WAVEWEAVER_TUNED_FILE": ("model", "tuned_file"),
+    "WAVEWEAVER_DECODER_WORKERS": ("performance", "decoder_workers"),
+    "WAVEWEAVER_ENCODER_WORKERS": ("performance", "encoder_workers"),
+    "WAVEWEAVER_QUEUE_DEPTH": ("performance", "queue_depth"),
+    "WAVEWEAVER_SEGMENT_CACHE_DIR": ("performance", "segment_cache_dir"),
+    "WAVEWEAVER_BUFFER_DTYPE": ("performance", "buffer_dtype"),
+    "WAVEWEAVER_PROBE_WORKERS": ("performance", "probe_workers"),
+    "WAVEWEAVER_SKIP_SILENCE": ("performance", "skip_silence"),
+    "WAVEWEAVER_SILENCE_THRESHOLD_DB": ("performance", "silence_threshold_db"),
+    "WAVEWEAVER_MIN_SILENCE_SECONDS": ("performance", "min_silence_seconds"),
+    "WAVEWEAVER_SHARED_WEIGHTS_DIR": ("performance", "shared_weights_dir"),
+    "WAVEWEAVER_PCM_CACHE_DIR": ("performance", "pcm_cache_dir"),
+    "WAVEWEAVER_PCM_CACHE_MAX_MB": ("performance", "pcm_cache_max_mb"),
+    "WAVEWEAVER_CPU_THREADS": ("performance", "cpu_threads"),
+    "WAVEWEAVER_DEVICE": ("performance", "device"),
+    "WAVEWEAVER_RESIDUAL_STEM": ("postprocess", "residual_stem"),
+    "WAVEWEAVER_NORMALIZE": ("postprocess", "normalize"),
+    "WAVEWEAVER_NORMALIZE_TARGET_DB": ("postprocess", "normalize_target_db"),
+    "WAVEWEAVER_LIMITER": ("postprocess", "limiter"),
+    "WAVEWEAVER_LIMITER_CEILING_DB": ("postprocess", "limiter_ceiling_db"),
+    "WAVEWEAVER_NAME_TEMPLATE": ("output", "name_template"),
+    "WAVEWEAVER_KEEP_EXISTING": ("output", "keep_existing"),
+    "WAVEWEAVER_SINGLE_FILE": ("output", "single_file"),
+    "WAVEWEAVER_COORDINATOR": ("distributed", "address"),
+    "WAVEWEAVER_AUTHKEY": ("distributed", "authkey"),
+    "THEME": ("ui", "theme"),
+}
+
+# Settings whose values are never shown
+SECRETS = {("distributed", "authkey")}
+
+# Shown instead of a secret that is set
+REDACTED = "***"
+
+# Allowed values of settings restricted to a few choices
+CHOICES = {
+    ("performance", "buffer_dtype"): ("float32", "int16", "int24"),
+    ("postprocess", "normalize"): ("", "peak", "rms"),
+    ("distributed", "transfer"): ("shared", "stream"),
+}
+
+# Settings that must be at least 1, the other integers must not be negative
+POSITIVE = {
+    ("performance", "decoder_workers"), ("performance", "encoder_workers"),
+    ("performance", "queue_depth"), ("performance", "probe_workers"),
+    ("distributed", "max_attempts"),
+}
+
+TRUE_VALUES = ("1", "true", "yes", "on")
+FALSE_VALUES = ("0", "false", "no", "off")
+
+# UI settings saved to the state file by remember()
+REMEMBERED = ("last_model", "last_stems", "last_output_dir")
+
+
+def _convert(value: Any, kind: Any, name: str) -> Any:
+    """
+    Convert a TOML, environment or command line value to a setting's type.
+
+    Raises:
+        ConfigError: If the value doesn't fit the type
+    """
+    if get_origin(kind) is Union:
+        if value is None or value == "":
+            return None
+        kind = next(arg for arg in get_args(kind) if arg is not type(None))
+    if get_origin(kind) is list:
+        if isinstance(value, str):
+            value = [item.strip() for item in value.split(",") if item.strip()]
+        if not isinstance(value, list) or not all(isinstance(item, str) for item in value):
+            raise ConfigError(f"{name} must be a list of strings, got {value!r}")
+        return list(value)
+    if kind is bool:
+        if isinstance(value, bool):
+            return value
+        if isinstance(value, str) and value.lower() in TRUE_VALUES + FALSE_VALUES:
+            return value.lower() in TRUE_VALUES
+        raise ConfigError(f"{name} must be true or false, got {value!r}")
+    if kind in (int, float):
+        if isinstance(value, bool) or (kind is int and isinstance(value, float)):
+            raise ConfigError(f"{name} must be {'an integer' if kind is int else 'a number'}, "
+                              f"got {value!r}")
+        try:
+            return kind(value)
+        except (TypeError, ValueError):
+            raise ConfigError(f"{name} must be {'an integer' if kind is int else 'a number'}, "
+                              f"got {value!r}")
+    if not isinstance(value, str):
+        raise ConfigError(f"{name} must be a string, got {value!r}")
+    return value
 
 
 class Settings:
-    """Main settings class."""
-    
-    def __init__(self):
+    """
+    Main settings class.
+
+    Args:
+        config_file: TOML config file, ``WAVEWEAVER_CONFIG`` or
+            ``config.toml`` in the config home if None; a missing default
+            file is ignored
+        profile: Profile section of the config file to apply,
+            ``WAVEWEAVER_PROFILE`` or the file's ``profile`` key if None
+        overrides: ``section.key`` values set on the command line
+
+    Raises:
+        ConfigError: If a layer sets an unknown setting or an invalid value
+    """
+
+    SECTIONS = ('window', 'model', 'performance', 'postprocess', 'output', 'distributed', 'ui')
+
+    def __init__(self, config_file: Optional[str] = None, profile: Optional[str] = None,
+                 overrides: Optional[Dict[str, Any]] = None):
         self.window = WindowSettings()
         self.model = ModelSettings()
         self.ui = UISettings()
+        self.performance = PerformanceSettings()
+        self.postprocess = PostProcessSettings()
+        self.output = OutputSettings()
+        self.distributed = DistributedSettings()
+        self.tuned: Dict[str, Dict[str, Any]] = {}
+        self.state_file = str(config_home() / "state.json")
+        self.config_file = config_file or os.getenv("WAVEWEAVER_CONFIG") or ""
+        self.profile = profile or os.getenv("WAVEWEAVER_PROFILE") or ""
+
+        # JSON, so remembering choices never needs a TOML parser
+        self._apply_sections(load_state(self.state_file), self.state_file)
+        self._load_config_file()
         self._load_from_environment()
+        for name, value in (overrides or {}).items():
+            section, _, key = name.partition(".")
+            self._set(section, key, value, "command line")
+        self.validate()
+
+        if not self.model.tuned_file:
+            self.model.tuned_file = str(config_home() / "tuned.json")
+        self.tuned = load_tuned_profiles(self.model.tuned_file)
     
+    def tuned_profile(self, model_name: str) -> Dict[str, Any]:
+        """Get the configuration tuned for a model on this machine, empty if not tuned."""
+        return self.tuned.get(model_name, {})
+    
+    def _load_config_file(self):
+        """Apply the config file, then its section for this host and the selected profile."""
+        path = self.config_file or str(config_home() / "config.toml")
+        if not Path(path).is_file():
+            if self.config_file:
+                raise ConfigError(f"Config file {path} does not exist")
+            if self.profile:
+                raise ConfigError(f"Profile {self.profile} needs a config file")
+            return
+        self.config_file = path
+        try:
+            data = load_toml(path)
+        except ValueError as e:
+            raise ConfigError(f"{path}: {e}")
+        hosts = data.pop('hosts', {})
+        profiles = data.pop('profiles', {})
+        file_profile = data.pop('profile', "")
+        self.profile = self.profile or file_profile
+        self._apply_sections(data, path)
+
+        hostname = socket.gethostname()
+        for name in (hostname.split(".")[0], hostname):
+            if name in hosts:
+                self._apply_sections(hosts[name], f"{path} [hosts.{name}]")
+                break
+        if self.profile:
+            if self.profile not in profiles:
+                raise ConfigError(f"{path} has no profile named {self.profile}")
+            self._apply_sections(profiles[self.profile], f"{path} [profiles.{self.profile}]")
+
+    def _apply_sections(self, data: Dict[str, Any], source: str):
+        """Apply a mapping of section tables to the settings."""
+        for section, values in data.items():
+            if section not in self.SECTIONS or not isinstance(values, dict):
+                raise ConfigError(f"{source}: unknown section {section}")
+            for key, value in values.items():
+                self._set(section, key, value, source)
+
+    def _set(self, section: str, key: str, value: Any, source: str):
+        """Convert and set one setting."""
+        group = getattr(self, section, None) if section in self.SECTIONS else None
+        kinds = {f.name: f.type for f in fields(group)} if group is not None else {}
+        if key not in kinds:
+            raise ConfigError(f"{source}: unknown setting {section}.{key}")
+        setattr(group, key, _convert(value, kinds[key], f"{source}: {section}.{key}"))
+
     def _load_from_environment(self):
         """Load settings from environment variables."""
-        # Window settings
-        self.window.width = int(os.getenv("WAVEWEAVER_WINDOW_WIDTH", self.window.width))
-        self.window.height = int(os.getenv("WAVEWEAVER_WINDOW_HEIGHT", self.window.height))
-        
-        # Model settings
-        self.model.default_model = os.getenv("DEFAULT_MODEL", self.model.default_model)
-        self.model.cache_dir = os.getenv("DEMUCS_CACHE_DIR", self.model.cache_dir)
-        self.model.shifts = int(os.getenv("DEMUCS_SHIFTS", self.model.shifts))
-        
-        # UI settings
-        self.ui.theme = os.getenv("THEME", self.ui.theme)
+        for variable, (section, key) in ENVIRONMENT.items():
+            value = os.getenv(variable)
+            if value is not None:
+                self._set(section, key, value, variable)
+
+    def validate(self):
+        """
+        Check settings restricted to some values.
+
+        Raises:
+            ConfigError: If a setting is out of range
+        """
+        for (section, key), choices in CHOICES.items():
+            value = getattr(getattr(self, section), key)
+            if value not in choices:
+                raise ConfigError(f"{section}.{key} must be one of "
+                                  f"{', '.join(repr(choice) for choice in choices)}, got {value!r}")
+        for section in self.SECTIONS:
+            group = getattr(self, section)
+            for f in fields(group):
+                value = getattr(group, f.name)
+                if f.type is not int:
+                    continue
+                minimum = 1 if (section, f.name) in POSITIVE else 0
+                if value < minimum:
+                    raise ConfigError(f"{section}.{f.name} must be at least {minimum}, got {value}")
+
+    def remember(self, **values):
+        """
+        Save interface choices so the next session starts with them.
+
+        Args:
+            **values: UI settings named in REMEMBERED
+        """
+        ui = dict(load_state(self.state_file).get('ui', {}))
+        for key, value in values.items():
+            if key not in REMEMBERED:
+                raise ConfigError(f"ui.{key} can't be remembered")
+            setattr(self.ui, key, value)
+            ui[key] = value
+        Path(self.state_file).parent.mkdir(parents=True, exist_ok=True)
+        temp_path = f"{self.state_file}.tmp"
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'ui': ui}, f, indent=2)
+        os.replace(temp_path, self.state_file)
+
+    def as_dict(self) -> Dict[str, Dict[str, Any]]:
+        """Get the effective settings, by section, with secrets that are set redacted."""
+        result = {}
+        for section in self.SECTIONS:
+            group = getattr(self, section)
+            values = result[section] = {}
+            for f in fields(group):
+                value = getattr(group, f.name)
+                values[f.name] = REDACTED if value and (section, f.name) in SECRETS else value
+        return result
     
     def get_assets_path(self) -> Path:
         """Get path to assets directory."""
@@ -10,6 +10,8 @@ from .models import (
     ProcessingResult, 
     AvailableModels
 )
+from .engine import SeparationEngine
+from .ensemble import EnsembleEngine
 from .stem_separator import StemSeparatorThread
 
 __all__ = [
@@ -18,5 +20,7 @@ __all__ = [
     'AudioFileInfo',
     'ProcessingResult',
     'AvailableModels',
+    'SeparationEngine',
+    'EnsembleEngine',
     'StemSeparatorThread'
 ]
\ No newline at end of file
@@ -0,0 +1,135 @@
+"""
+In-process API separating audio into stems held in memory.
+"""
+
+import asyncio
+import functools
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Dict, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import torch
+
+from demucs.audio import convert_audio
+
+from .engine import SeparationEngine
+from .worker import create_engine
+from ..config.settings import Settings
+
+
+AudioInput = Union[str, os.PathLike, np.ndarray, torch.Tensor]
+
+_engines: Dict[Tuple[str, Optional[str]], SeparationEngine] = {}
+_engine_locks: Dict[Tuple[str, Optional[str]], threading.Lock] = {}
+_lock = threading.Lock()
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+@dataclass
+class SeparatedAudio:
+    """Stems of one input, each a [C, T] array at ``sample_rate``."""
+    stems: Dict[str, Any]
+    sample_rate: int
+
+    def __getitem__(self, stem: str):
+        return self.stems[stem]
+
+
+def get_engine(model: str, device: Optional[str] = None) -> SeparationEngine:
+    """
+    Get the resident engine of a model, creating it on first use.
+
+    Raises:
+        ValueError: If the model is unknown
+    """
+    key = (model, device)
+    with _lock:
+        engine = _engines.get(key)
+        if engine is None:
+            overrides = {'device': device} if device else {}
+            engine = _engines[key] = create_engine(model, **overrides)
+            _engine_locks[key] = threading.Lock()
+        return engine
+
+
+def _to_tensor(audio: AudioInput, engine: SeparationEngine,
+               sample_rate: Optional[int]) -> Tuple[torch.Tensor, int]:
+    """Get a [C, T] float tensor and its sample rate from a path or array."""
+    if isinstance(audio, (str, os.PathLike)):
+        return engine.load_audio(os.fspath(audio))
+    if isinstance(audio, np.ndarray):
+        audio = torch.from_numpy(np.ascontiguousarray(audio, dtype=np.float32))
+    elif not isinstance(audio, torch.Tensor):
+        raise TypeError(f"Expected a path, numpy array or tensor, got {type(audio).__name__}")
+    if audio.dim() == 1:
+        audio = audio.unsqueeze(0)
+    if audio.dim() != 2:
+        raise ValueError(f"Expected [channels, samples] audio, got shape {tuple(audio.shape)}")
+    return audio.float(), sample_rate or int(engine.model.samplerate)
+
+
+def separate(audio: AudioInput, model: Optional[str] = None,
+             stems: Optional[Sequence[str]] = None, sample_rate: Optional[int] = None,
+             device: Optional[str] = None) -> SeparatedAudio:
+    """
+    Separate audio into stems without writing any file.
+
+    The model stays loaded between calls, and calls using the same model
+    run one at a time.
+
+    Args:
+        audio: File path, or [C, T] / [T] samples as a numpy array or tensor
+        model: Model name, the configured default model if None
+        stems: Stems to return, all of the model's stems if None
+        sample_rate: Sample rate of array input, the model's rate if None
+        device: Device to run on, chosen automatically if None
+
+    Returns:
+        SeparatedAudio at the model's sample rate and channel count. Stems
+        are tensors for tensor input and numpy arrays otherwise.
+
+    Raises:
+        ValueError: If the model is unknown or a requested stem is not
+            produced by it
+    """
+    model = model or Settings().model.default_model
+    engine = get_engine(model, device)
+    selected = engine.output_stems(stems) if stems is not None else engine.stem_names
+    unknown = [stem for stem in selected if stem not in engine.stem_names]
+    if unknown:
+        raise ValueError(f"Model {model} has no stem {', '.join(unknown)}")
+
+    with _engine_locks[(model, device)]:
+        wav, rate = _to_tensor(audio, engine, sample_rate)
+        samplerate = int(engine.model.samplerate)
+        wav = convert_audio(wav, rate, samplerate, engine.model.audio_channels)
+        sources = engine.separate(wav.unsqueeze(0))[0].cpu()
+
+    outputs = {stem: sources[engine.stem_names.index(stem)] for stem in selected}
+    if not isinstance(audio, torch.Tensor):
+        outputs = {stem: samples.numpy() for stem, samples in outputs.items()}
+    return SeparatedAudio(stems=outputs, sample_rate=samplerate)
+
+
+def _shared_executor() -> ThreadPoolExecutor:
+    """Get the executor running asynchronous separations, one at a time."""
+    global _executor
+    with _lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="waveweaver")
+        return _executor
+
+
+async def separate_async(audio: AudioInput, model: Optional[str] = None,
+                         stems: Optional[Sequence[str]] = None,
+                         sample_rate: Optional[int] = None,
+                         device: Optional[str] = None) -> SeparatedAudio:
+    """Separate audio like :func:`separate` without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(
+        _shared_executor(),
+        functools.partial(separate, audio, model, stems, sample_rate, device)
+    )
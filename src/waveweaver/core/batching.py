@@ -0,0 +1,94 @@
+"""
+Batching of short inputs into a single model forward pass.
+"""
+
+from typing import Dict, List, Sequence, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from .models import AudioFileInfo
+from ..config.defaults import DEFAULT_MAX_BATCH_SIZE, DEFAULT_MAX_CLIP_SECONDS
+
+
+def plan_batches(infos: Sequence[AudioFileInfo],
+                 max_clip_seconds: float = DEFAULT_MAX_CLIP_SECONDS,
+                 max_batch_size: int = DEFAULT_MAX_BATCH_SIZE
+                 ) -> Tuple[List[List[int]], List[int]]:
+    """
+    Split inputs into batches of short clips and files processed on their own.
+
+    Clips are grouped by sample rate and channel count, then sorted by
+    duration so that each batch pads as little as possible.
+
+    Args:
+        infos: Audio information for every input, in job order
+        max_clip_seconds: Longest clip eligible for batching
+        max_batch_size: Maximum number of clips per batch
+
+    Returns:
+        Tuple of (batches of input indices, indices of single inputs)
+    """
+    groups: Dict[Tuple[int, int], List[int]] = {}
+    singles: List[int] = []
+
+    for index, info in enumerate(infos):
+        # Inputs that could not be probed are never batched
+        if info.format == "unknown" or not 0 < info.duration <= max_clip_seconds:
+            singles.append(index)
+            continue
+        key = (info.sample_rate, info.channels)
+        groups.setdefault(key, []).append(index)
+
+    batches: List[List[int]] = []
+    for indices in groups.values():
+        indices.sort(key=lambda i: infos[i].duration)
+        for start in range(0, len(indices), max_batch_size):
+            batch = indices[start:start + max_batch_size]
+            if len(batch) > 1:
+                batches.append(batch)
+            else:
+                singles.extend(batch)
+
+    singles.sort()
+    return batches, singles
+
+
+def pack_batch(wavs: Sequence[torch.Tensor]) -> Tuple[torch.Tensor, List[int]]:
+    """
+    Pack decoded clips into one zero-padded batch tensor.
+
+    Args:
+        wavs: Clips shaped [C, T] or [1, C, T], all with the same channel count
+
+    Returns:
+        Tuple of (batch tensor shaped [B, C, T_max], original clip lengths)
+    """
+    clips = [wav[0] if wav.dim() == 3 else wav for wav in wavs]
+    channels = {clip.shape[0] for clip in clips}
+    if len(channels) != 1:
+        raise ValueError("All clips in a batch must have the same channel count")
+
+    lengths = [clip.shape[-1] for clip in clips]
+    max_length = max(lengths)
+    batch = torch.stack([
+        F.pad(clip, (0, max_length - clip.shape[-1])) for clip in clips
+    ])
+    return batch, lengths
+
+
+def unpack_batch(sources: torch.Tensor, lengths: Sequence[int]) -> List[torch.Tensor]:
+    """
+    Scatter batched separation output back into per-clip tensors.
+
+    Args:
+        sources: Model output shaped [B, S, C, T_max]
+        lengths: Original clip lengths returned by :func:`pack_batch`
+
+    Returns:
+        List of per-clip outputs shaped [1, S, C, T]
+    """
+    return [
+        sources[index:index + 1, ..., :length]
+        for index, length in enumerate(lengths)
+    ]
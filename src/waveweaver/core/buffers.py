@@ -0,0 +1,154 @@
+"""
+Compact host-side storage of separated stems.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, Iterator, Optional, Sequence
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from ..utils.file_handler import FileHandler
+
+
+SUPPORTED_DTYPES = ('float32', 'int16', 'int24')
+
+# Output subtype matching each storage type, None keeps the format default
+DEFAULT_SUBTYPES = {
+    'float32': None,
+    'int16': 'PCM_16',
+    'int24': 'PCM_24',
+}
+
+# Frames converted or written per block, bounds temporary allocations
+BLOCK_FRAMES = 1 << 18
+
+# Same full-scale factors libsndfile uses when converting float samples
+_INT16_SCALE = 32768.0
+_INT24_SCALE = 8388608.0
+
+
+def quantize_int16(block: np.ndarray) -> np.ndarray:
+    """Convert float samples in [-1, 1) to int16 with clipping."""
+    scaled = np.rint(block * _INT16_SCALE)
+    return np.clip(scaled, -32768, 32767).astype(np.int16)
+
+
+def pack_int24(block: np.ndarray) -> np.ndarray:
+    """Convert float samples to packed little-endian 24-bit integers."""
+    scaled = np.clip(np.rint(block * _INT24_SCALE), -8388608, 8388607).astype('<i4')
+    scaled = np.ascontiguousarray(scaled)
+    return scaled.view(np.uint8).reshape(block.shape + (4,))[..., :3]
+
+
+def unpack_int24(packed: np.ndarray) -> np.ndarray:
+    """Expand packed 24-bit integers to left-justified int32 samples."""
+    wide = np.zeros(packed.shape[:-1] + (4,), dtype=np.uint8)
+    wide[..., 1:] = packed
+    return wide.view('<i4')[..., 0]
+
+
+class StemBuffer:
+    """
+    Separated stems stored contiguously and frame-major ([T, C]) per stem.
+
+    Only the selected stems are kept, optionally quantized to int16 or
+    packed 24-bit integers, so each stem can be handed to the encoder in
+    blocks without a transpose copy.
+    """
+
+    def __init__(self, frames: int, channels: int, stems: Sequence[str],
+                 dtype: str = 'int16'):
+        if dtype not in SUPPORTED_DTYPES:
+            raise ValueError(f"Unsupported buffer dtype: {dtype}")
+        self.frames = frames
+        self.channels = channels
+        self.dtype = dtype
+        self.stems: Dict[str, np.ndarray] = {
+            stem: self._allocate(frames, channels, dtype) for stem in stems
+        }
+
+    @classmethod
+    def from_sources(cls, sources: torch.Tensor, stem_names: Sequence[str],
+                     stems: Optional[Sequence[str]] = None,
+                     dtype: str = 'int16') -> 'StemBuffer':
+        """
+        Build a buffer from one input's [S, C, T] separation output.
+
+        Args:
+            sources: Separated sources of a single input
+            stem_names: Stem name of each source, in model order
+            stems: Stems to keep, all by default
+            dtype: Storage type, one of SUPPORTED_DTYPES
+
+        Returns:
+            StemBuffer holding the selected stems
+        """
+        stems = list(stems) if stems is not None else list(stem_names)
+        _, channels, frames = sources.shape
+        buffer = cls(frames, channels, stems, dtype)
+        for stem in stems:
+            source = sources[stem_names.index(stem)]
+            for start in range(0, frames, BLOCK_FRAMES):
+                end = min(start + BLOCK_FRAMES, frames)
+                buffer.set_frames(stem, start, source[:, start:end].T)
+        return buffer
+
+    @property
+    def nbytes(self) -> int:
+        """Total host memory held by the buffer."""
+        return sum(array.nbytes for array in self.stems.values())
+
+    def set_frames(self, stem: str, start: int, block):
+        """Store a [T, C] block of float samples starting at a frame offset."""
+        if isinstance(block, torch.Tensor):
+            block = block.detach().cpu().numpy()
+        block = np.asarray(block, dtype=np.float32)
+        end = start + block.shape[0]
+        target = self.stems[stem]
+        if self.dtype == 'int16':
+            target[start:end] = quantize_int16(block)
+        elif self.dtype == 'int24':
+            target[start:end] = pack_int24(block)
+        else:
+            target[start:end] = block
+
+    def blocks(self, stem: str, block_frames: int = BLOCK_FRAMES) -> Iterator[np.ndarray]:
+        """Yield a stem as contiguous [T, C] blocks ready for soundfile."""
+        array = self.stems[stem]
+        for start in range(0, self.frames, block_frames):
+            block = array[start:start + block_frames]
+            yield unpack_int24(block) if self.dtype == 'int24' else block
+
+    def to_float(self, stem: str) -> np.ndarray:
+        """Get a stem as a [T, C] float32 array."""
+        array = self.stems[stem]
+        if self.dtype == 'int16':
+            return array.astype(np.float32) / _INT16_SCALE
+        if self.dtype == 'int24':
+            return unpack_int24(array).astype(np.float32) / (_INT24_SCALE * 256)
+        return array
+
+    def write(self, stem: str, path: str, sample_rate: int,
+              subtype: Optional[str] = None):
+        """Stream one stem to a temporary file block by block, then move it into place."""
+        subtype = subtype or DEFAULT_SUBTYPES[self.dtype]
+        partial_path = FileHandler.partial_path(path)
+        try:
+            with sf.SoundFile(partial_path, 'w', samplerate=sample_rate,
+                              channels=self.channels, subtype=subtype) as f:
+                for block in self.blocks(stem):
+                    f.write(block)
+            os.replace(partial_path, path)
+        except BaseException:
+            Path(partial_path).unlink(missing_ok=True)
+            raise
+
+    @staticmethod
+    def _allocate(frames: int, channels: int, dtype: str) -> np.ndarray:
+        """Allocate storage for one stem."""
+        if dtype == 'int24':
+            return np.empty((frames, channels, 3), dtype=np.uint8)
+        return np.empty((frames, channels), dtype=np.dtype(dtype))
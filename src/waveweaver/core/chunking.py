@@ -0,0 +1,92 @@
+"""
+Chunked inference over long mixtures with crossfaded chunk boundaries.
+"""
+
+from typing import Iterator, List, Optional, Tuple
+
+import torch
+
+from .segment_cache import Segment, plan_segments
+
+
+# Longest chunk separated at once when streaming output to files
+STREAM_CHUNK_SECONDS = 60.0
+
+
+def plan_chunks(length: int, chunk_frames: Optional[int],
+                overlap_frames: int) -> List[Segment]:
+    """
+    Split a mixture into chunks that overlap their neighbours.
+
+    Each chunk owns ``chunk_frames`` frames and extends ``overlap_frames // 2``
+    into each neighbour, so consecutive chunks share ``overlap_frames`` frames
+    that are crossfaded when stitching.
+
+    Args:
+        length: Total number of frames
+        chunk_frames: Frames owned by each chunk, None for a single chunk
+        overlap_frames: Frames shared by two consecutive chunks
+
+    Returns:
+        Chunks covering the whole mixture in order
+    """
+    if not chunk_frames or chunk_frames >= length:
+        return plan_segments(length, max(length, 1), 0)
+    margin = min(overlap_frames // 2, chunk_frames // 2)
+    return plan_segments(length, chunk_frames, margin)
+
+
+class ChunkStitcher:
+    """
+    Joins separated chunks with linear crossfades over their overlaps.
+
+    Chunks must be added in order. Frames are released as soon as no later
+    chunk can change them, so output can be streamed while later chunks
+    are still being separated.
+    """
+
+    def __init__(self, chunks: List[Segment]):
+        self.chunks = chunks
+        self._pending: Optional[torch.Tensor] = None
+
+    def add(self, chunk: Segment, output: torch.Tensor) -> Iterator[Tuple[int, torch.Tensor]]:
+        """
+        Add the separated output of a chunk.
+
+        Args:
+            chunk: Chunk the output belongs to
+            output: Separated audio covering [chunk.start, chunk.end)
+
+        Yields:
+            Tuples of (start frame, finalized audio block)
+        """
+        start = chunk.start
+        if self._pending is not None:
+            overlap = self._pending.shape[-1]
+            ramp = (torch.arange(overlap, dtype=output.dtype, device=output.device) + 0.5) / overlap
+            blended = self._pending.to(output.device) * (1 - ramp) + output[..., :overlap] * ramp
+            yield start, blended
+            output = output[..., overlap:]
+            start += overlap
+            self._pending = None
+
+        is_last = chunk.index == len(self.chunks) - 1
+        if is_last:
+            if output.shape[-1]:
+                yield start, output
+            return
+
+        next_start = self.chunks[chunk.index + 1].start
+        held = next_start - start
+        if held > 0:
+            yield start, output[..., :held]
+        self._pending = output[..., held:]
+
+
+def stitch(chunks: List[Segment], outputs: List[torch.Tensor]) -> torch.Tensor:
+    """Stitch separated chunk outputs into one tensor."""
+    stitcher = ChunkStitcher(chunks)
+    blocks = []
+    for chunk, output in zip(chunks, outputs):
+        blocks.extend(block for _, block in stitcher.add(chunk, output))
+    return torch.cat(blocks, dim=-1)
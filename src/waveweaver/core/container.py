@@ -0,0 +1,110 @@
+"""
+Single-file output holding every stem of a track as a channel group.
+"""
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from .buffers import DEFAULT_SUBTYPES, StemBuffer
+from .sinks import StemFileSink
+from ..utils.file_handler import FileHandler
+
+
+# Stem name the container file is allocated under, so {stem} renders as "stems"
+CONTAINER_STEM = "stems"
+
+# Channel limit of the FLAC format
+FLAC_MAX_CHANNELS = 8
+
+# Prefix of the comment recording the stem of each channel group
+STEMS_COMMENT = "stems="
+
+
+def container_metadata(stems: Sequence[str]) -> Dict[str, str]:
+    """Get the file metadata naming the stems, in channel group order."""
+    return {'comment': STEMS_COMMENT + ",".join(stems)}
+
+
+def check_channels(path: str, stems: Sequence[str], channels: int):
+    """Raise ValueError if the container format can't hold every stem."""
+    total = len(stems) * channels
+    if Path(path).suffix.lower() == '.flac' and total > FLAC_MAX_CHANNELS:
+        raise ValueError(f"FLAC holds at most {FLAC_MAX_CHANNELS} channels, "
+                         f"{len(stems)} stems of {channels} need {total}; "
+                         "use a .wav name template")
+
+
+class StemContainerSink:
+    """
+    Streams the selected stems into one multichannel file.
+
+    Stem ``i`` takes channels ``[i * C, (i + 1) * C)``, and the file's
+    comment names the stems in that order. Writing, renaming and cleanup
+    work like :class:`StemFileSink`.
+    """
+
+    def __init__(self, path: str, stems: Sequence[str], stem_names: Sequence[str],
+                 sample_rate: int, channels: int, subtype: Optional[str] = None,
+                 queue_depth: int = 2):
+        check_channels(path, stems, channels)
+        self.path = path
+        self._indices = [list(stem_names).index(stem) for stem in stems]
+        self._sink = StemFileSink({CONTAINER_STEM: path}, [CONTAINER_STEM], sample_rate,
+                                  channels * len(stems), subtype, queue_depth,
+                                  metadata=container_metadata(stems))
+
+    def write(self, sources: torch.Tensor):
+        """Append a [S, C, T] block of separated sources in model order."""
+        selected = sources[self._indices]
+        self._sink.write(selected.reshape(1, -1, selected.shape[-1]))
+
+    def close(self) -> List[str]:
+        """Finish writing and move the file into place."""
+        return self._sink.close()
+
+    def abort(self):
+        """Stop writing and delete the partial file."""
+        self._sink.abort()
+
+
+def write_container(buffer: StemBuffer, stems: Sequence[str], path: str, sample_rate: int):
+    """Write the stems of a buffer as channel groups of one file, through a temporary file."""
+    check_channels(path, stems, buffer.channels)
+    partial_path = FileHandler.partial_path(path)
+    try:
+        with sf.SoundFile(partial_path, 'w', samplerate=sample_rate,
+                          channels=buffer.channels * len(stems),
+                          subtype=DEFAULT_SUBTYPES[buffer.dtype]) as f:
+            for key, value in container_metadata(stems).items():
+                setattr(f, key, value)
+            for blocks in zip(*(buffer.blocks(stem) for stem in stems)):
+                f.write(np.concatenate(blocks, axis=1))
+        os.replace(partial_path, path)
+    except BaseException:
+        Path(partial_path).unlink(missing_ok=True)
+        raise
+
+
+def read_container(path: str) -> Dict[str, np.ndarray]:
+    """
+    Split a container file back into its stems.
+
+    Returns:
+        A [T, C] float32 array per stem, in channel group order
+
+    Raises:
+        ValueError: If the file does not name its stems
+    """
+    with sf.SoundFile(path) as f:
+        comment = f.comment or ""
+        data = f.read(dtype='float32', always_2d=True)
+    if not comment.startswith(STEMS_COMMENT):
+        raise ValueError(f"{path} is not a stem container")
+    stems = comment[len(STEMS_COMMENT):].split(",")
+    channels = data.shape[1] // len(stems)
+    return {stem: data[:, i * channels:(i + 1) * channels] for i, stem in enumerate(stems)}
@@ -0,0 +1,499 @@
+"""
+Separation spread over worker processes on this or other machines.
+"""
+
+import os
+import socket
+import tempfile
+import threading
+import time
+from collections import deque
+from dataclasses import dataclass, field
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+from .journal import JobJournal, file_hash
+from .models import AudioFileInfo, ProcessingResult
+from .engine import SeparationEngine
+from .worker import create_engine
+from ..utils.file_handler import FileHandler
+from ..utils.naming import release_claims
+
+
+# Ways stems get back to the coordinator
+SHARED = 'shared'
+STREAM = 'stream'
+TRANSFERS = (SHARED, STREAM)
+
+DEFAULT_HEARTBEAT_SECONDS = 2.0
+DEFAULT_HEARTBEAT_TIMEOUT = 30.0
+
+# Times a job is sent out again after the worker holding it was lost
+DEFAULT_MAX_ATTEMPTS = 3
+
+# Bytes of a stem file sent per message when streaming
+CHUNK_BYTES = 4 * 1024 * 1024
+
+Address = Tuple[str, int]
+
+
+def parse_address(address: str) -> Address:
+    """
+    Parse a ``host:port`` address.
+
+    Raises:
+        ValueError: If the port is missing or not a number
+    """
+    host, separator, port = address.rpartition(':')
+    if not separator or not port.isdigit():
+        raise ValueError(f"Expected HOST:PORT, got {address}")
+    return host or 'localhost', int(port)
+
+
+@dataclass
+class DistributedJob:
+    """An input sent to a worker."""
+    job_id: int
+    input_file: str
+    duration: float
+    attempts: int = 0
+    # Content of the input when streaming, so workers don't need the file
+    data: Optional[bytes] = None
+    # Path of each stem relative to the output directory, allocated by the
+    # coordinator so inputs sharing a name never get the same path
+    outputs: Dict[str, str] = field(default_factory=dict)
+
+
+class _WorkerLink:
+    """Coordinator side of one worker connection."""
+
+    def __init__(self, connection, name: str):
+        self.connection = connection
+        self.name = name
+        self.jobs: Dict[int, DistributedJob] = {}
+        # Partial files of streamed stems, by job and relative path
+        self.receiving: Dict[Tuple[int, str], Any] = {}
+        self.send_lock = threading.Lock()
+
+    def send(self, message: Tuple[str, Any]):
+        with self.send_lock:
+            self.connection.send(message)
+
+
+class Coordinator:
+    """
+    Hands inputs out to connected workers and collects their stems.
+
+    Jobs go out longest first, each worker holding at most ``prefetch`` of
+    them, so faster workers pull more audio and the batch ends on short
+    files. Workers send heartbeats; one that disconnects or stays silent
+    past ``heartbeat_timeout`` is dropped and its jobs go back to the front
+    of the queue, up to ``max_attempts`` times. With a journal, the
+    coordinator is the only process recording progress, so an interrupted
+    batch resumes like a local one.
+
+    With ``SHARED`` transfer workers write straight into ``output_dir``,
+    which must be the same path on every machine. With ``STREAM`` inputs
+    and stems travel over the connection and only the coordinator needs
+    the files. Either way the coordinator names every output with one
+    namer for the whole run, from ``engine``, which is never loaded.
+    Messages are pickled, so the authkey must stay secret.
+    """
+
+    def __init__(self, address: Address, authkey: bytes, model_name: str,
+                 output_dir: str, stems: List[str], transfer: str = SHARED,
+                 journal: Optional[JobJournal] = None, parameters: Optional[Dict] = None,
+                 heartbeat_timeout: float = DEFAULT_HEARTBEAT_TIMEOUT,
+                 max_attempts: int = DEFAULT_MAX_ATTEMPTS, prefetch: int = 1,
+                 on_result: Optional[Callable[[ProcessingResult], None]] = None,
+                 on_worker: Optional[Callable[[str, str], None]] = None,
+                 engine: Optional[SeparationEngine] = None):
+        if transfer not in TRANSFERS:
+            raise ValueError(f"Transfer must be one of {', '.join(TRANSFERS)}")
+        if not authkey:
+            raise ValueError("Distributed separation needs an authkey")
+        self.model_name = model_name
+        self.engine = engine or create_engine(model_name)
+        self.output_dir = str(Path(output_dir).resolve())
+        self.stems = list(stems)
+        self.transfer = transfer
+        self.journal = journal
+        self.parameters = parameters or {}
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_attempts = max(1, max_attempts)
+        self.prefetch = max(1, prefetch)
+        self.on_result = on_result
+        self.on_worker = on_worker
+        self._authkey = authkey
+        self._listener = Listener(address, authkey=authkey)
+        self._condition = threading.Condition()
+        self._pending: deque = deque()
+        self._links: List[_WorkerLink] = []
+        self._results: List[ProcessingResult] = []
+        self._remaining = 0
+        self._accepting = False
+        self._closing = False
+
+    @property
+    def address(self) -> Address:
+        """Get the address workers connect to, with the port actually bound."""
+        return self._listener.address
+
+    def run(self, inputs: Sequence[AudioFileInfo]) -> List[ProcessingResult]:
+        """
+        Separate inputs on the workers connecting until every job is done.
+
+        Args:
+            inputs: Probed inputs, whose durations order the jobs
+
+        Returns:
+            One ProcessingResult per processed input, in completion order
+        """
+        inputs = self._unfinished(inputs)
+        namer = self.engine.create_namer(self.output_dir)
+        stems = self.engine.output_stems(self.stems)
+        jobs = []
+        for job_id, info in enumerate(inputs):
+            paths = self.engine.stem_paths(info.path, self.output_dir, stems, namer)
+            outputs = {stem: os.path.relpath(path, self.output_dir)
+                       for stem, path in paths.items()}
+            jobs.append(DistributedJob(job_id, info.path, info.duration, outputs=outputs))
+        jobs.sort(key=lambda job: job.duration, reverse=True)
+        with self._condition:
+            self._pending.extend(jobs)
+            self._remaining = len(jobs)
+
+        self._accepting = True
+        threading.Thread(target=self._accept, daemon=True).start()
+        try:
+            with self._condition:
+                self._condition.wait_for(lambda: self._remaining == 0)
+                return list(self._results)
+        finally:
+            self.close()
+
+    def close(self):
+        """Stop every worker and the listener."""
+        with self._condition:
+            if self._closing:
+                return
+            self._closing = True
+            links = list(self._links)
+        for link in links:
+            try:
+                link.send(('stop', None))
+            except (OSError, ValueError):
+                pass
+        if self._accepting:
+            # Wake the thread blocked accepting connections
+            try:
+                Client(self.address, authkey=self._authkey).close()
+            except (OSError, EOFError, AuthenticationError):
+                pass
+        self._listener.close()
+
+    def _unfinished(self, inputs: Sequence[AudioFileInfo]) -> List[AudioFileInfo]:
+        """Record the inputs in the journal and drop those already separated."""
+        if self.journal is None:
+            return list(inputs)
+        self.journal.recover()
+        remaining = []
+        for info in inputs:
+            try:
+                input_hash = file_hash(info.path)
+            except OSError:
+                input_hash = ''
+            if not self.journal.is_done(info.path, self.parameters, input_hash):
+                self.journal.queue(info.path, self.parameters, input_hash)
+                remaining.append(info)
+        return remaining
+
+    def _accept(self):
+        """Accept workers until closed, serving each from its own thread."""
+        while True:
+            try:
+                connection = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._closing:
+                    return
+                continue
+            if self._closing:
+                connection.close()
+                return
+            threading.Thread(target=self._serve, args=(connection,), daemon=True).start()
+
+    def _serve(self, connection):
+        """Exchange messages with one worker until it stops or is lost."""
+        link = None
+        try:
+            if not connection.poll(self.heartbeat_timeout):
+                return
+            kind, hello = connection.recv()
+            if kind != 'hello':
+                return
+            link = _WorkerLink(connection, hello.get('name', 'worker'))
+            with self._condition:
+                self._links.append(link)
+            self._notify(link.name, 'joined')
+            link.send(('config', {
+                'model': self.model_name,
+                'stems': self.stems,
+                'output_dir': self.output_dir,
+                'transfer': self.transfer,
+            }))
+            self._dispatch(link)
+            while connection.poll(self.heartbeat_timeout):
+                kind, payload = connection.recv()
+                if kind == 'chunk':
+                    self._receive_chunk(link, *payload)
+                elif kind == 'result':
+                    self._finish(link, *payload)
+                self._dispatch(link)
+        except (OSError, EOFError, ValueError):
+            pass
+        finally:
+            connection.close()
+            if link is not None:
+                self._drop(link)
+
+    def _dispatch(self, link: _WorkerLink):
+        """Send a worker jobs until it holds as many as it may."""
+        while True:
+            with self._condition:
+                if self._closing or len(link.jobs) >= self.prefetch or not self._pending:
+                    return
+                job = self._pending.popleft()
+                job.attempts += 1
+                link.jobs[job.job_id] = job
+            if self.transfer == STREAM:
+                try:
+                    job.data = Path(job.input_file).read_bytes()
+                except OSError as e:
+                    self._finish(link, job.job_id, ProcessingResult(
+                        success=False, output_files=[], error_message=str(e),
+                        input_file=job.input_file))
+                    continue
+            if self.journal is not None:
+                # Recorded before any stem exists, so recover() can clean up after a crash
+                self.journal.start_writing(job.input_file, self.parameters,
+                                           [str(self._target_path(rel))
+                                            for rel in job.outputs.values()])
+            try:
+                link.send(('job', job))
+            finally:
+                job.data = None
+
+    def _target_path(self, relative_path: str) -> Path:
+        """Get where a stem goes, refusing paths leaving the output directory."""
+        root = Path(self.output_dir)
+        path = (root / relative_path).resolve()
+        if root not in path.parents:
+            raise ValueError(f"Stem path {relative_path} is outside the output directory")
+        return path
+
+    def _receive_chunk(self, link: _WorkerLink, job_id: int, relative_path: str, data: bytes):
+        """Append a piece of a streamed stem to its partial file."""
+        key = (job_id, relative_path)
+        f = link.receiving.get(key)
+        if f is None:
+            path = self._target_path(relative_path)
+            path.parent.mkdir(parents=True, exist_ok=True)
+            f = link.receiving[key] = open(FileHandler.partial_path(str(path)), 'wb')
+        f.write(data)
+
+    def _finish(self, link: _WorkerLink, job_id: int, result: ProcessingResult):
+        """Record the result of a job, moving its streamed stems into place."""
+        job = link.jobs.get(job_id)
+        if job is None:
+            return
+        if self.transfer == STREAM:
+            output_files = []
+            for key in [key for key in link.receiving if key[0] == job_id]:
+                f = link.receiving.pop(key)
+                f.close()
+                path = str(self._target_path(key[1]))
+                if result.success:
+                    os.replace(FileHandler.partial_path(path), path)
+                    output_files.append(path)
+                else:
+                    Path(FileHandler.partial_path(path)).unlink(missing_ok=True)
+            result.output_files = output_files
+        result.input_file = job.input_file
+        self._complete(link, job, result)
+
+    def _complete(self, link: Optional[_WorkerLink], job: DistributedJob,
+                  result: ProcessingResult):
+        """Count a job as done."""
+        if not result.success and self.engine.keep_existing:
+            # Free the paths claimed for stems that were not written
+            release_claims(str(self._target_path(rel)) for rel in job.outputs.values())
+        if self.journal is not None:
+            self.journal.finish(job.input_file, self.parameters, result)
+        with self._condition:
+            if link is not None:
+                link.jobs.pop(job.job_id, None)
+            self._results.append(result)
+            self._remaining -= 1
+            self._condition.notify_all()
+        if self.on_result:
+            self.on_result(result)
+
+    def _drop(self, link: _WorkerLink):
+        """Forget a lost worker and queue its jobs again."""
+        for f in link.receiving.values():
+            f.close()
+            Path(f.name).unlink(missing_ok=True)
+        link.receiving.clear()
+        with self._condition:
+            if link in self._links:
+                self._links.remove(link)
+            jobs = sorted(link.jobs.values(), key=lambda job: job.duration)
+            link.jobs.clear()
+            failed = [job for job in jobs if job.attempts >= self.max_attempts]
+            for job in jobs:
+                if job not in failed:
+                    self._pending.appendleft(job)
+            closing = self._closing
+        for job in failed:
+            self._complete(None, job, ProcessingResult(
+                success=False, output_files=[], input_file=job.input_file,
+                error_message=f"Lost {job.attempts} workers while separating"))
+        if not closing:
+            self._notify(link.name, f"lost, {len(jobs)} jobs queued again" if jobs else "left")
+
+    def _notify(self, name: str, event: str):
+        if self.on_worker:
+            self.on_worker(name, event)
+
+
+class DistributedWorker:
+    """
+    Separates the jobs a coordinator sends, keeping the model loaded.
+
+    A background thread sends a heartbeat every ``heartbeat_interval``
+    seconds, including while a job is being separated.
+    """
+
+    def __init__(self, address: Address, authkey: bytes,
+                 engine_factory: Callable[[str], Any] = create_engine,
+                 name: Optional[str] = None,
+                 heartbeat_interval: float = DEFAULT_HEARTBEAT_SECONDS,
+                 separate_options: Optional[Dict[str, Any]] = None):
+        self.address = address
+        self.authkey = authkey
+        self.engine_factory = engine_factory
+        self.name = name or f"{socket.gethostname()}:{os.getpid()}"
+        self.heartbeat_interval = heartbeat_interval
+        self.separate_options = separate_options or {}
+        self.jobs_done = 0
+        self._connection = None
+        self._send_lock = threading.Lock()
+
+    def serve(self, connect_timeout: float = 0.0) -> int:
+        """
+        Connect to the coordinator and separate jobs until it stops.
+
+        Args:
+            connect_timeout: Seconds to keep retrying while the coordinator
+                is not listening yet
+
+        Returns:
+            Number of jobs handled
+        """
+        self._connection = self._connect(connect_timeout)
+        stopped = threading.Event()
+        try:
+            self._send(('hello', {'name': self.name}))
+            kind, config = self._connection.recv()
+            engine = self.engine_factory(config['model'])
+            threading.Thread(target=self._heartbeat, args=(stopped,), daemon=True).start()
+            while True:
+                kind, job = self._connection.recv()
+                if kind == 'stop':
+                    break
+                if kind == 'job':
+                    self._run(engine, config, job)
+                    self.jobs_done += 1
+        except (EOFError, OSError):
+            # The coordinator went away
+            pass
+        finally:
+            stopped.set()
+            self._connection.close()
+        return self.jobs_done
+
+    def _connect(self, timeout: float):
+        """Open the connection, retrying until the timeout."""
+        deadline = time.monotonic() + timeout
+        while True:
+            try:
+                return Client(self.address, authkey=self.authkey)
+            except ConnectionRefusedError:
+                if time.monotonic() >= deadline:
+                    raise
+                time.sleep(0.2)
+
+    def _send(self, message: Tuple[str, Any]):
+        with self._send_lock:
+            self._connection.send(message)
+
+    def _heartbeat(self, stopped: threading.Event):
+        while not stopped.wait(self.heartbeat_interval):
+            try:
+                self._send(('heartbeat', None))
+            except (OSError, ValueError):
+                return
+
+    def _run(self, engine, config: Dict[str, Any], job: DistributedJob):
+        """Separate one job and send back its result."""
+        if config['transfer'] != STREAM:
+            result = self._separate(engine, job.input_file, config['output_dir'],
+                                    config['stems'], job.outputs)
+        else:
+            with tempfile.TemporaryDirectory(prefix='waveweaver-') as work_dir:
+                input_file = os.path.join(work_dir, Path(job.input_file).name)
+                with open(input_file, 'wb') as f:
+                    f.write(job.data)
+                output_dir = os.path.join(work_dir, 'stems')
+                result = self._separate(engine, input_file, output_dir, config['stems'],
+                                        job.outputs)
+                if result.success:
+                    result.output_files = self._stream(job.job_id, output_dir,
+                                                       result.output_files)
+        result.input_file = job.input_file
+        self._send(('result', (job.job_id, result)))
+
+    def _separate(self, engine, input_file: str, output_dir: str, stems: List[str],
+                  outputs: Dict[str, str]) -> ProcessingResult:
+        """Separate one file with the engine, turning errors into a failed result."""
+        try:
+            # Write the stems where the coordinator allocated them
+            namer = engine.create_namer(output_dir)
+            namer.assign(input_file, {stem: os.path.join(output_dir, relative_path)
+                                      for stem, relative_path in outputs.items()})
+            results = engine.separate_files([input_file], output_dir, stems, namer=namer,
+                                            **self.separate_options)
+        except Exception as e:
+            return ProcessingResult(success=False, output_files=[], error_message=str(e))
+        if not results:
+            return ProcessingResult(success=False, output_files=[],
+                                    error_message="Nothing was separated")
+        return results[0]
+
+    def _stream(self, job_id: int, output_dir: str, output_files: List[str]) -> List[str]:
+        """Send stem files in chunks, returning their paths relative to the output directory."""
+        relative_paths = []
+        for path in output_files:
+            relative_path = os.path.relpath(path, output_dir)
+            with open(path, 'rb') as f:
+                # An empty file still takes one chunk, so it gets created
+                data = f.read(CHUNK_BYTES)
+                while True:
+                    self._send(('chunk', (job_id, relative_path, data)))
+                    if len(data) < CHUNK_BYTES:
+                        break
+                    data = f.read(CHUNK_BYTES)
+            relative_paths.append(relative_path)
+        return relative_paths
@@ -0,0 +1,768 @@
+"""
+Qt-independent separation engine shared by the GUI thread and batch jobs.
+"""
+
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+import torch
+import soundfile as sf
+
+from demucs.apply import apply_model
+from demucs.audio import AudioFile
+from demucs.pretrained import get_model
+
+from .buffers import DEFAULT_SUBTYPES, StemBuffer
+from .batching import (
+    DEFAULT_MAX_BATCH_SIZE,
+    DEFAULT_MAX_CLIP_SECONDS,
+    pack_batch,
+    plan_batches,
+    unpack_batch,
+)
+from .chunking import STREAM_CHUNK_SECONDS, ChunkStitcher, plan_chunks, stitch
+from .container import CONTAINER_STEM, StemContainerSink, write_container
+from .journal import JobJournal, file_hash
+from .memory import choose_chunk_frames, free_device_memory, is_out_of_memory
+from .models import AudioFileInfo, AvailableModels, ProcessingResult
+from .pcm_cache import PcmCache
+from .pipeline import SeparationPipeline, plan_units
+from .postprocess import PostProcessor
+from .segment_cache import SegmentCache, model_segment_seconds
+from .shards import ShardWriter
+from .shared_weights import SharedWeights
+from .silence import SilenceGate
+from .sinks import StemFileSink
+from .transfer import DeviceTransfer, PendingTransfer
+from ..utils.naming import DEFAULT_NAME_TEMPLATE, OutputNamer, release_claims
+
+
+def read_audio_info(input_file: str) -> AudioFileInfo:
+    """Get information about an audio file, with defaults if it can't be read."""
+    try:
+        info = sf.info(input_file)
+        return AudioFileInfo(
+            path=input_file,
+            duration=info.duration,
+            sample_rate=info.samplerate,
+            channels=info.channels,
+            format=info.format
+        )
+    except Exception:
+        return AudioFileInfo(
+            path=input_file,
+            duration=0,
+            sample_rate=44100,
+            channels=2,
+            format="unknown"
+        )
+
+
+class ModelCache:
+    """
+    Keeps recently used models loaded so consecutive jobs skip loading.
+
+    With ``shared_weights``, models loaded on the CPU read their weights from
+    files mapped by every process using the same directory.
+    """
+
+    def __init__(self, max_models: int = 1, shared_weights: Optional[SharedWeights] = None):
+        self.max_models = max(1, max_models)
+        self.shared_weights = shared_weights
+        self._models: "OrderedDict[Tuple[str, str], torch.nn.Module]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, device: str):
+        """Get a model loaded on the given device, loading it if needed."""
+        key = (model_name, device)
+        with self._lock:
+            model = self._models.get(key)
+            if model is not None:
+                self._models.move_to_end(key)
+                return model
+
+        model_info = AvailableModels.get_model(model_name)
+        if model_info is not None and model_info.repo:
+            model = get_model(model_name, repo=Path(model_info.repo))
+        else:
+            model = get_model(model_name)
+        model.to(device)
+        model.eval()
+        if self.shared_weights is not None and torch.device(device).type == 'cpu':
+            model = self.shared_weights.attach(model_name, model)
+
+        with self._lock:
+            self._models[key] = model
+            while len(self._models) > self.max_models:
+                self._models.popitem(last=False)
+        return model
+
+    def reserve(self, count: int):
+        """Make room for at least count models to stay loaded together."""
+        with self._lock:
+            self.max_models = max(self.max_models, count)
+
+    def clear(self):
+        """Drop all cached models."""
+        with self._lock:
+            self._models.clear()
+
+
+# Shared by every engine in the process unless one is given explicitly
+default_model_cache = ModelCache()
+
+
+class SeparationEngine:
+    """Loads a Demucs model once and runs separation jobs with it."""
+
+    def __init__(self, model_name: str, shifts: int = 2,
+                 device: Optional[str] = None,
+                 segment_cache: Optional[SegmentCache] = None,
+                 model_cache: Optional[ModelCache] = None,
+                 overlap: float = 0.25,
+                 buffer_dtype: str = 'int16',
+                 postprocess: Optional[PostProcessor] = None,
+                 name_template: str = DEFAULT_NAME_TEMPLATE,
+                 keep_existing: bool = False,
+                 silence_gate: Optional[SilenceGate] = None,
+                 pcm_cache: Optional[PcmCache] = None,
+                 single_file: bool = False,
+                 segment: Optional[float] = None):
+        self.model_name = model_name
+        self.shifts = shifts
+        self.overlap = overlap
+        self.device = device or ('cuda' if torch.cuda.is_available() else 'cpu')
+        self.segment_cache = segment_cache
+        self.model_cache = model_cache or default_model_cache
+        self.buffer_dtype = buffer_dtype
+        self.postprocess = postprocess
+        self.name_template = name_template
+        self.keep_existing = keep_existing
+        self.silence_gate = silence_gate
+        self.pcm_cache = pcm_cache
+        self.single_file = single_file
+        # Seconds of audio per model pass, the model's own length if None
+        self.segment = segment
+        self.fell_back_to_cpu = False
+        self.transfer_time = 0.0
+        self.frames_total = 0
+        self.frames_skipped = 0
+        self._model = None
+        # Namers of running batches, keyed by output directory
+        self._batch_namers: Dict[str, OutputNamer] = {}
+
+    @classmethod
+    def from_settings(cls, settings, model_name: str, **overrides) -> 'SeparationEngine':
+        """Create an engine configured from application settings."""
+        performance = settings.performance
+        options = cls._settings_options(settings)
+        # Configured device, else the configuration measured by `waveweaver tune`
+        tuned = settings.tuned_profile(model_name)
+        device = cls._usable_device(performance.device or tuned.get('device'))
+        if device:
+            options['device'] = device
+        if tuned.get('segment'):
+            options['segment'] = tuned['segment']
+        options.update(overrides)
+        engine = cls(model_name, **options)
+        threads = performance.cpu_threads or tuned.get('cpu_threads', 0)
+        if threads and engine.device == 'cpu':
+            torch.set_num_threads(threads)
+        return engine
+
+    @staticmethod
+    def _settings_options(settings) -> Dict[str, Any]:
+        """Get the engine options set by application settings, whatever the model."""
+        performance = settings.performance
+        options = {
+            'shifts': settings.model.shifts,
+            'buffer_dtype': performance.buffer_dtype,
+            'name_template': settings.output.name_template,
+            'keep_existing': settings.output.keep_existing,
+            'single_file': settings.output.single_file,
+        }
+        if performance.segment_cache_dir:
+            options['segment_cache'] = SegmentCache(performance.segment_cache_dir)
+        if performance.pcm_cache_dir:
+            options['pcm_cache'] = PcmCache(performance.pcm_cache_dir,
+                                            performance.pcm_cache_max_mb * 1024 * 1024)
+        if performance.shared_weights_dir and default_model_cache.shared_weights is None:
+            # Every engine of the process shares the default cache
+            default_model_cache.shared_weights = SharedWeights(performance.shared_weights_dir)
+        postprocess = PostProcessor.from_settings(settings.postprocess)
+        if postprocess is not None:
+            options['postprocess'] = postprocess
+        silence_gate = SilenceGate.from_settings(performance)
+        if silence_gate is not None:
+            options['silence_gate'] = silence_gate
+        return options
+
+    @staticmethod
+    def _usable_device(device: Optional[str]) -> Optional[str]:
+        """Get a device if this machine can use it, None otherwise."""
+        if device and (not device.startswith('cuda') or torch.cuda.is_available()):
+            return device
+        return None
+
+    @property
+    def model(self):
+        """Get the loaded model, loading it on first use."""
+        if self._model is None:
+            self.load_model()
+        return self._model
+
+    @property
+    def model_stems(self) -> List[str]:
+        """Get the stem name of each model source, in model order."""
+        return AvailableModels.get_model(self.model_name).stems
+
+    @property
+    def stem_names(self) -> List[str]:
+        """Get the name of each output source, including post-processed stems."""
+        if self.postprocess is None:
+            return self.model_stems
+        return self.model_stems + self.postprocess.extra_stems
+
+    def output_stems(self, stems: Sequence[str]) -> List[str]:
+        """Get the stems saved for a selection, adding post-processed stems."""
+        if self.postprocess is None:
+            return list(stems)
+        return self.postprocess.output_stems(stems)
+
+    def load_model(self):
+        """Load the Demucs model onto the engine device."""
+        self._model = self.model_cache.get(self.model_name, self.device)
+        return self._model
+
+    def estimate_seconds(self, duration: float) -> float:
+        """Estimate the time to separate audio of a duration, 0 if the model cost is unknown.
+
+        Registry costs are measured for a single pass, each shift adds one.
+        """
+        model_info = AvailableModels.get_model(self.model_name)
+        if model_info is None:
+            return 0.0
+        return duration * model_info.real_time_factor(self.device) * max(1, self.shifts)
+
+    def get_device_name(self) -> str:
+        """Get the processing device name."""
+        if self.device.startswith('cuda'):
+            gpu_name = torch.cuda.get_device_name(torch.device(self.device))
+            return f'GPU - {gpu_name}'
+        else:
+            return 'CPU'
+
+    def load_audio(self, input_file: str) -> Tuple[torch.Tensor, int]:
+        """Load and prepare audio for processing."""
+        if self.pcm_cache is not None:
+            wav, sample_rate = self.pcm_cache.read(input_file, self._decode_audio)
+        else:
+            wav, sample_rate = self._decode_audio(input_file)
+
+        if wav.dim() == 1:
+            wav = wav.unsqueeze(0)
+
+        return wav, sample_rate
+
+    @staticmethod
+    def _decode_audio(input_file: str) -> Tuple[torch.Tensor, int]:
+        """Decode a whole file at its own sample rate."""
+        audio_file = AudioFile(input_file)
+        return audio_file.read(), audio_file.samplerate()
+
+    def load_audio_range(self, input_file: str, start: float,
+                         duration: float) -> Tuple[torch.Tensor, int]:
+        """Load only the [start, start + duration) seconds of an audio file."""
+        try:
+            info = sf.info(input_file)
+            start_frame = int(start * info.samplerate)
+            frames = int(duration * info.samplerate)
+            data, sample_rate = sf.read(input_file, start=start_frame, frames=frames,
+                                        dtype='float32', always_2d=True)
+            wav = torch.from_numpy(data.T.copy())
+        except Exception:
+            # Formats libsndfile can't seek in are decoded by ffmpeg from the offset
+            audio_file = AudioFile(input_file)
+            wav = audio_file.read(seek_time=start, duration=duration)
+            sample_rate = audio_file.samplerate()
+
+        if wav.dim() == 2:
+            wav = wav.unsqueeze(0)
+
+        return wav, sample_rate
+
+    def separate(self, wav: torch.Tensor, shifts: Optional[int] = None,
+                 overlap: Optional[float] = None, use_cache: bool = True,
+                 sample_rate: Optional[int] = None) -> torch.Tensor:
+        """
+        Apply the model to a [B, C, T] mixture and return [B, S, C, T] stems.
+
+        ``sample_rate`` is that of the mixture, the model's if None.
+        """
+        shifts = self.shifts if shifts is None else shifts
+        overlap = self.overlap if overlap is None else overlap
+        self._reset_metrics()
+
+        def apply(mix: torch.Tensor) -> torch.Tensor:
+            return self._apply(mix, shifts, overlap, postprocess=False, sample_rate=sample_rate)
+
+        if use_cache and self.segment_cache is not None and wav.shape[0] == 1:
+            params = f"{self.model_name}|shifts={shifts}|overlap={overlap}"
+            if self.segment:
+                params += f"|segment={self.segment}"
+            sources = self._process_chunk(
+                wav, self.segment_cache.separate(wav, apply, self.model, params))
+        else:
+            sources = self._apply(wav, shifts, overlap, sample_rate=sample_rate)
+        return self._process_track(sources)
+
+    def _apply(self, wav: torch.Tensor, shifts: Optional[int] = None,
+               overlap: Optional[float] = None, postprocess: bool = True,
+               sample_rate: Optional[int] = None) -> torch.Tensor:
+        """Run the model over a whole mixture."""
+        blocks = [block for _, block in self.iter_apply(wav, shifts, overlap,
+                                                        postprocess=postprocess,
+                                                        sample_rate=sample_rate)]
+        return torch.cat(blocks, dim=-1)
+
+    @property
+    def compute_saved(self) -> float:
+        """Get the fraction of the last job's audio skipped as silence."""
+        return self.frames_skipped / self.frames_total if self.frames_total else 0.0
+
+    def iter_apply(self, wav: torch.Tensor, shifts: Optional[int] = None,
+                   overlap: Optional[float] = None,
+                   max_chunk_frames: Optional[int] = None,
+                   postprocess: bool = True,
+                   sample_rate: Optional[int] = None) -> Iterator[Tuple[int, torch.Tensor]]:
+        """
+        Run the model over the active spans of a [B, C, T] mixture.
+
+        With a silence gate, silent regions are not separated: their stems
+        are filled with zeros and counted in ``compute_saved``.
+
+        Args:
+            wav: Mixture to separate
+            shifts: Number of random shifts, engine default if None
+            overlap: Model segment overlap, engine default if None
+            max_chunk_frames: Upper bound on the chunk size, None for none
+            postprocess: Whether to apply the per-chunk post-processing
+            sample_rate: Sample rate of the mixture, which times the silence
+                gate; the model's if None
+
+        Yields:
+            Tuples of (start frame, [B, S, C, T] output block on the CPU)
+        """
+        length = wav.shape[-1]
+        if self.silence_gate is None:
+            spans = [(0, length)]
+        else:
+            sample_rate = sample_rate or int(getattr(self.model, 'samplerate', 44100))
+            spans = self.silence_gate.active_spans(wav, sample_rate)
+        self.frames_total += length
+        self.frames_skipped += length - sum(end - start for start, end in spans)
+
+        position = 0
+        for start, end in spans + [(length, length)]:
+            # Silent gap before the span
+            step = max_chunk_frames or max(start - position, 1)
+            for gap_start in range(position, start, step):
+                gap_end = min(gap_start + step, start)
+                mix = wav[..., gap_start:gap_end]
+                output = mix.new_zeros(mix.shape[0], len(self.model_stems), *mix.shape[1:])
+                yield gap_start, self._process_chunk(mix, output) if postprocess else output
+            if end > start:
+                for offset, block in self._iter_chunks(wav[..., start:end], shifts, overlap,
+                                                       max_chunk_frames, postprocess):
+                    yield start + offset, block
+            position = end
+
+    def _iter_chunks(self, wav: torch.Tensor, shifts: Optional[int] = None,
+                     overlap: Optional[float] = None,
+                     max_chunk_frames: Optional[int] = None,
+                     postprocess: bool = True) -> Iterator[Tuple[int, torch.Tensor]]:
+        """
+        Run the model chunk by chunk over a [B, C, T] mixture.
+
+        Chunks are sized to fit the free device memory. A chunk that still
+        runs out of memory is split in halves, and once halves get too small
+        the rest of the mixture is separated on the CPU. Host <-> device
+        copies of neighbouring chunks overlap the forward pass, and their
+        duration is added to ``transfer_time``.
+
+        Args:
+            wav: Mixture to separate
+            shifts: Number of random shifts, engine default if None
+            overlap: Model segment overlap, engine default if None
+            max_chunk_frames: Upper bound on the chunk size, None for none
+            postprocess: Whether to apply the per-chunk post-processing
+
+        Yields:
+            Tuples of (start frame, [B, S, C, T] output block on the CPU)
+        """
+        shifts = self.shifts if shifts is None else shifts
+        overlap = self.overlap if overlap is None else overlap
+
+        device = self.device
+        chunk_frames = choose_chunk_frames(
+            self.model, free_device_memory(device),
+            channels=wav.shape[1], shifts=shifts, batch=wav.shape[0]
+        )
+        if chunk_frames == 0:
+            device, chunk_frames = 'cpu', None
+            self.fell_back_to_cpu = True
+        if max_chunk_frames:
+            chunk_frames = min(chunk_frames or max_chunk_frames, max_chunk_frames)
+
+        chunks = plan_chunks(wav.shape[-1], chunk_frames, self._chunk_overlap_frames(overlap))
+        stitcher = ChunkStitcher(chunks)
+        transfer = DeviceTransfer(device)
+
+        # Upload the next chunk and download the previous one while the
+        # current chunk is being separated
+        upcoming = transfer.upload(wav[..., chunks[0].start:chunks[0].end])
+        downloading = None
+        for index, chunk in enumerate(chunks):
+            mix = transfer.wait(upcoming)
+            if index + 1 < len(chunks):
+                following = wav[..., chunks[index + 1].start:chunks[index + 1].end]
+                upcoming = transfer.upload(following) if device != 'cpu' else PendingTransfer(following)
+
+            output, device = self._apply_span(mix, device, shifts, overlap)
+            if postprocess:
+                output = self._process_chunk(mix, output)
+            del mix
+
+            if downloading is not None:
+                yield from stitcher.add(chunks[index - 1], transfer.wait(downloading))
+            downloading = transfer.download(output)
+            del output
+
+        yield from stitcher.add(chunks[-1], transfer.wait(downloading))
+        self.transfer_time += transfer.elapsed()
+
+    def _apply_span(self, mix: torch.Tensor, device: str, shifts: int,
+                    overlap: float) -> Tuple[torch.Tensor, str]:
+        """Separate one chunk, shrinking it or moving to the CPU on OOM."""
+        try:
+            return self._run_model(mix, device, shifts, overlap), device
+        except RuntimeError as error:
+            if device == 'cpu' or not is_out_of_memory(error):
+                raise
+        # Free the failed attempt outside the except block, where the
+        # traceback no longer holds on to its tensors
+        self._release_device_memory()
+
+        length = mix.shape[-1]
+        if length >= 2 * self._min_chunk_frames():
+            halves = plan_chunks(length, (length + 1) // 2, self._chunk_overlap_frames(overlap))
+            outputs = []
+            for half in halves:
+                output, device = self._apply_span(mix[..., half.start:half.end],
+                                                  device, shifts, overlap)
+                outputs.append(output)
+            return stitch(halves, outputs), device
+
+        self.fell_back_to_cpu = True
+        return self._run_model(mix, 'cpu', shifts, overlap), 'cpu'
+
+    def _run_model(self, mix: torch.Tensor, device: str, shifts: int,
+                   overlap: float) -> torch.Tensor:
+        """Apply the model to a mixture, leaving the output on the device."""
+        return apply_model(
+            self.model,
+            mix.to(device),
+            device=device,
+            progress=False,
+            shifts=shifts,
+            overlap=overlap,
+            segment=self.segment
+        )
+
+    def _chunk_overlap_frames(self, overlap: float) -> int:
+        """Get the number of frames crossfaded between consecutive chunks."""
+        samplerate = int(getattr(self.model, 'samplerate', 44100))
+        return int(model_segment_seconds(self.model) * samplerate * overlap)
+
+    def _min_chunk_frames(self) -> int:
+        """Get the shortest chunk worth splitting further on OOM."""
+        samplerate = int(getattr(self.model, 'samplerate', 44100))
+        return int(model_segment_seconds(self.model) * samplerate)
+
+    def _process_chunk(self, mix: torch.Tensor, sources: torch.Tensor) -> torch.Tensor:
+        """Apply the per-chunk post-processing stages, on the output's device."""
+        if self.postprocess is None:
+            return sources
+        return self.postprocess.process_chunk(mix, sources, self.model_stems)
+
+    def _process_track(self, sources: torch.Tensor) -> torch.Tensor:
+        """Apply the post-processing stages that need the whole track."""
+        if self.postprocess is None:
+            return sources
+        return self.postprocess.process_track(sources)
+
+    def _reset_metrics(self):
+        """Clear per-job measurements before a new separation."""
+        self.fell_back_to_cpu = False
+        self.transfer_time = 0.0
+        self.frames_total = 0
+        self.frames_skipped = 0
+
+    @staticmethod
+    def _release_device_memory():
+        """Return cached device memory after a failed allocation."""
+        if torch.cuda.is_available():
+            torch.cuda.empty_cache()
+
+    def separate_to_buffer(self, wav: torch.Tensor, stems: List[str]) -> StemBuffer:
+        """Separate a [1, C, T] mixture and keep only the selected stems."""
+        return self.to_buffer(self.separate(wav), stems)
+
+    def to_buffer(self, sources: torch.Tensor, stems: List[str]) -> StemBuffer:
+        """Convert one input's [1, S, C, T] output into a compact stem buffer."""
+        return StemBuffer.from_sources(sources[0], self.stem_names, self.output_stems(stems),
+                                       dtype=self.buffer_dtype)
+
+    def separate_to_files(self, wav: torch.Tensor, sample_rate: int, input_file: str,
+                          output_dir: str, stems: List[str],
+                          is_cancelled: Optional[Callable[[], bool]] = None) -> List[str]:
+        """
+        Separate a [1, C, T] mixture while writing the stems to files.
+
+        Each chunk's output is appended to the stem files as soon as it is
+        final, so host memory does not grow with the track length. Partial
+        files are deleted if the job is cancelled or fails.
+
+        Args:
+            wav: Mixture to separate
+            sample_rate: Sample rate of the mixture
+            input_file: Input the stems are named after
+            output_dir: Directory receiving the stem folder
+            stems: Stems to save
+            is_cancelled: Polled between chunks to stop the job early
+
+        Returns:
+            Paths of the written stem files, empty if cancelled
+        """
+        self._reset_metrics()
+        stems = self.output_stems(stems)
+        paths = self.stem_paths(input_file, output_dir, stems)
+        subtype = DEFAULT_SUBTYPES[self.buffer_dtype]
+        try:
+            if self.single_file:
+                sink = StemContainerSink(paths[CONTAINER_STEM], stems, self.stem_names,
+                                         sample_rate, wav.shape[1], subtype=subtype)
+            else:
+                sink = StemFileSink(paths, self.stem_names, sample_rate, wav.shape[1],
+                                    subtype=subtype)
+        except BaseException:
+            self._release_paths(paths.values())
+            raise
+        try:
+            for _, sources in self._iter_sources(wav, int(STREAM_CHUNK_SECONDS * sample_rate),
+                                                 sample_rate):
+                if is_cancelled and is_cancelled():
+                    sink.abort()
+                    self._release_paths(paths.values())
+                    return []
+                sink.write(sources[0])
+        except BaseException:
+            sink.abort()
+            self._release_paths(paths.values())
+            raise
+        return sink.close()
+
+    def _iter_sources(self, wav: torch.Tensor, max_chunk_frames: int,
+                      sample_rate: int) -> Iterator[Tuple[int, torch.Tensor]]:
+        """Yield separated blocks, going through the segment cache when enabled."""
+        if self.segment_cache is not None or (self.postprocess and self.postprocess.needs_full_track):
+            sources = self.separate(wav, sample_rate=sample_rate)
+            for start in range(0, sources.shape[-1], max_chunk_frames):
+                yield start, sources[..., start:start + max_chunk_frames]
+        else:
+            yield from self.iter_apply(wav, max_chunk_frames=max_chunk_frames,
+                                       sample_rate=sample_rate)
+
+    def separate_batch(self, wavs: Sequence[torch.Tensor],
+                       sample_rate: Optional[int] = None) -> List[torch.Tensor]:
+        """Separate several short clips of one sample rate in a single forward pass."""
+        self._reset_metrics()
+        return [self._process_track(sources)
+                for sources in self._separate_batch(wavs, sample_rate)]
+
+    def _separate_batch(self, wavs: Sequence[torch.Tensor],
+                        sample_rate: Optional[int]) -> List[torch.Tensor]:
+        """Separate a batch, halving it until it fits in device memory."""
+        batch, lengths = pack_batch(wavs)
+        if len(wavs) == 1:
+            return unpack_batch(self._apply(batch, sample_rate=sample_rate), lengths)
+
+        try:
+            return unpack_batch(self._apply_whole(batch), lengths)
+        except RuntimeError as error:
+            if not is_out_of_memory(error):
+                raise
+        self._release_device_memory()
+
+        # Retry with two smaller batches
+        half = len(wavs) // 2
+        return (self._separate_batch(wavs[:half], sample_rate)
+                + self._separate_batch(wavs[half:], sample_rate))
+
+    def _apply_whole(self, batch: torch.Tensor) -> torch.Tensor:
+        """Separate a batch in one pass on the engine device."""
+        transfer = DeviceTransfer(self.device)
+        mix = transfer.wait(transfer.upload(batch))
+        output = self._process_chunk(mix, self._run_model(mix, self.device, self.shifts,
+                                                          self.overlap))
+        sources = transfer.wait(transfer.download(output))
+        self.transfer_time += transfer.elapsed()
+        return sources
+
+    def save_stems(self, buffer: StemBuffer, sample_rate: int, input_file: str,
+                   output_dir: str, stems: List[str],
+                   on_stem_saved: Optional[Callable[[int, int], None]] = None,
+                   is_cancelled: Optional[Callable[[], bool]] = None) -> List[str]:
+        """Save the separated stems of one input to files."""
+        stems = self.output_stems(stems)
+        paths = self.stem_paths(input_file, output_dir, stems)
+        output_files = []
+        if self.single_file:
+            try:
+                write_container(buffer, stems, paths[CONTAINER_STEM], sample_rate)
+            except BaseException:
+                self._release_paths(paths.values())
+                raise
+            if on_stem_saved:
+                on_stem_saved(1, 1)
+            return list(paths.values())
+        try:
+            for stem, output_file in paths.items():
+                if is_cancelled and is_cancelled():
+                    break
+
+                buffer.write(stem, output_file, sample_rate)
+
+                output_files.append(output_file)
+                if on_stem_saved:
+                    on_stem_saved(len(output_files), len(stems))
+        finally:
+            self._release_paths(path for path in paths.values() if path not in output_files)
+
+        return output_files
+
+    def stem_paths(self, input_file: str, output_dir: str, stems: List[str],
+                   namer: Optional[OutputNamer] = None) -> Dict[str, str]:
+        """
+        Create the output folder of an input and get the file path of each stem.
+
+        Paths come from the given namer, else from the namer of the running
+        batch, else from a new one. In single-file mode the only path is
+        that of the container, under CONTAINER_STEM.
+        """
+        namer = namer or self._batch_namers.get(str(Path(output_dir).resolve()))
+        if namer is None:
+            namer = self.create_namer(output_dir)
+        return namer.allocate(input_file, [CONTAINER_STEM] if self.single_file else stems)
+
+    def create_namer(self, output_dir: str) -> OutputNamer:
+        """Create the namer allocating output paths in a directory."""
+        return OutputNamer(output_dir, self.name_template, self.keep_existing,
+                           fields={'model': self.model_name})
+
+    def _release_paths(self, paths: Iterable[str]):
+        """Free output paths claimed for stems that were not written."""
+        if self.keep_existing:
+            release_claims(paths)
+
+    def separate_files(self, input_files: Sequence[str], output_dir: str,
+                       stems: List[str],
+                       max_clip_seconds: float = DEFAULT_MAX_CLIP_SECONDS,
+                       max_batch_size: int = DEFAULT_MAX_BATCH_SIZE,
+                       decoder_workers: int = 2,
+                       encoder_workers: int = 2,
+                       queue_depth: int = 2,
+                       on_result: Optional[Callable[[ProcessingResult], None]] = None,
+                       is_cancelled: Optional[Callable[[], bool]] = None,
+                       journal: Optional[JobJournal] = None,
+                       audio_infos: Optional[Sequence[AudioFileInfo]] = None,
+                       dataset: Optional[ShardWriter] = None,
+                       namer: Optional[OutputNamer] = None
+                       ) -> List[ProcessingResult]:
+        """
+        Separate a list of files, batching short clips together.
+
+        Decoding, inference and encoding of consecutive files overlap through
+        a :class:`SeparationPipeline`. With a journal, outputs of interrupted
+        jobs are deleted first and files already separated with the same
+        parameters are skipped.
+
+        Args:
+            input_files: Audio files to separate
+            output_dir: Directory receiving one stem folder per input
+            stems: Stems to save for every input
+            max_clip_seconds: Longest clip eligible for batching
+            max_batch_size: Maximum number of clips per forward pass
+            decoder_workers: Number of decoding threads
+            encoder_workers: Number of stem writing threads
+            queue_depth: Maximum number of units waiting between two stages
+            on_result: Called with each file's result as soon as it is saved
+            is_cancelled: Polled between files to stop the job early
+            journal: Journal recording the progress of every file
+            audio_infos: Already probed information about the inputs, read
+                from the files otherwise
+            dataset: Shard writer receiving the stems instead of one file
+                per stem; closing it is left to the caller
+            namer: Namer allocating the output paths, one is created for
+                the batch otherwise
+
+        Returns:
+            One ProcessingResult per processed input, in completion order
+        """
+        parameters = None
+        if journal is not None:
+            journal.recover()
+            parameters = self.job_parameters(output_dir, stems)
+            remaining = []
+            for path in input_files:
+                try:
+                    input_hash = file_hash(path)
+                except OSError:
+                    # Unreadable inputs are queued and fail while decoding
+                    input_hash = ''
+                if not journal.is_done(path, parameters, input_hash):
+                    journal.queue(path, parameters, input_hash)
+                    remaining.append(path)
+            input_files = remaining
+
+        known = {info.path: info for info in audio_infos or ()}
+        infos = [known.get(path) or read_audio_info(path) for path in input_files]
+        batches, singles = plan_batches(infos, max_clip_seconds, max_batch_size)
+        units = plan_units(batches, singles, input_files)
+
+        # Every input of the batch is named by one namer listing the output once
+        namer_key = str(Path(output_dir).resolve())
+        self._batch_namers[namer_key] = namer or self.create_namer(output_dir)
+        try:
+            pipeline = SeparationPipeline(self, decoder_workers, encoder_workers, queue_depth)
+            return pipeline.run(units, output_dir, stems, on_result, is_cancelled,
+                                journal, parameters, dataset)
+        finally:
+            del self._batch_namers[namer_key]
+
+    def job_parameters(self, output_dir: str, stems: List[str]) -> Dict:
+        """Get the settings that make two separations of a file interchangeable."""
+        return {
+            'model': self.model_name,
+            'shifts': self.shifts,
+            'overlap': self.overlap,
+            'segment': self.segment,
+            'buffer_dtype': self.buffer_dtype,
+            'postprocess': vars(self.postprocess) if self.postprocess else None,
+            'output_dir': str(Path(output_dir).resolve()),
+            'name_template': self.name_template,
+            'single_file': self.single_file,
+            'stems': self.output_stems(stems),
+        }
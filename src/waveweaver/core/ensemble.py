@@ -0,0 +1,262 @@
+"""
+Ensemble separation averaging the stems of several models.
+"""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Sequence
+
+import torch
+
+from .batching import pack_batch, unpack_batch
+from .engine import ModelCache, SeparationEngine, default_model_cache
+from .models import AvailableModels
+from .pcm_cache import PcmCache
+from .postprocess import PostProcessor
+from .segment_cache import SegmentCache
+from .silence import SilenceGate
+from ..utils.naming import DEFAULT_NAME_TEMPLATE
+
+
+@dataclass
+class EnsembleMember:
+    """A model taking part in an ensemble and the weight of its output."""
+    model_name: str
+    weight: float = 1.0
+    device: Optional[str] = None
+    segment: Optional[float] = None
+
+
+def parse_ensemble(spec: str) -> List[EnsembleMember]:
+    """
+    Parse an ensemble description such as ``htdemucs_ft:2,mdx_extra@cuda:1``.
+
+    Each comma-separated entry is a model key, optionally followed by
+    ``:weight`` and ``@device``.
+
+    Args:
+        spec: Ensemble description
+
+    Returns:
+        Members of the ensemble in order
+    """
+    members = []
+    for entry in spec.split(','):
+        entry = entry.strip()
+        if not entry:
+            continue
+        entry, _, device = entry.partition('@')
+        name, _, weight = entry.partition(':')
+        try:
+            members.append(EnsembleMember(name, float(weight) if weight else 1.0,
+                                          device or None))
+        except ValueError:
+            raise ValueError(f"Invalid weight for {name}: {weight}") from None
+    if not members:
+        raise ValueError("An ensemble needs at least one model")
+    return members
+
+
+def common_stems(model_names: Sequence[str]) -> List[str]:
+    """Get the stems every model produces, in the first model's order."""
+    infos = [AvailableModels.get_model(name) for name in model_names]
+    missing = [name for name, info in zip(model_names, infos) if info is None]
+    if missing:
+        raise ValueError(f"Unknown model: {', '.join(missing)}")
+    return [stem for stem in infos[0].stems if all(stem in info.stems for info in infos)]
+
+
+class EnsembleEngine(SeparationEngine):
+    """
+    Separates with several models and averages their stems.
+
+    The input is decoded once and the output written once. Every model adds
+    its weighted chunks in place into a single accumulator, so no full-length
+    copy of any model's output is kept. Models on different devices run in
+    parallel, models sharing a device run one after the other.
+    """
+
+    def __init__(self, members: Sequence[EnsembleMember], shifts: int = 2,
+                 device: Optional[str] = None,
+                 segment_cache: Optional[SegmentCache] = None,
+                 model_cache: Optional[ModelCache] = None,
+                 overlap: float = 0.25,
+                 buffer_dtype: str = 'int16',
+                 postprocess: Optional[PostProcessor] = None,
+                 name_template: str = DEFAULT_NAME_TEMPLATE,
+                 keep_existing: bool = False,
+                 silence_gate: Optional[SilenceGate] = None,
+                 pcm_cache: Optional[PcmCache] = None,
+                 single_file: bool = False,
+                 parallel: bool = True):
+        if isinstance(members, str):
+            members = parse_ensemble(members)
+        # Keep every member loaded between files. By default in a cache of the
+        # ensemble's own, so the models are released with it and the
+        # process-wide cache keeps its limit
+        if model_cache is None:
+            model_cache = ModelCache(len(members), default_model_cache.shared_weights)
+        else:
+            model_cache.reserve(len(members))
+        super().__init__('+'.join(member.model_name for member in members), shifts,
+                         device, segment_cache, model_cache, overlap, buffer_dtype,
+                         postprocess, name_template, keep_existing, silence_gate, pcm_cache,
+                         single_file)
+
+        self.members = list(members)
+        self.parallel = parallel
+        self._stems = common_stems([member.model_name for member in self.members])
+        if not self._stems:
+            raise ValueError("The ensemble models have no stems in common")
+
+        total_weight = sum(member.weight for member in self.members)
+        if total_weight <= 0:
+            raise ValueError("Ensemble weights must add up to a positive value")
+        self.weights = [member.weight / total_weight for member in self.members]
+        self.engines = [
+            SeparationEngine(member.model_name, shifts, member.device or self.device,
+                             segment_cache, model_cache, overlap, buffer_dtype,
+                             silence_gate=silence_gate, segment=member.segment)
+            for member in self.members
+        ]
+
+    @classmethod
+    def from_settings(cls, settings, members: Sequence[EnsembleMember],
+                      **overrides) -> 'EnsembleEngine':
+        """
+        Create an ensemble configured from application settings.
+
+        Tuned profiles are measured per model, so each member gets the device
+        and segment tuned for its own model. A device given in the ensemble
+        description or the settings takes precedence over the tuned one. Only
+        the configured CPU thread count is applied, since the members share
+        one process.
+        """
+        if isinstance(members, str):
+            members = parse_ensemble(members)
+        performance = settings.performance
+        tuned_members = []
+        for member in members:
+            tuned = settings.tuned_profile(member.model_name)
+            device = member.device or cls._usable_device(performance.device or tuned.get('device'))
+            tuned_members.append(replace(member, device=device,
+                                         segment=member.segment or tuned.get('segment')))
+        options = cls._settings_options(settings)
+        device = cls._usable_device(performance.device)
+        if device:
+            options['device'] = device
+        options.update(overrides)
+        engine = cls(tuned_members, **options)
+        if performance.cpu_threads and any(member.device == 'cpu' for member in engine.engines):
+            torch.set_num_threads(performance.cpu_threads)
+        return engine
+
+    @property
+    def model_stems(self) -> List[str]:
+        """Get the stems produced by every member, in output order."""
+        return self._stems
+
+    def load_model(self):
+        """Load every member model."""
+        models = [engine.load_model() for engine in self.engines]
+        self._model = models[0]
+        return self._model
+
+    def estimate_seconds(self, duration: float) -> float:
+        """Estimate the separation time, 0 if any member's cost is unknown."""
+        estimates = [engine.estimate_seconds(duration) for engine in self.engines]
+        if not all(estimates):
+            return 0.0
+        if self.parallel:
+            # Members on different devices overlap
+            per_device: Dict[str, float] = {}
+            for engine, estimate in zip(self.engines, estimates):
+                per_device[engine.device] = per_device.get(engine.device, 0.0) + estimate
+            return max(per_device.values())
+        return sum(estimates)
+
+    def get_device_name(self) -> str:
+        """Get the processing device names of the members."""
+        names: Dict[str, None] = {}
+        for engine in self.engines:
+            names[engine.get_device_name()] = None
+        return ', '.join(names)
+
+    def separate(self, wav: torch.Tensor, shifts: Optional[int] = None,
+                 overlap: Optional[float] = None, use_cache: bool = True,
+                 sample_rate: Optional[int] = None) -> torch.Tensor:
+        """Separate a [B, C, T] mixture with every member and average the stems."""
+        self._reset_metrics()
+        output = self._average(wav, shifts, overlap, use_cache, sample_rate)
+        return self._process_track(self._process_chunk(wav, output))
+
+    def separate_batch(self, wavs: Sequence[torch.Tensor],
+                       sample_rate: Optional[int] = None) -> List[torch.Tensor]:
+        """Separate several short clips together with every member."""
+        self._reset_metrics()
+        batch, lengths = pack_batch(wavs)
+        sources = self._average(batch, None, None, False, sample_rate)
+        return [
+            self._process_track(self._process_chunk(wav if wav.dim() == 3 else wav[None], clip))
+            for wav, clip in zip(wavs, unpack_batch(sources, lengths))
+        ]
+
+    def _average(self, wav: torch.Tensor, shifts: Optional[int], overlap: Optional[float],
+                 use_cache: bool, sample_rate: Optional[int]) -> torch.Tensor:
+        """Get the weighted average of the members' stems."""
+        batch, channels, length = wav.shape
+        output = torch.zeros(batch, len(self._stems), channels, length)
+        lock = threading.Lock()
+
+        def run(indices: List[int]):
+            for index in indices:
+                self._accumulate(self.engines[index], self.weights[index], wav, output,
+                                 lock, shifts, overlap, use_cache, sample_rate)
+
+        groups: Dict[str, List[int]] = {}
+        for index, engine in enumerate(self.engines):
+            groups.setdefault(engine.device, []).append(index)
+
+        if self.parallel and len(groups) > 1:
+            with ThreadPoolExecutor(max_workers=len(groups)) as executor:
+                for future in [executor.submit(run, indices) for indices in groups.values()]:
+                    future.result()
+        else:
+            run(list(range(len(self.engines))))
+
+        for engine in self.engines:
+            self.transfer_time += engine.transfer_time
+            self.frames_total += engine.frames_total
+            self.frames_skipped += engine.frames_skipped
+            self.fell_back_to_cpu = self.fell_back_to_cpu or engine.fell_back_to_cpu
+        return output
+
+    def job_parameters(self, output_dir: str, stems: List[str]) -> Dict:
+        """Get the job settings, including the weight of every member."""
+        parameters = super().job_parameters(output_dir, stems)
+        parameters['weights'] = self.weights
+        return parameters
+
+    def _iter_sources(self, wav: torch.Tensor, max_chunk_frames: int, sample_rate: int):
+        """Yield the averaged sources once every member has finished."""
+        yield 0, self.separate(wav, sample_rate=sample_rate)
+
+    def _accumulate(self, engine: SeparationEngine, weight: float, wav: torch.Tensor,
+                    output: torch.Tensor, lock: threading.Lock,
+                    shifts: Optional[int], overlap: Optional[float], use_cache: bool,
+                    sample_rate: Optional[int]):
+        """Add one member's weighted stems into the shared output."""
+        engine._reset_metrics()
+        if use_cache and engine.segment_cache is not None and wav.shape[0] == 1:
+            blocks = iter([(0, engine.separate(wav, shifts, overlap,
+                                               sample_rate=sample_rate))])
+        else:
+            blocks = engine.iter_apply(wav, shifts, overlap, sample_rate=sample_rate)
+
+        indices = [engine.stem_names.index(stem) for stem in self._stems]
+        for start, block in blocks:
+            end = start + block.shape[-1]
+            with lock:
+                for target, source in enumerate(indices):
+                    output[:, target, :, start:end].add_(block[:, source], alpha=weight)
@@ -0,0 +1,164 @@
+"""
+Write-ahead journal of batch jobs, used to resume interrupted runs.
+"""
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+from .models import ProcessingResult
+from ..utils.file_handler import FileHandler
+
+
+# Bytes read at a time when hashing inputs
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Job stages, in the order a job goes through them
+QUEUED = 'queued'
+WRITING = 'writing'
+DONE = 'done'
+FAILED = 'failed'
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    input_path TEXT NOT NULL,
+    parameters TEXT NOT NULL,
+    input_hash TEXT NOT NULL,
+    stage TEXT NOT NULL,
+    outputs TEXT NOT NULL DEFAULT '[]',
+    error TEXT NOT NULL DEFAULT '',
+    updated REAL NOT NULL,
+    PRIMARY KEY (input_path, parameters)
+)
+"""
+
+
+def file_hash(path: str) -> str:
+    """Get the BLAKE2 hash of a file's content."""
+    digest = hashlib.blake2b(digest_size=20)
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(HASH_BLOCK_SIZE), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def parameters_key(parameters: Dict) -> str:
+    """Get the canonical form of job parameters used to match jobs."""
+    return json.dumps(parameters, sort_keys=True, separators=(',', ':'))
+
+
+class JobJournal:
+    """
+    SQLite journal recording the stage of every job of a batch.
+
+    A job is an input file separated with a set of parameters. Each stage
+    change is committed before the work it announces starts, and the
+    planned output paths are recorded before any stem is written. A run
+    restarted with the same journal therefore skips completed jobs, and
+    :meth:`recover` deletes the outputs of jobs that were interrupted.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+        # Encoder threads report results, so the connection is shared
+        self._connection = sqlite3.connect(str(self.path), check_same_thread=False,
+                                           isolation_level=None)
+        self._connection.execute("PRAGMA journal_mode=WAL")
+        self._connection.execute("PRAGMA synchronous=FULL")
+        self._connection.execute(_SCHEMA)
+
+    def close(self):
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+    def is_done(self, input_path: str, parameters: Dict, input_hash: str) -> bool:
+        """Check whether a job finished and its outputs are still present."""
+        row = self._fetch(input_path, parameters)
+        if row is None or row['stage'] != DONE or row['input_hash'] != input_hash:
+            return False
+        return all(Path(output).is_file() for output in json.loads(row['outputs']))
+
+    def stage(self, input_path: str, parameters: Dict) -> Optional[str]:
+        """Get the recorded stage of a job, or None if it is unknown."""
+        row = self._fetch(input_path, parameters)
+        return row['stage'] if row else None
+
+    def queue(self, input_path: str, parameters: Dict, input_hash: str):
+        """Record that a job is about to be processed."""
+        self._execute(
+            "INSERT OR REPLACE INTO jobs (input_path, parameters, input_hash, stage, updated) "
+            "VALUES (?, ?, ?, ?, ?)",
+            (input_path, parameters_key(parameters), input_hash, QUEUED, time.time())
+        )
+
+    def start_writing(self, input_path: str, parameters: Dict, outputs: Sequence[str]):
+        """Record the files a job is about to write."""
+        self._update(input_path, parameters, WRITING, list(outputs), '')
+
+    def finish(self, input_path: str, parameters: Dict, result: ProcessingResult):
+        """Record the outcome of a job."""
+        if result.success:
+            self._update(input_path, parameters, DONE, result.output_files, '')
+        else:
+            # A failed job keeps the paths it planned, so recover() can clean them
+            row = self._fetch(input_path, parameters)
+            outputs = json.loads(row['outputs']) if row else []
+            self._update(input_path, parameters, FAILED, outputs, result.error_message)
+
+    def recover(self) -> List[str]:
+        """
+        Delete the outputs of every job that did not finish.
+
+        Returns:
+            Paths of the deleted files
+        """
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT input_path, parameters, outputs FROM jobs WHERE stage != ?", (DONE,)
+            ).fetchall()
+
+        removed = []
+        for input_path, parameters, outputs in rows:
+            for output in json.loads(outputs):
+                for path in (output, FileHandler.partial_path(output)):
+                    try:
+                        Path(path).unlink()
+                        removed.append(path)
+                    except FileNotFoundError:
+                        pass
+            self._execute("UPDATE jobs SET outputs = '[]' WHERE input_path = ? AND parameters = ?",
+                          (input_path, parameters))
+        return removed
+
+    def _fetch(self, input_path: str, parameters: Dict) -> Optional[Dict]:
+        """Get the row of a job."""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT input_hash, stage, outputs FROM jobs WHERE input_path = ? AND parameters = ?",
+                (input_path, parameters_key(parameters))
+            ).fetchone()
+        if row is None:
+            return None
+        return {'input_hash': row[0], 'stage': row[1], 'outputs': row[2]}
+
+    def _update(self, input_path: str, parameters: Dict, stage: str,
+                outputs: List[str], error: str):
+        """Move a job to another stage."""
+        self._execute(
+            "UPDATE jobs SET stage = ?, outputs = ?, error = ?, updated = ? "
+            "WHERE input_path = ? AND parameters = ?",
+            (stage, json.dumps(outputs), error, time.time(), input_path,
+             parameters_key(parameters))
+        )
+
+    def _execute(self, sql: str, values: tuple):
+        """Run one statement in its own committed transaction."""
+        with self._lock:
+            self._connection.execute(sql, values)
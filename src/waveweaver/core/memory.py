@@ -0,0 +1,121 @@
+"""
+Device memory estimation used to size inference chunks.
+"""
+
+from typing import Optional
+
+import torch
+
+from .segment_cache import model_segment_seconds
+
+
+# Rough peak activation memory of one forward pass, per input channel and
+# frame of model segment, measured on Demucs v3/v4 models in float32
+ACTIVATION_BYTES_PER_FRAME = 4096
+
+# Fraction of the free device memory a chunk is allowed to use
+DEFAULT_MEMORY_SAFETY = 0.8
+
+# Bounds of automatically sized chunks, in model segments and seconds
+MIN_CHUNK_SEGMENTS = 2
+MAX_CHUNK_SECONDS = 600.0
+
+_FLOAT_BYTES = 4
+
+
+def is_out_of_memory(error: BaseException) -> bool:
+    """Check whether an exception is a device out-of-memory error."""
+    oom_error = getattr(torch.cuda, 'OutOfMemoryError', None)
+    if oom_error is not None and isinstance(error, oom_error):
+        return True
+    return isinstance(error, RuntimeError) and 'out of memory' in str(error).lower()
+
+
+def free_device_memory(device: str) -> Optional[int]:
+    """
+    Get the memory available for new allocations on a device.
+
+    Memory PyTorch has reserved but not handed out counts as free.
+
+    Args:
+        device: Torch device string
+
+    Returns:
+        Free bytes, or None for devices without a known limit
+    """
+    if not device.startswith('cuda') or not torch.cuda.is_available():
+        return None
+    torch_device = torch.device(device)
+    free, _ = torch.cuda.mem_get_info(torch_device)
+    cached = torch.cuda.memory_reserved(torch_device) - torch.cuda.memory_allocated(torch_device)
+    return free + cached
+
+
+def activation_bytes(model, channels: int, batch: int = 1) -> int:
+    """Estimate the peak memory of one forward pass over a model segment."""
+    samplerate = int(getattr(model, 'samplerate', 44100))
+    segment_frames = int(model_segment_seconds(model) * samplerate)
+    return ACTIVATION_BYTES_PER_FRAME * segment_frames * channels * batch
+
+
+def chunk_bytes_per_frame(sources: int, channels: int, shifts: int, batch: int = 1) -> int:
+    """
+    Estimate the device memory used per frame of a resident chunk.
+
+    The mixture, its shifted copy, the summed output and the per-shift
+    output are all held on the device while a chunk is separated.
+    """
+    outputs = sources * (2 if shifts else 1)
+    return (2 + outputs) * channels * batch * _FLOAT_BYTES
+
+
+def estimate_memory(model, chunk_frames: int, channels: int, shifts: int,
+                    batch: int = 1) -> int:
+    """
+    Estimate the device memory needed to separate one chunk.
+
+    Args:
+        model: Loaded model, already resident on the device
+        chunk_frames: Frames per chunk
+        channels: Input channels
+        shifts: Number of random shifts averaged
+        batch: Number of inputs separated together
+
+    Returns:
+        Estimated peak bytes, excluding the model weights
+    """
+    sources = len(getattr(model, 'sources', ())) or 4
+    return (activation_bytes(model, channels, batch)
+            + chunk_frames * chunk_bytes_per_frame(sources, channels, shifts, batch))
+
+
+def choose_chunk_frames(model, free_bytes: Optional[int], channels: int, shifts: int,
+                        batch: int = 1, safety: float = DEFAULT_MEMORY_SAFETY) -> Optional[int]:
+    """
+    Pick the largest chunk that fits in the free device memory.
+
+    Args:
+        model: Loaded model, already resident on the device
+        free_bytes: Free device memory, None when unlimited
+        channels: Input channels
+        shifts: Number of random shifts averaged
+        batch: Number of inputs separated together
+        safety: Fraction of the free memory to use
+
+    Returns:
+        Frames per chunk, None for no chunking, or 0 if even the smallest
+        chunk is not expected to fit
+    """
+    if free_bytes is None:
+        return None
+
+    samplerate = int(getattr(model, 'samplerate', 44100))
+    min_frames = int(MIN_CHUNK_SEGMENTS * model_segment_seconds(model) * samplerate)
+    max_frames = int(MAX_CHUNK_SECONDS * samplerate)
+
+    budget = free_bytes * safety - activation_bytes(model, channels, batch)
+    sources = len(getattr(model, 'sources', ())) or 4
+    frames = int(budget // chunk_bytes_per_frame(sources, channels, shifts, batch))
+    if frames < min_frames:
+        return 0
+    return min(frames, max_frames)
@@ -21,16 +21,38 @@ class ProcessingStatus(Enum):
 
 @dataclass
 class ModelInfo:
-    """Information about a Demucs model."""
+    """Information about a Demucs model and its measured cost (0 if unknown)."""
     key: str
     name: str
     description: str
     stems: List[str]
+    parameter_count: int = 0
+    weights_size: int = 0
+    sample_rate: int = 44100
+    rtf_cpu: float = 0.0
+    rtf_gpu: float = 0.0
+    peak_memory_per_minute: int = 0
+    repo: str = ""
     
     @property
     def display_name(self) -> str:
         """Get formatted display name."""
         return f"{self.name} - {self.description}"
+    
+    def real_time_factor(self, device: str) -> float:
+        """Get the typical processing time per second of audio on a device."""
+        return self.rtf_gpu if device.startswith('cuda') else self.rtf_cpu
+    
+    @classmethod
+    def from_dict(cls, key: str, data: Dict[str, Any]) -> 'ModelInfo':
+        """Create model info from a registry entry."""
+        fields = {name: value for name, value in data.items()
+                  if name in cls.__dataclass_fields__ and name != 'key'}
+        fields.setdefault('name', key)
+        fields.setdefault('description', '')
+        if not fields.get('stems'):
+            raise ValueError(f"Model {key} has no stems")
+        return cls(key=key, **fields)
 
 
 @dataclass
@@ -57,44 +79,86 @@ class ProcessingResult:
     output_files: List[str]
     error_message: str = ""
     processing_time: float = 0.0
+    input_file: str = ""
+    transfer_time: float = 0.0
+    compute_saved: float = 0.0
 
 
 class AvailableModels:
-    """Registry of available Demucs models."""
+    """
+    Registry of available Demucs models.
+
+    Costs of the built-in models are typical figures for one pass on an
+    8-core desktop CPU and a recent NVIDIA GPU, so time estimates work out
+    of the box. A registry file can replace them with measured values.
+    """
     
     MODELS = {
         'htdemucs': ModelInfo(
             key='htdemucs',
             name='HTDemucs',
             description='High quality separation with balanced performance',
-            stems=["drums", "bass", "other", "vocals"]
+            stems=["drums", "bass", "other", "vocals"],
+            parameter_count=42_000_000,
+            weights_size=84_000_000,
+            rtf_cpu=0.6,
+            rtf_gpu=0.04,
+            peak_memory_per_minute=350_000_000
         ),
         'htdemucs_ft': ModelInfo(
             key='htdemucs_ft',
             name='HTDemucs Fine-tuned',
             description='Fine-tuned version with better vocals separation',
-            stems=["drums", "bass", "other", "vocals"]
+            stems=["drums", "bass", "other", "vocals"],
+            # Bag of four fine-tuned HTDemucs models, one per stem
+            parameter_count=168_000_000,
+            weights_size=336_000_000,
+            rtf_cpu=2.4,
+            rtf_gpu=0.16,
+            peak_memory_per_minute=400_000_000
         ),
         'mdx_extra': ModelInfo(
             key='mdx_extra',
             name='MDX-Extra',
             description='High quality separation optimized for vocals',
-            stems=["drums", "bass", "other", "vocals"]
+            stems=["drums", "bass", "other", "vocals"],
+            # Bag of four Hybrid Demucs models
+            parameter_count=334_000_000,
+            weights_size=668_000_000,
+            rtf_cpu=2.0,
+            rtf_gpu=0.12,
+            peak_memory_per_minute=400_000_000
         ),
         'mdx_extra_q': ModelInfo(
             key='mdx_extra_q',
             name='MDX-Extra-Q',
             description='Quantized version of MDX-Extra, faster but slightly lower quality',
-            stems=["drums", "bass", "other", "vocals"]
+            stems=["drums", "bass", "other", "vocals"],
+            # Same models as MDX-Extra, with weights quantized for download
+            parameter_count=334_000_000,
+            weights_size=168_000_000,
+            rtf_cpu=2.0,
+            rtf_gpu=0.12,
+            peak_memory_per_minute=400_000_000
         ),
         'htdemucs_6s': ModelInfo(
             key='htdemucs_6s',
             name='HTDemucs 6 Stems',
             description='Separates into 6 stems including piano and guitar',
-            stems=["drums", "bass", "other", "vocals", "piano", "guitar"]
+            stems=["drums", "bass", "other", "vocals", "piano", "guitar"],
+            parameter_count=27_000_000,
+            weights_size=54_000_000,
+            rtf_cpu=0.6,
+            rtf_gpu=0.04,
+            peak_memory_per_minute=500_000_000
         )
     }
     
+    @classmethod
+    def register(cls, model_info: ModelInfo):
+        """Add a model, replacing any model with the same key."""
+        cls.MODELS[model_info.key] = model_info
+    
     @classmethod
     def get_model(cls, key: str) -> ModelInfo:
         """Get model info by key."""
@@ -0,0 +1,127 @@
+"""
+On-disk cache of decoded audio for inputs that are slow to decode.
+"""
+
+import hashlib
+import os
+import struct
+import tempfile
+from pathlib import Path
+from typing import Callable, Optional, Tuple
+
+import numpy as np
+import torch
+
+from .segment_cache import prune_files
+
+
+# Default limit on the total size of the cache
+DEFAULT_MAX_BYTES = 4 * 1024 ** 3
+
+# Formats read without a costly decode, not worth a second copy on disk
+UNCOMPRESSED_SUFFIXES = ('.wav', '.wave', '.aif', '.aiff')
+
+# Magic, sample rate, channels and frames, followed by [C, T] float32 samples
+HEADER = struct.Struct('<4sIIQ')
+MAGIC = b'WWPC'
+
+Decoded = Tuple[torch.Tensor, int]
+
+
+class PcmCache:
+    """
+    Decoded samples of compressed inputs, keyed by file path, size and mtime.
+
+    Each entry is a ``.pcm`` file with a small header followed by raw
+    float32 samples, so a repeat run memory-maps the audio instead of
+    running the decoder again. Least recently used entries are evicted once
+    the cache grows past ``max_bytes``.
+    """
+
+    def __init__(self, cache_dir: str, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def file_key(input_file: str) -> Optional[str]:
+        """Hash a file's path, size and modification time, None if it can't be read."""
+        try:
+            stat = os.stat(input_file)
+        except OSError:
+            return None
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(os.path.abspath(input_file).encode('utf-8'))
+        digest.update(np.int64([stat.st_size, stat.st_mtime_ns]).tobytes())
+        return digest.hexdigest()
+
+    def read(self, input_file: str, decode: Callable[[str], Decoded]) -> Decoded:
+        """
+        Get the decoded samples of a file, decoding and storing them on a miss.
+
+        Args:
+            input_file: Audio file to read
+            decode: Function decoding a file into [C, T] samples and a sample rate
+
+        Returns:
+            The [C, T] samples and their sample rate
+        """
+        key = None
+        if not input_file.lower().endswith(UNCOMPRESSED_SUFFIXES):
+            key = self.file_key(input_file)
+        if key is None:
+            return decode(input_file)
+
+        cached = self.load(key)
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        wav, sample_rate = decode(input_file)
+        self.store(key, wav, sample_rate)
+        return wav, sample_rate
+
+    def load(self, key: str) -> Optional[Decoded]:
+        """Memory-map a cached entry, or None on a miss."""
+        path = self._path(key)
+        try:
+            with open(path, 'rb') as f:
+                magic, sample_rate, channels, frames = HEADER.unpack(f.read(HEADER.size))
+            if magic != MAGIC:
+                return None
+            # Copy-on-write, so callers may modify the samples in place
+            samples = np.memmap(path, dtype=np.float32, mode='c', offset=HEADER.size,
+                                shape=(channels, frames))
+        except (OSError, ValueError, struct.error):
+            return None
+        # Touch the entry so pruning evicts least recently used files first
+        os.utime(path)
+        return torch.from_numpy(samples), sample_rate
+
+    def store(self, key: str, wav: torch.Tensor, sample_rate: int):
+        """Store decoded samples atomically, then evict old entries past the size limit."""
+        samples = wav.reshape(-1, wav.shape[-1]).to(torch.float32).contiguous().numpy()
+        fd, temp_path = tempfile.mkstemp(suffix='.tmp', dir=self.cache_dir)
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(HEADER.pack(MAGIC, sample_rate, samples.shape[0], samples.shape[1]))
+                f.write(samples.data)
+            os.replace(temp_path, self._path(key))
+        except OSError:
+            # A full disk only costs the next run a decode
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            return
+        self.prune(self.max_bytes)
+
+    def prune(self, max_bytes: int) -> int:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        return prune_files(self.cache_dir, '*.pcm', max_bytes)
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.pcm"
@@ -0,0 +1,283 @@
+"""
+Pipelined decode -> infer -> encode execution of multi-file jobs.
+"""
+
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+import torch
+
+from .buffers import StemBuffer
+from .journal import JobJournal
+from .models import ProcessingResult
+from .shards import ShardWriter
+
+
+# Marks the end of a stage's input
+_DONE = object()
+
+
+@dataclass
+class WorkUnit:
+    """A group of inputs that travels through the pipeline together."""
+    paths: List[str]
+    start_time: float = 0.0
+    wavs: List[Optional[torch.Tensor]] = field(default_factory=list)
+    sample_rates: List[int] = field(default_factory=list)
+    buffers: List[Optional[StemBuffer]] = field(default_factory=list)
+    errors: List[str] = field(default_factory=list)
+    transfer_time: float = 0.0
+    compute_saved: float = 0.0
+
+
+class SeparationPipeline:
+    """
+    Runs decoding, inference and encoding of consecutive jobs concurrently.
+
+    Decoder threads read and decode upcoming inputs while a single inference
+    worker keeps the device busy, and encoder threads write finished stems.
+    Stages are connected by bounded queues, so at most ``queue_depth`` units
+    wait between two stages and host memory stays bounded.
+    """
+
+    def __init__(self, engine, decoder_workers: int = 2, encoder_workers: int = 2,
+                 queue_depth: int = 2):
+        self.engine = engine
+        self.decoder_workers = max(1, decoder_workers)
+        self.encoder_workers = max(1, encoder_workers)
+        self.queue_depth = max(1, queue_depth)
+
+    def run(self, units: Sequence[List[str]], output_dir: str, stems: List[str],
+            on_result: Optional[Callable[[ProcessingResult], None]] = None,
+            is_cancelled: Optional[Callable[[], bool]] = None,
+            journal: Optional[JobJournal] = None,
+            parameters: Optional[Dict] = None,
+            dataset: Optional[ShardWriter] = None
+            ) -> List[ProcessingResult]:
+        """
+        Process work units through the pipeline.
+
+        Args:
+            units: Groups of input paths; groups of several paths are separated
+                as one batch, single paths on their own
+            output_dir: Directory receiving one stem folder per input
+            stems: Stems to save for every input
+            on_result: Called with each file's result as soon as it is saved
+            is_cancelled: Polled before each stage picks up new work
+            journal: Journal receiving the outputs and outcome of every input,
+                whose jobs must already be queued
+            parameters: Job parameters the inputs are journaled under
+            dataset: Shard writer receiving the stems instead of stem files
+
+        Returns:
+            One ProcessingResult per processed input, in completion order
+        """
+        cancelled = is_cancelled or (lambda: False)
+        pending: "queue.Queue" = queue.Queue()
+        decoded: "queue.Queue" = queue.Queue(maxsize=self.queue_depth)
+        separated: "queue.Queue" = queue.Queue(maxsize=self.queue_depth)
+        results: List[ProcessingResult] = []
+        results_lock = threading.Lock()
+        # Set when inference stops early, so decoders stop picking up work
+        stopped = threading.Event()
+
+        for paths in units:
+            pending.put(list(paths))
+
+        def report(result: ProcessingResult):
+            if journal is not None:
+                journal.finish(result.input_file, parameters, result)
+            with results_lock:
+                results.append(result)
+                if on_result:
+                    on_result(result)
+
+        def decode_worker():
+            while not cancelled() and not stopped.is_set():
+                try:
+                    paths = pending.get_nowait()
+                except queue.Empty:
+                    return
+                for unit in self._decode(paths):
+                    decoded.put(unit)
+
+        def encode_worker():
+            while True:
+                unit = separated.get()
+                if unit is _DONE:
+                    return
+                for result in self._encode(unit, output_dir, stems, cancelled,
+                                           journal, parameters, dataset):
+                    report(result)
+
+        decoders = [
+            threading.Thread(target=decode_worker, name=f"decoder-{i}", daemon=True)
+            for i in range(self.decoder_workers)
+        ]
+        encoders = [
+            threading.Thread(target=encode_worker, name=f"encoder-{i}", daemon=True)
+            for i in range(self.encoder_workers)
+        ]
+        for worker in decoders + encoders:
+            worker.start()
+
+        def close_decoded():
+            for decoder in decoders:
+                decoder.join()
+            decoded.put(_DONE)
+
+        closer = threading.Thread(target=close_decoded, name="decoder-join", daemon=True)
+        closer.start()
+
+        # Inference stays on the calling thread, which owns the device
+        unit = None
+        try:
+            while True:
+                unit = decoded.get()
+                if unit is _DONE:
+                    break
+                if not cancelled():
+                    self._infer(unit, stems)
+                separated.put(unit)
+        finally:
+            if unit is not _DONE:
+                # Unblock decoders waiting for room and drop what they decoded
+                stopped.set()
+                while decoded.get() is not _DONE:
+                    pass
+            for _ in encoders:
+                separated.put(_DONE)
+            for encoder in encoders:
+                encoder.join()
+
+        return results
+
+    def _decode(self, paths: List[str]) -> List[WorkUnit]:
+        """Decode a group of inputs, splitting batches that can't stay together."""
+        unit = WorkUnit(paths=paths, start_time=time.time())
+        for path in paths:
+            try:
+                wav, sample_rate = self.engine.load_audio(path)
+                unit.wavs.append(wav)
+                unit.sample_rates.append(sample_rate)
+                unit.errors.append("")
+            except Exception as e:
+                unit.wavs.append(None)
+                unit.sample_rates.append(0)
+                unit.errors.append(str(e))
+
+        batchable = (
+            len(paths) > 1
+            and not any(unit.errors)
+            and len(set(unit.sample_rates)) == 1
+            and len({wav.shape[-2] for wav in unit.wavs}) == 1
+        )
+        if batchable or len(paths) == 1:
+            return [unit]
+
+        return [
+            WorkUnit(paths=[path], start_time=unit.start_time, wavs=[wav],
+                     sample_rates=[sample_rate], errors=[error])
+            for path, wav, sample_rate, error in zip(
+                unit.paths, unit.wavs, unit.sample_rates, unit.errors)
+        ]
+
+    def _infer(self, unit: WorkUnit, stems: List[str]):
+        """Run separation for a decoded unit and keep the selected stems."""
+        try:
+            unit.buffers = [
+                None if sources is None else self.engine.to_buffer(sources, stems)
+                for sources in self._separate_unit(unit)
+            ]
+        finally:
+            # Release decoded input as soon as it's no longer needed
+            unit.wavs = []
+
+    def _separate_unit(self, unit: WorkUnit) -> List[Optional[torch.Tensor]]:
+        """Separate every input of a unit, batching when possible."""
+        if len(unit.paths) > 1:
+            try:
+                sources = self.engine.separate_batch(unit.wavs, unit.sample_rates[0])
+                unit.transfer_time += self.engine.transfer_time
+                unit.compute_saved = self.engine.compute_saved
+                return sources
+            except Exception:
+                # Retry clip by clip so one bad clip can't fail the batch
+                pass
+
+        sources: List[Optional[torch.Tensor]] = []
+        for index, wav in enumerate(unit.wavs):
+            if wav is None:
+                sources.append(None)
+                continue
+            try:
+                sources.append(self.engine.separate(wav, sample_rate=unit.sample_rates[index]))
+                unit.transfer_time += self.engine.transfer_time
+                unit.compute_saved += self.engine.compute_saved / len(unit.wavs)
+            except Exception as e:
+                sources.append(None)
+                unit.errors[index] = str(e)
+        return sources
+
+    def _encode(self, unit: WorkUnit, output_dir: str, stems: List[str],
+                cancelled: Callable[[], bool], journal: Optional[JobJournal] = None,
+                parameters: Optional[Dict] = None,
+                dataset: Optional[ShardWriter] = None) -> List[ProcessingResult]:
+        """Write the stems of a separated unit."""
+        results = []
+        for path, sample_rate, buffer, error in zip(
+                unit.paths, unit.sample_rates, unit.buffers or [None] * len(unit.paths),
+                unit.errors):
+            if cancelled():
+                break
+            if buffer is None:
+                results.append(self._failure(path, error or "Cancelled", unit))
+                continue
+            try:
+                if dataset is not None:
+                    output_files = dataset.add(path, buffer, sample_rate)
+                else:
+                    if journal is not None:
+                        outputs = self.engine.stem_paths(path, output_dir,
+                                                         self.engine.output_stems(stems))
+                        journal.start_writing(path, parameters, outputs.values())
+                    output_files = self.engine.save_stems(
+                        buffer, sample_rate, path, output_dir, stems,
+                        is_cancelled=cancelled
+                    )
+                results.append(ProcessingResult(
+                    success=True,
+                    output_files=output_files,
+                    processing_time=time.time() - unit.start_time,
+                    input_file=path,
+                    transfer_time=unit.transfer_time / len(unit.paths),
+                    compute_saved=unit.compute_saved
+                ))
+            except Exception as e:
+                results.append(self._failure(path, str(e), unit))
+        return results
+
+    @staticmethod
+    def _failure(path: str, error: str, unit: WorkUnit) -> ProcessingResult:
+        """Build the result of a failed input."""
+        return ProcessingResult(
+            success=False,
+            output_files=[],
+            error_message=error,
+            processing_time=time.time() - unit.start_time,
+            input_file=path
+        )
+
+
+def plan_units(batches: Sequence[List[int]], singles: Sequence[int],
+               input_files: Sequence[str]) -> List[List[str]]:
+    """Turn batch plans into the work units consumed by the pipeline."""
+    units: List[Tuple[int, List[str]]] = [
+        (min(batch), [input_files[i] for i in batch]) for batch in batches
+    ]
+    units.extend((index, [input_files[index]]) for index in singles)
+    units.sort(key=lambda unit: unit[0])
+    return [paths for _, paths in units]
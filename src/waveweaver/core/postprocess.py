@@ -0,0 +1,133 @@
+"""
+Post-processing of separated stems as tensor operations.
+"""
+
+from typing import List, Optional, Sequence
+
+import torch
+
+
+NORMALIZE_MODES = ('peak', 'rms')
+
+# Default normalization target of each mode, in dBFS
+DEFAULT_TARGETS_DB = {'peak': -1.0, 'rms': -20.0}
+
+# The soft limiter starts bending this many dB below its ceiling
+LIMITER_KNEE_DB = 3.0
+
+
+def db_to_gain(db: float) -> float:
+    """Convert decibels to a linear gain."""
+    return 10 ** (db / 20)
+
+
+def residual_name(stem: str) -> str:
+    """Get the name of the stem holding the mix without another stem."""
+    return f"no_{stem}"
+
+
+def soft_limit(audio: torch.Tensor, ceiling_db: float = -0.3) -> torch.Tensor:
+    """
+    Softly limit samples so they never exceed a ceiling.
+
+    Samples below the knee are untouched; above it they are compressed
+    with a tanh curve that approaches the ceiling asymptotically.
+    """
+    ceiling = db_to_gain(ceiling_db)
+    threshold = ceiling * db_to_gain(-LIMITER_KNEE_DB)
+    span = ceiling - threshold
+    magnitude = audio.abs()
+    limited = threshold + span * torch.tanh((magnitude - threshold) / span)
+    return torch.where(magnitude > threshold, limited.copysign(audio), audio)
+
+
+class PostProcessor:
+    """
+    Optional stages applied to separated stems before they leave the device.
+
+    The residual stem and the limiter work chunk by chunk on the device
+    output. Normalization needs the level of the whole track, so it runs
+    once over the full result instead.
+    """
+
+    def __init__(self, residual: Optional[str] = None, normalize: Optional[str] = None,
+                 target_db: Optional[float] = None, limit: bool = False,
+                 ceiling_db: float = -0.3):
+        if normalize and normalize not in NORMALIZE_MODES:
+            raise ValueError(f"Unknown normalization: {normalize}")
+        self.residual = residual or None
+        self.normalize = normalize or None
+        self.target_db = target_db
+        self.limit = limit
+        self.ceiling_db = ceiling_db
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional['PostProcessor']:
+        """Create a post-processor from settings, or None if nothing is enabled."""
+        if not (settings.residual_stem or settings.normalize or settings.limiter):
+            return None
+        return cls(
+            residual=settings.residual_stem,
+            normalize=settings.normalize,
+            target_db=settings.normalize_target_db,
+            limit=settings.limiter,
+            ceiling_db=settings.limiter_ceiling_db
+        )
+
+    @property
+    def extra_stems(self) -> List[str]:
+        """Get the stems added on top of the model's stems."""
+        return [residual_name(self.residual)] if self.residual else []
+
+    @property
+    def needs_full_track(self) -> bool:
+        """Check whether a stage depends on the whole track."""
+        return self.normalize is not None
+
+    def output_stems(self, stems: Sequence[str]) -> List[str]:
+        """Get the stems to save, adding the residual to the selection."""
+        stems = list(stems)
+        stems.extend(stem for stem in self.extra_stems if stem not in stems)
+        return stems
+
+    def process_chunk(self, mix: torch.Tensor, sources: torch.Tensor,
+                      stem_names: Sequence[str]) -> torch.Tensor:
+        """
+        Apply the per-sample stages to a chunk.
+
+        Args:
+            mix: Input mixture shaped [B, C, T]
+            sources: Separated sources shaped [B, S, C, T], in stem_names order
+            stem_names: Stem name of each model source
+
+        Returns:
+            Processed sources with any residual stem appended
+        """
+        if self.residual:
+            if self.residual not in stem_names:
+                raise ValueError(f"Cannot compute residual: no {self.residual} stem")
+            index = list(stem_names).index(self.residual)
+            residual = mix.to(sources.device) - sources[:, index]
+            sources = torch.cat([sources, residual.unsqueeze(1)], dim=1)
+        if self.limit and not self.normalize:
+            sources = soft_limit(sources, self.ceiling_db)
+        return sources
+
+    def process_track(self, sources: torch.Tensor) -> torch.Tensor:
+        """Normalize every stem of a full [B, S, C, T] result in place."""
+        if not self.normalize:
+            return sources
+
+        target = db_to_gain(self.target_db if self.target_db is not None
+                            else DEFAULT_TARGETS_DB[self.normalize])
+        if self.normalize == 'peak':
+            level = sources.abs().amax(dim=(-2, -1), keepdim=True)
+        else:
+            level = sources.pow(2).mean(dim=(-2, -1), keepdim=True).sqrt()
+        # Leave silent stems untouched
+        gain = torch.where(level > 0, target / level.clamp_min(1e-12), torch.ones_like(level))
+        sources.mul_(gain)
+
+        if self.limit:
+            sources = soft_limit(sources, self.ceiling_db)
+        return sources
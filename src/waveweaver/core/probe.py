@@ -0,0 +1,128 @@
+"""
+Parallel pre-flight probing of batch inputs.
+"""
+
+import json
+import shutil
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from typing import Dict, List, Sequence
+
+import soundfile as sf
+
+from .models import AudioFileInfo
+
+
+# Default number of files probed concurrently; probing waits on I/O
+DEFAULT_PROBE_WORKERS = 8
+
+# Seconds before an ffprobe call is abandoned
+FFPROBE_TIMEOUT = 30
+
+
+class ProbeError(ValueError):
+    """Raised when an input can't be read as audio."""
+
+
+def probe_file(path: str) -> AudioFileInfo:
+    """
+    Read the duration and format of an audio file, failing on bad input.
+
+    Formats libsndfile can't read are probed with ffprobe, which demucs
+    relies on to decode them.
+
+    Args:
+        path: File to probe
+
+    Returns:
+        Information about the file
+
+    Raises:
+        ProbeError: If the file is missing, unreadable or holds no audio
+    """
+    try:
+        info = sf.info(path)
+        audio_info = AudioFileInfo(path=path, duration=info.duration,
+                                   sample_rate=info.samplerate, channels=info.channels,
+                                   format=info.format)
+    except Exception as e:
+        audio_info = _ffprobe(path, str(e))
+
+    if audio_info.sample_rate <= 0 or audio_info.channels <= 0:
+        raise ProbeError("no audio stream")
+    if audio_info.duration <= 0:
+        raise ProbeError("empty audio")
+    return audio_info
+
+
+def _ffprobe(path: str, reason: str) -> AudioFileInfo:
+    """Probe a file with ffprobe after libsndfile failed with reason."""
+    executable = shutil.which('ffprobe')
+    if executable is None:
+        raise ProbeError(reason)
+    command = [
+        executable, '-v', 'error', '-select_streams', 'a:0',
+        '-show_entries', 'stream=sample_rate,channels:format=duration,format_name',
+        '-of', 'json', path
+    ]
+    try:
+        output = subprocess.run(command, capture_output=True, text=True, check=True,
+                                timeout=FFPROBE_TIMEOUT).stdout
+        data = json.loads(output)
+        stream = data['streams'][0]
+        return AudioFileInfo(path=path,
+                             duration=float(data['format'].get('duration', 0)),
+                             sample_rate=int(stream['sample_rate']),
+                             channels=int(stream['channels']),
+                             format=data['format'].get('format_name', 'unknown'))
+    except subprocess.CalledProcessError as e:
+        raise ProbeError(e.stderr.strip() or reason) from None
+    except subprocess.TimeoutExpired:
+        raise ProbeError("ffprobe timed out") from None
+    except (ValueError, KeyError, IndexError):
+        raise ProbeError("no audio stream") from None
+
+
+@dataclass
+class ProbeReport:
+    """Outcome of probing a batch."""
+    files: List[AudioFileInfo] = field(default_factory=list)
+    errors: Dict[str, str] = field(default_factory=dict)
+
+    @property
+    def total_duration(self) -> float:
+        """Get the total audio duration of the valid files in seconds."""
+        return sum(info.duration for info in self.files)
+
+    @property
+    def paths(self) -> List[str]:
+        """Get the valid files in input order."""
+        return [info.path for info in self.files]
+
+
+def probe_files(paths: Sequence[str], workers: int = DEFAULT_PROBE_WORKERS) -> ProbeReport:
+    """
+    Probe every file of a batch concurrently.
+
+    Args:
+        paths: Files to probe
+        workers: Number of files probed at once
+
+    Returns:
+        Valid files in input order and the error of each rejected file
+    """
+    def probe(path: str):
+        try:
+            return probe_file(path)
+        except ProbeError as e:
+            return e
+
+    report = ProbeReport()
+    with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+        for path, outcome in zip(paths, executor.map(probe, paths)):
+            if isinstance(outcome, ProbeError):
+                report.errors[path] = str(outcome)
+            else:
+                report.files.append(outcome)
+    return report
@@ -0,0 +1,103 @@
+"""
+Loading of additional models from registry files and plugins.
+"""
+
+import json
+import warnings
+from pathlib import Path
+from typing import Any, Iterable, List
+
+from .models import AvailableModels, ModelInfo
+from ..utils.helpers import load_toml
+
+
+# Entry point group plugins use to contribute models
+ENTRY_POINT_GROUP = 'waveweaver.models'
+
+
+def parse_models(data: Any) -> List[ModelInfo]:
+    """
+    Convert registry data into model info.
+
+    Args:
+        data: Mapping of model key to fields, optionally nested under a
+            ``models`` key, or an iterable of ModelInfo instances
+
+    Returns:
+        The described models
+    """
+    if isinstance(data, dict):
+        data = data.get('models', data)
+        return [
+            value if isinstance(value, ModelInfo) else ModelInfo.from_dict(key, value)
+            for key, value in data.items()
+        ]
+    return [model for model in data if isinstance(model, ModelInfo)]
+
+
+def load_registry_file(path: str) -> List[ModelInfo]:
+    """Load the models described by a TOML or JSON registry file."""
+    registry_path = Path(path)
+    if registry_path.suffix.lower() == '.toml':
+        data = load_toml(registry_path)
+    else:
+        with open(registry_path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+
+    models = parse_models(data)
+    # Relative model repositories are resolved next to the registry file
+    for model in models:
+        if model.repo and not Path(model.repo).is_absolute():
+            model.repo = str(registry_path.parent / model.repo)
+    return models
+
+
+def _entry_points(group: str) -> Iterable:
+    """Get the installed entry points of a group."""
+    from importlib.metadata import entry_points
+
+    points = entry_points()
+    if hasattr(points, 'select'):
+        return points.select(group=group)
+    return points.get(group, [])
+
+
+def load_entry_point_models(group: str = ENTRY_POINT_GROUP) -> List[ModelInfo]:
+    """
+    Load the models contributed by installed plugins.
+
+    Each entry point refers to a mapping or iterable of models, or to a
+    function returning one. Broken plugins are skipped.
+    """
+    models = []
+    for entry_point in _entry_points(group):
+        try:
+            provided = entry_point.load()
+            if callable(provided):
+                provided = provided()
+            models.extend(parse_models(provided))
+        except Exception as e:
+            warnings.warn(f"Skipping model plugin {entry_point.name}: {e}")
+    return models
+
+
+def load_models(registry_file: str = "", use_entry_points: bool = True) -> List[ModelInfo]:
+    """
+    Register models from plugins and a registry file.
+
+    Entries of the registry file take precedence over plugins, and both
+    over the built-in models with the same key.
+
+    Args:
+        registry_file: TOML or JSON registry file, empty for none
+        use_entry_points: Whether to load plugin models
+
+    Returns:
+        The registered models
+    """
+    models = load_entry_point_models() if use_entry_points else []
+    if registry_file:
+        models.extend(load_registry_file(registry_file))
+    for model in models:
+        AvailableModels.register(model)
+    return models
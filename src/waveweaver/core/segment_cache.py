@@ -0,0 +1,227 @@
+"""
+Per-segment cache of separated audio for incremental re-separation.
+"""
+
+import hashlib
+import os
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Callable, List, Optional
+
+import numpy as np
+import torch
+
+
+# Number of model segments covered by one cached segment
+DEFAULT_SEGMENTS_PER_CHUNK = 4
+
+# Fallback model segment length in seconds for models without one
+DEFAULT_MODEL_SEGMENT = 8.0
+
+
+@dataclass
+class Segment:
+    """A cacheable span of audio and the context it is separated with."""
+    index: int
+    start: int
+    end: int
+    core_start: int
+    core_end: int
+
+    @property
+    def core_length(self) -> int:
+        """Number of frames this segment contributes to the output."""
+        return self.core_end - self.core_start
+
+
+def model_segment_seconds(model) -> float:
+    """Get the segment length in seconds the model processes at once."""
+    sub_models = getattr(model, 'models', None) or [model]
+    segments = [
+        float(sub_model.segment) for sub_model in sub_models
+        if getattr(sub_model, 'segment', None)
+    ]
+    return min(segments) if segments else DEFAULT_MODEL_SEGMENT
+
+
+def plan_segments(length: int, segment_frames: int, margin_frames: int) -> List[Segment]:
+    """
+    Split a signal into fixed-size segments with context margins.
+
+    Every segment owns the frames in [core_start, core_end) and is separated
+    with up to ``margin_frames`` of extra context on each side, so an edit
+    also invalidates the neighbours whose margins overlap it.
+
+    Args:
+        length: Total number of frames
+        segment_frames: Frames owned by each segment
+        margin_frames: Context frames added on each side
+
+    Returns:
+        Segments covering the whole signal in order
+    """
+    if segment_frames <= 0:
+        raise ValueError("segment_frames must be positive")
+
+    segments = []
+    for index, core_start in enumerate(range(0, length, segment_frames)):
+        core_end = min(core_start + segment_frames, length)
+        segments.append(Segment(
+            index=index,
+            start=max(0, core_start - margin_frames),
+            end=min(length, core_end + margin_frames),
+            core_start=core_start,
+            core_end=core_end
+        ))
+    return segments
+
+
+def prune_files(directory: Path, pattern: str, max_bytes: int) -> int:
+    """
+    Remove the least recently used files of a cache directory.
+
+    Args:
+        directory: Cache directory
+        pattern: Glob matching the cache entries
+        max_bytes: Total size the entries must fit in
+
+    Returns:
+        Number of files removed
+    """
+    entries = []
+    for path in directory.glob(pattern):
+        try:
+            stat = path.stat()
+        except OSError:
+            continue
+        entries.append((stat.st_mtime, stat.st_size, path))
+
+    total = sum(size for _, size, _ in entries)
+    removed = 0
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        try:
+            path.unlink()
+        except OSError:
+            continue
+        total -= size
+        removed += 1
+    return removed
+
+
+class SegmentCache:
+    """
+    On-disk store of separated segments keyed by a hash of their input.
+
+    Each entry is an ``.npy`` file holding the [S, C, T] output of one
+    segment's core region.
+    """
+
+    def __init__(self, cache_dir: str, segments_per_chunk: int = DEFAULT_SEGMENTS_PER_CHUNK):
+        self.cache_dir = Path(cache_dir)
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.segments_per_chunk = max(1, segments_per_chunk)
+        self.hits = 0
+        self.misses = 0
+
+    def segment_key(self, wav: torch.Tensor, segment: Segment, params: str) -> str:
+        """Hash a segment's input PCM, position in its context and job parameters."""
+        digest = hashlib.blake2b(digest_size=20)
+        digest.update(params.encode('utf-8'))
+        digest.update(np.int64([
+            segment.core_start - segment.start,
+            segment.end - segment.core_end,
+        ]).tobytes())
+        pcm = wav[..., segment.start:segment.end].contiguous().numpy()
+        digest.update(pcm.tobytes())
+        return digest.hexdigest()
+
+    def load(self, key: str) -> Optional[torch.Tensor]:
+        """Load a cached segment output, or None on a miss."""
+        path = self._path(key)
+        try:
+            array = np.load(path)
+        except (OSError, ValueError):
+            return None
+        # Touch the entry so pruning evicts least recently used segments first
+        os.utime(path)
+        return torch.from_numpy(array)
+
+    def store(self, key: str, sources: torch.Tensor):
+        """Store a segment output atomically."""
+        path = self._path(key)
+        temp_path = path.with_suffix('.tmp')
+        with open(temp_path, 'wb') as f:
+            np.save(f, sources.contiguous().numpy())
+        os.replace(temp_path, path)
+
+    def prune(self, max_bytes: int) -> int:
+        """Remove least recently used entries until the cache fits in max_bytes."""
+        return prune_files(self.cache_dir, '*.npy', max_bytes)
+
+    def separate(self, wav: torch.Tensor, separate_fn: Callable[[torch.Tensor], torch.Tensor],
+                 model, params: str) -> torch.Tensor:
+        """
+        Separate a [1, C, T] mixture, reusing cached segments.
+
+        Consecutive segments that miss the cache are separated together in
+        one call and then split back into cache entries.
+
+        Args:
+            wav: Mixture to separate
+            separate_fn: Function separating a [1, C, T] tensor into [1, S, C, T]
+            model: Loaded model, used to align segments to its segment length
+            params: Job parameters that change the output (model, shifts, ...)
+
+        Returns:
+            Separated sources shaped [1, S, C, T]
+        """
+        samplerate = int(getattr(model, 'samplerate', 44100))
+        model_segment = int(model_segment_seconds(model) * samplerate)
+        segments = plan_segments(
+            wav.shape[-1],
+            model_segment * self.segments_per_chunk,
+            model_segment
+        )
+
+        outputs: List[Optional[torch.Tensor]] = []
+        keys = []
+        for segment in segments:
+            key = self.segment_key(wav, segment, params)
+            keys.append(key)
+            outputs.append(self.load(key))
+
+        runs = self._miss_runs(outputs)
+        missed = sum(len(run) for run in runs)
+        self.hits += len(segments) - missed
+        self.misses += missed
+
+        for run in runs:
+            first, last = segments[run[0]], segments[run[-1]]
+            sources = separate_fn(wav[..., first.start:last.end])
+            for index in run:
+                segment = segments[index]
+                offset = segment.core_start - first.start
+                core = sources[0, ..., offset:offset + segment.core_length].clone()
+                self.store(keys[index], core)
+                outputs[index] = core
+
+        return torch.cat(outputs, dim=-1).unsqueeze(0)
+
+    @staticmethod
+    def _miss_runs(outputs: List[Optional[torch.Tensor]]) -> List[List[int]]:
+        """Group indices of missing outputs into runs of consecutive segments."""
+        runs: List[List[int]] = []
+        for index, output in enumerate(outputs):
+            if output is not None:
+                continue
+            if runs and runs[-1][-1] == index - 1:
+                runs[-1].append(index)
+            else:
+                runs.append([index])
+        return runs
+
+    def _path(self, key: str) -> Path:
+        """Get the file path of a cache entry."""
+        return self.cache_dir / f"{key}.npy"
@@ -0,0 +1,209 @@
+"""
+Dataset export of separated stems into sharded, memory-mappable arrays.
+"""
+
+import json
+import os
+import struct
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+
+from .buffers import StemBuffer
+from ..utils.file_handler import FileHandler
+
+
+# Default size of one shard, all stems together
+DEFAULT_SHARD_BYTES = 1 << 30
+
+INDEX_NAME = "index.json"
+
+# Fixed size of the .npy header, so it can be rewritten once the shape is known
+NPY_HEADER_SIZE = 128
+
+
+def npy_header(shape: Sequence[int], dtype: np.dtype) -> bytes:
+    """Build a version 1.0 .npy header padded to NPY_HEADER_SIZE bytes."""
+    header = repr({
+        'descr': np.lib.format.dtype_to_descr(np.dtype(dtype)),
+        'fortran_order': False,
+        'shape': tuple(shape),
+    })
+    header = header.ljust(NPY_HEADER_SIZE - 10 - 1) + '\n'
+    return b'\x93NUMPY\x01\x00' + struct.pack('<H', len(header)) + header.encode('latin1')
+
+
+class ShardWriter:
+    """
+    Appends the stems of many inputs to a few large array files.
+
+    Every shard holds one ``shard-NNNNN.<stem>.npy`` file per stem, shaped
+    [T, C], with the clips of all stems at the same frame offsets. A shard
+    is closed once it reaches ``shard_bytes`` and a clip never spans two
+    shards. ``index.json`` lists every clip's shard, offset, length and
+    sample rate, so a trainer can memory-map the shards and slice clips
+    without decoding anything. Open shards are written to hidden partial
+    files and renamed when complete.
+    """
+
+    def __init__(self, directory: str, stems: Sequence[str],
+                 shard_bytes: int = DEFAULT_SHARD_BYTES):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        if (self.directory / INDEX_NAME).exists():
+            raise ValueError(f"{self.directory} already contains an exported dataset")
+        self.stems = list(stems)
+        self.shard_bytes = max(1, shard_bytes)
+        self.dtype: Optional[np.dtype] = None
+        self.channels: Optional[int] = None
+        self.shards: List[Dict] = []
+        self.clips: List[Dict] = []
+        self._files: Dict[str, object] = {}
+        self._frames = 0
+        self._lock = threading.Lock()
+
+    def add(self, input_file: str, buffer: StemBuffer, sample_rate: int) -> List[str]:
+        """
+        Append the stems of one input.
+
+        Args:
+            input_file: Input the stems were separated from
+            buffer: Separated stems of the input
+            sample_rate: Sample rate of the stems
+
+        Returns:
+            Paths of the shard files holding the clip
+        """
+        if set(buffer.stems) != set(self.stems):
+            raise ValueError(f"Expected stems {', '.join(self.stems)}, "
+                             f"got {', '.join(buffer.stems)}")
+        # Packed 24-bit samples can't be mapped as an array, keep them as float
+        dtype = np.dtype(np.float32 if buffer.dtype == 'int24' else buffer.dtype)
+
+        with self._lock:
+            if self.dtype is None:
+                self.dtype, self.channels = dtype, buffer.channels
+            if (dtype, buffer.channels) != (self.dtype, self.channels):
+                raise ValueError(f"Clips must all have {self.channels} channels of {self.dtype} "
+                                 f"samples, got {buffer.channels} of {dtype}")
+
+            if not self._files:
+                self._open_shard()
+            offset = self._frames
+            try:
+                for stem in self.stems:
+                    if buffer.dtype == 'int24':
+                        self._files[stem].write(buffer.to_float(stem).tobytes())
+                    else:
+                        self._files[stem].write(memoryview(buffer.stems[stem]).cast('B'))
+            except BaseException:
+                # Keep the stems of every clip aligned
+                self._truncate(offset)
+                raise
+
+            self._frames += buffer.frames
+            shard = len(self.shards) - 1
+            self.clips.append({
+                'input': input_file,
+                'shard': shard,
+                'offset': offset,
+                'frames': buffer.frames,
+                'sample_rate': sample_rate,
+                'duration': buffer.frames / sample_rate,
+            })
+            paths = [str(self.directory / name) for name in self.shards[shard]['files'].values()]
+            if self._frames * self._frame_bytes >= self.shard_bytes:
+                self._close_shard()
+        return paths
+
+    def close(self):
+        """Finish the open shard and write the index."""
+        with self._lock:
+            if self._files:
+                self._close_shard()
+            self._write_index()
+
+    @property
+    def _frame_bytes(self) -> int:
+        """Bytes one frame of every stem takes up."""
+        return len(self.stems) * self.channels * self.dtype.itemsize
+
+    def _shard_path(self, name: str) -> str:
+        return str(self.directory / name)
+
+    def _open_shard(self):
+        """Start a shard with a placeholder header in every stem file."""
+        name = f"shard-{len(self.shards):05d}"
+        files = {stem: f"{name}.{stem}.npy" for stem in self.stems}
+        self.shards.append({'name': name, 'frames': 0, 'files': files})
+        self._frames = 0
+        for stem, file_name in files.items():
+            f = open(FileHandler.partial_path(self._shard_path(file_name)), 'wb')
+            f.write(npy_header((0, self.channels), self.dtype))
+            self._files[stem] = f
+
+    def _truncate(self, frames: int):
+        """Drop everything past a frame offset of the open shard."""
+        size = NPY_HEADER_SIZE + frames * self.channels * self.dtype.itemsize
+        for f in self._files.values():
+            f.seek(size)
+            f.truncate()
+
+    def _close_shard(self):
+        """Write the final headers, move the shard files into place and update the index."""
+        shard = self.shards[-1]
+        shard['frames'] = self._frames
+        for stem, f in self._files.items():
+            f.seek(0)
+            f.write(npy_header((self._frames, self.channels), self.dtype))
+            f.close()
+            path = self._shard_path(shard['files'][stem])
+            os.replace(FileHandler.partial_path(path), path)
+        self._files = {}
+        self._write_index()
+
+    def _write_index(self):
+        """Write the index of the completed shards atomically."""
+        complete = len(self.shards) - (1 if self._files else 0)
+        index = {
+            'stems': self.stems,
+            'dtype': str(self.dtype) if self.dtype is not None else None,
+            'channels': self.channels,
+            'shards': self.shards[:complete],
+            'clips': [clip for clip in self.clips if clip['shard'] < complete],
+        }
+        path = self._shard_path(INDEX_NAME)
+        partial_path = FileHandler.partial_path(path)
+        with open(partial_path, 'w', encoding='utf-8') as f:
+            json.dump(index, f, indent=1)
+        os.replace(partial_path, path)
+
+
+class ShardDataset:
+    """Random access to the clips of an exported dataset through memory maps."""
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        with open(self.directory / INDEX_NAME, encoding='utf-8') as f:
+            self.index = json.load(f)
+        self.stems: List[str] = self.index['stems']
+        self.clips: List[Dict] = self.index['clips']
+        self._arrays: Dict[str, np.ndarray] = {}
+
+    def __len__(self) -> int:
+        return len(self.clips)
+
+    def __getitem__(self, index: int) -> Dict[str, np.ndarray]:
+        """Get the [T, C] arrays of one clip's stems, read lazily from disk."""
+        clip = self.clips[index]
+        files = self.index['shards'][clip['shard']]['files']
+        start, end = clip['offset'], clip['offset'] + clip['frames']
+        return {stem: self._array(files[stem])[start:end] for stem in self.stems}
+
+    def _array(self, name: str) -> np.ndarray:
+        array = self._arrays.get(name)
+        if array is None:
+            array = self._arrays[name] = np.load(self.directory / name, mmap_mode='r')
+        return array
@@ -0,0 +1,120 @@
+"""
+Model weights in memory-mapped files shared between processes.
+"""
+
+import hashlib
+import json
+import os
+from itertools import chain
+from pathlib import Path
+from typing import Dict, Optional
+
+import torch
+
+
+# Byte alignment of every tensor in a weights file
+ALIGNMENT = 64
+
+
+def model_tensors(model: torch.nn.Module) -> Dict[str, torch.Tensor]:
+    """Get every parameter and buffer of a model by name."""
+    return dict(chain(model.named_parameters(), model.named_buffers()))
+
+
+def tensor_bytes(tensor: torch.Tensor) -> bytes:
+    """Get the raw bytes of a tensor's values."""
+    return tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy().tobytes()
+
+
+def weights_key(model_name: str, tensors: Dict[str, torch.Tensor]) -> str:
+    """Hash a model's name, tensor layout and values."""
+    digest = hashlib.blake2b(digest_size=20)
+    digest.update(model_name.encode('utf-8'))
+    for name, tensor in tensors.items():
+        digest.update(f"{name}:{tensor.dtype}:{tuple(tensor.shape)}".encode('utf-8'))
+        digest.update(tensor_bytes(tensor))
+    return digest.hexdigest()
+
+
+class SharedWeights:
+    """
+    Directory of model weights that processes map instead of copying.
+
+    The first process to load a model writes all its tensors into one flat
+    ``<key>.bin`` file, described by a ``<key>.json`` index. Every process
+    then points the model's parameters at a private, copy-on-write mapping
+    of that file, so the pages are held once in the page cache however many
+    workers use the model. The checkpoint is still read once per process to
+    build the model, but that copy is released as soon as it is attached.
+    """
+
+    def __init__(self, directory: str):
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def attach(self, model_name: str, model: torch.nn.Module) -> torch.nn.Module:
+        """
+        Back a CPU model's tensors with the shared weights file.
+
+        Args:
+            model_name: Name the model was loaded with
+            model: Model loaded on the CPU
+
+        Returns:
+            The same model, now reading its weights from the mapped file
+        """
+        tensors = model_tensors(model)
+        key = weights_key(model_name, tensors)
+        index = self._read_index(key)
+        if index is None:
+            index = self._export(key, tensors)
+
+        storage = torch.from_file(str(self._path(key, '.bin')), shared=False,
+                                  size=index['size'], dtype=torch.uint8)
+        with torch.no_grad():
+            for name, tensor in tensors.items():
+                entry = index['tensors'][name]
+                view = storage[entry['offset']:entry['offset'] + entry['bytes']]
+                tensor.data = view.view(tensor.dtype).view(tensor.shape)
+        return model
+
+    def _path(self, key: str, suffix: str) -> Path:
+        return self.directory / f"{key}{suffix}"
+
+    def _read_index(self, key: str) -> Optional[dict]:
+        """Read the index of a weights file, or None if it is missing."""
+        try:
+            with open(self._path(key, '.json'), encoding='utf-8') as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _export(self, key: str, tensors: Dict[str, torch.Tensor]) -> dict:
+        """
+        Write tensors to a weights file and its index.
+
+        Both files are written under temporary names and renamed, the index
+        last, so a reader never maps a partial file.
+        """
+        entries = {}
+        offset = 0
+        temp_suffix = f".{os.getpid()}.tmp"
+        data_path = self._path(key, '.bin')
+        temp_data = data_path.with_name(data_path.name + temp_suffix)
+        with open(temp_data, 'wb') as f:
+            for name, tensor in tensors.items():
+                data = tensor_bytes(tensor)
+                f.write(b'\0' * (-offset % ALIGNMENT))
+                offset += -offset % ALIGNMENT
+                entries[name] = {'offset': offset, 'bytes': len(data)}
+                f.write(data)
+                offset += len(data)
+        os.replace(temp_data, data_path)
+
+        index = {'size': offset, 'tensors': entries}
+        index_path = self._path(key, '.json')
+        temp_index = index_path.with_name(index_path.name + temp_suffix)
+        with open(temp_index, 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(temp_index, index_path)
+        return index
@@ -0,0 +1,87 @@
+"""
+Detection of silent regions that don't need to go through the model.
+"""
+
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import torch
+import torch.nn.functional as F
+
+from .postprocess import db_to_gain
+
+
+# Samples per analysis frame
+ANALYSIS_FRAME = 1024
+
+Span = Tuple[int, int]
+
+
+@dataclass
+class SilenceGate:
+    """
+    Finds the active spans of a mixture.
+
+    A region is silent when the RMS level of every channel stays below
+    ``threshold_db`` for at least ``min_silence`` seconds. Active spans
+    keep ``padding`` seconds of the surrounding silence so the model sees
+    the context around every onset and release.
+    """
+    threshold_db: float = -60.0
+    min_silence: float = 2.0
+    padding: float = 0.5
+
+    @classmethod
+    def from_settings(cls, settings) -> Optional['SilenceGate']:
+        """Create a gate from performance settings, or None if disabled."""
+        if not settings.skip_silence:
+            return None
+        return cls(threshold_db=settings.silence_threshold_db,
+                   min_silence=settings.min_silence_seconds)
+
+    def active_spans(self, wav: torch.Tensor, sample_rate: int) -> List[Span]:
+        """
+        Get the regions of a [B, C, T] mixture worth separating.
+
+        A frame counts as silent only if it is silent in every input of the
+        batch, so the spans apply to the whole batch.
+
+        Args:
+            wav: Mixture to analyse
+            sample_rate: Sample rate of the mixture
+
+        Returns:
+            Sorted, non-overlapping (start, end) frame ranges
+        """
+        length = wav.shape[-1]
+        frames = -(-length // ANALYSIS_FRAME)
+        padded = F.pad(wav, (0, frames * ANALYSIS_FRAME - length))
+        energy = padded.reshape(*wav.shape[:-1], frames, ANALYSIS_FRAME).float().pow(2).mean(-1)
+        silent = (energy.flatten(0, -2).amax(dim=0) < db_to_gain(self.threshold_db) ** 2)
+
+        # Edges of the runs of silent frames
+        edges = torch.diff(silent.to(torch.int8), prepend=silent.new_zeros(1, dtype=torch.int8),
+                           append=silent.new_zeros(1, dtype=torch.int8))
+        run_starts = (edges == 1).nonzero().flatten().tolist()
+        run_ends = (edges == -1).nonzero().flatten().tolist()
+
+        min_frames = self.min_silence * sample_rate
+        padding = int(self.padding * sample_rate)
+        spans = []
+        position = 0
+        for run_start, run_end in zip(run_starts, run_ends):
+            start = run_start * ANALYSIS_FRAME
+            end = min(run_end * ANALYSIS_FRAME, length)
+            if end - start < min_frames:
+                continue
+            # The track edges have no neighbouring audio that needs context
+            gap_start = start + padding if start > 0 else 0
+            gap_end = end - padding if end < length else length
+            if gap_end - gap_start <= 0:
+                continue
+            if gap_start > position:
+                spans.append((position, gap_start))
+            position = gap_end
+        if position < length:
+            spans.append((position, length))
+        return spans
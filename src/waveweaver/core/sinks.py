@@ -0,0 +1,112 @@
+"""
+Sinks receiving separated audio while inference is still running.
+"""
+
+import os
+import queue
+import threading
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from ..utils.file_handler import FileHandler
+
+
+# Marks the end of the written blocks
+_DONE = object()
+
+
+class StemFileSink:
+    """
+    Writes every selected stem to its own audio file block by block.
+
+    All files are opened up front and blocks are appended by a writer
+    thread, so encoding overlaps the separation of the following chunks
+    and only ``queue_depth`` blocks are ever held in memory. Blocks go to
+    hidden temporary files that :meth:`close` renames into place, so a
+    stem file only ever exists complete; :meth:`abort` deletes them.
+    """
+
+    def __init__(self, paths: Dict[str, str], stem_names: Sequence[str],
+                 sample_rate: int, channels: int, subtype: Optional[str] = None,
+                 queue_depth: int = 2, metadata: Optional[Dict[str, str]] = None):
+        self.paths = dict(paths)
+        self._partial_paths = {stem: FileHandler.partial_path(path)
+                               for stem, path in self.paths.items()}
+        self._indices = {stem: list(stem_names).index(stem) for stem in self.paths}
+        self._files: Dict[str, sf.SoundFile] = {}
+        try:
+            for stem, path in self._partial_paths.items():
+                self._files[stem] = sf.SoundFile(path, 'w', samplerate=sample_rate,
+                                                 channels=channels, subtype=subtype)
+                for key, value in (metadata or {}).items():
+                    setattr(self._files[stem], key, value)
+        except Exception:
+            self.abort()
+            raise
+
+        self._queue: "queue.Queue" = queue.Queue(maxsize=max(1, queue_depth))
+        self._error: Optional[BaseException] = None
+        self._thread = threading.Thread(target=self._write_worker, daemon=True)
+        self._thread.start()
+
+    def write(self, sources: torch.Tensor):
+        """Append a [S, C, T] block of separated sources in model order."""
+        if self._error is not None:
+            raise self._error
+        blocks = {
+            stem: np.ascontiguousarray(sources[index].T.numpy(), dtype=np.float32)
+            for stem, index in self._indices.items()
+        }
+        self._queue.put(blocks)
+
+    def close(self) -> List[str]:
+        """Finish writing and move every file into place."""
+        self._stop()
+        if self._error is not None:
+            self._remove_files()
+            raise self._error
+        for stem, path in self.paths.items():
+            os.replace(self._partial_paths[stem], path)
+        return list(self.paths.values())
+
+    def abort(self):
+        """Stop writing and delete the partial files."""
+        self._stop()
+        self._remove_files()
+
+    def _write_worker(self):
+        """Append queued blocks to the stem files."""
+        while True:
+            blocks = self._queue.get()
+            if blocks is _DONE:
+                break
+            if self._error is not None:
+                # Keep draining so the producer never blocks on a full queue
+                continue
+            try:
+                for stem, block in blocks.items():
+                    self._files[stem].write(block)
+            except Exception as e:
+                self._error = e
+
+    def _stop(self):
+        """Wait for pending blocks and close the files."""
+        thread = getattr(self, '_thread', None)
+        if thread is not None and thread.is_alive():
+            self._queue.put(_DONE)
+            thread.join()
+        for f in self._files.values():
+            if not f.closed:
+                f.close()
+
+    def _remove_files(self):
+        """Delete every file this sink created."""
+        for stem in self._files:
+            try:
+                Path(self._partial_paths[stem]).unlink()
+            except OSError:
+                pass
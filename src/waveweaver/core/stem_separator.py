@@ -2,28 +2,29 @@
 Core stem separation logic using Demucs.
 """
 
-import os
 import time
 import warnings
-from pathlib import Path
-from typing import List, Callable, Optional
+from typing import List, Optional
 
-import torch
-import soundfile as sf
-import numpy as np
 from PySide6.QtCore import QThread, Signal
 
-from demucs.apply import apply_model
-from demucs.audio import AudioFile
-from demucs.pretrained import get_model
+from .engine import SeparationEngine, read_audio_info
+from .models import ProcessingStatus, ProcessingResult, AudioFileInfo
+from .preview import DEFAULT_PREVIEW_SECONDS, separate_preview
+from .worker import PreviewJob, SeparationJob, SeparationWorker, create_engine
 
-from .models import ProcessingStatus, ProcessingResult, AudioFileInfo, AvailableModels
-from ..utils.file_handler import FileHandler
-from ..utils.helpers import create_safe_filename, truncate_filename
+
+# Error message of the result of a cancelled separation
+CANCELLED_MESSAGE = "Cancelled"
 
 
 class StemSeparatorThread(QThread):
-    """Thread for handling stem separation processing."""
+    """
+    Thread for handling stem separation processing.
+
+    Separation runs on this thread, or in a worker process when one is
+    given; the thread then relays the worker's progress as signals.
+    """
     
     # Signals
     progress = Signal(int)
@@ -35,18 +36,25 @@ class StemSeparatorThread(QThread):
     artificial_progress_finished = Signal()
     
     def __init__(self, input_file: str, output_dir: str, 
-                 stems: List[str], model_name: str):
+                 stems: List[str], model_name: str,
+                 engine: Optional[SeparationEngine] = None,
+                 worker: Optional[SeparationWorker] = None):
         super().__init__()
         self.input_file = input_file
         self.output_dir = output_dir
         self.stems = stems
         self.model_name = model_name
+        self.worker = worker
+        self.engine = engine or (None if worker else SeparationEngine(model_name))
         self.processing_complete = False
         self.start_time = 0
         self._is_cancelled = False
         
     def run(self):
         """Main processing thread."""
+        if self.worker is not None:
+            self._run_in_worker()
+            return
         try:
             self.start_time = time.time()
             warnings.filterwarnings("ignore")
@@ -73,18 +81,17 @@ class StemSeparatorThread(QThread):
             if self._is_cancelled:
                 return
             
-            # Apply model
-            sources = self._apply_separation(model, wav)
+            # Separate, writing stems as each chunk is finished
+            output_files = self._separate_to_files(wav, sample_rate)
+            del wav
+            if self.engine.fell_back_to_cpu:
+                self.device_info.emit(f"{device_name} (CPU fallback, out of GPU memory)")
             self.processing_complete = True
             self.artificial_progress_finished.emit()
-            self.progress.emit(80)
             
             if self._is_cancelled:
                 return
             
-            # Save stems
-            self.status_changed.emit(ProcessingStatus.SAVING)
-            output_files = self._save_stems(sources, sample_rate)
             self.progress.emit(100)
             
             # Emit success
@@ -92,7 +99,10 @@ class StemSeparatorThread(QThread):
             result = ProcessingResult(
                 success=True,
                 output_files=output_files,
-                processing_time=processing_time
+                processing_time=processing_time,
+                input_file=self.input_file,
+                transfer_time=self.engine.transfer_time,
+                compute_saved=self.engine.compute_saved
             )
             self.status_changed.emit(ProcessingStatus.COMPLETED)
             self.finished.emit(result)
@@ -111,101 +121,131 @@ class StemSeparatorThread(QThread):
     def cancel(self):
         """Cancel the processing."""
         self._is_cancelled = True
+        if self.worker is not None:
+            self.worker.cancel()
         self.status_changed.emit(ProcessingStatus.CANCELLED)
     
+    def force_stop(self):
+        """Stop the processing immediately by restarting the worker process."""
+        self._is_cancelled = True
+        if self.worker is not None:
+            self.worker.kill()
+    
+    def _run_in_worker(self):
+        """Run the job in the worker process and relay its events."""
+        self.start_time = time.time()
+        self.worker.submit(SeparationJob(self.input_file, self.output_dir,
+                                         self.stems, self.model_name))
+        for event, value in self.worker.events():
+            if event == 'audio_info':
+                self.audio_info.emit(value)
+            elif event == 'progress':
+                self.progress.emit(value)
+            elif event == 'status':
+                self.status_changed.emit(value)
+            elif event == 'device':
+                self.device_info.emit(value)
+            elif event == 'separated':
+                self.processing_complete = True
+                self.artificial_progress_finished.emit()
+            elif event == 'finished':
+                self.finished.emit(value)
+            elif event == 'error':
+                self.error.emit(value)
+                self.status_changed.emit(ProcessingStatus.ERROR)
+                self.finished.emit(ProcessingResult(success=False, output_files=[],
+                                                    error_message=value))
+            elif event == 'cancelled':
+                self.status_changed.emit(ProcessingStatus.CANCELLED)
+                self.finished.emit(ProcessingResult(success=False, output_files=[],
+                                                    error_message=CANCELLED_MESSAGE))
+    
     def _get_audio_info(self) -> AudioFileInfo:
         """Get information about the audio file."""
-        try:
-            info = sf.info(self.input_file)
-            return AudioFileInfo(
-                path=self.input_file,
-                duration=info.duration,
-                sample_rate=info.samplerate,
-                channels=info.channels,
-                format=info.format
-            )
-        except Exception:
-            return AudioFileInfo(
-                path=self.input_file,
-                duration=0,
-                sample_rate=44100,
-                channels=2,
-                format="unknown"
-            )
+        return read_audio_info(self.input_file)
     
     def _load_model(self):
         """Load the Demucs model."""
-        model = get_model(self.model_name)
-        if torch.cuda.is_available():
-            model.cuda()
-        else:
-            model.cpu()
-        return model
+        return self.engine.load_model()
     
     def _get_device_name(self) -> str:
         """Get the processing device name."""
-        if torch.cuda.is_available():
-            gpu_name = torch.cuda.get_device_name(0)
-            return f'GPU - {gpu_name}'
-        else:
-            return 'CPU'
+        return self.engine.get_device_name()
     
     def _load_audio(self):
         """Load and prepare audio for processing."""
-        audio_file = AudioFile(self.input_file)
-        wav = audio_file.read()
-        sample_rate = audio_file.samplerate()
-        
-        if wav.dim() == 1:
-            wav = wav.unsqueeze(0)
-        
-        return wav, sample_rate
+        return self.engine.load_audio(self.input_file)
     
-    def _apply_separation(self, model, wav):
-        """Apply the model for stem separation."""
-        device = 'cuda' if torch.cuda.is_available() else 'cpu'
-        sources = apply_model(
-            model, 
-            wav, 
-            device=device,
-            progress=False,
-            shifts=2
+    def _separate_to_files(self, wav, sample_rate) -> List[str]:
+        """Separate the audio and stream the selected stems to files."""
+        return self.engine.separate_to_files(
+            wav,
+            sample_rate,
+            self.input_file,
+            self.output_dir,
+            self.stems,
+            is_cancelled=lambda: self._is_cancelled
         )
-        return sources.cpu()
+
+
+class PreviewThread(QThread):
+    """
+    Thread for separating a short preview window of a file.
+
+    Like :class:`StemSeparatorThread`, the preview runs in the worker
+    process when one is given, so it reuses the model loaded there and
+    can be stopped with :meth:`force_stop`.
+    """
     
-    def _save_stems(self, sources, sample_rate) -> List[str]:
-        """Save the separated stems to files."""
-        # Create output folder
-        base_name = Path(self.input_file).stem
-        output_folder = Path(self.output_dir) / base_name
-        output_folder.mkdir(exist_ok=True)
-        
-        # Get stem names for the model
-        model_info = AvailableModels.get_model(self.model_name)
-        stem_names = model_info.stems
-        
-        output_files = []
-        progress_per_stem = 20 / len(self.stems)
-        current_progress = 80
-        
-        for stem in self.stems:
-            if self._is_cancelled:
-                break
-                
-            # Find the correct stem index
-            stem_index = stem_names.index(stem)
-            
-            # Create safe filename
-            original_name = Path(self.input_file).stem
-            truncated_name = truncate_filename(original_name, 25)
-            output_file = output_folder / f"{truncated_name} - {stem}.wav"
-            
-            # Save stem
-            stem_audio = sources[0, stem_index].numpy()
-            sf.write(str(output_file), stem_audio.T, sample_rate)
-            
-            output_files.append(str(output_file))
-            current_progress += progress_per_stem
-            self.progress.emit(int(current_progress))
-        
-        return output_files
\ No newline at end of file
+    # Signals
+    preview_ready = Signal(object)
+    error = Signal(str)
+    
+    def __init__(self, input_file: str, model_name: str, position: float,
+                 duration: float = DEFAULT_PREVIEW_SECONDS,
+                 engine: Optional[SeparationEngine] = None,
+                 worker: Optional[SeparationWorker] = None):
+        super().__init__()
+        self.input_file = input_file
+        self.model_name = model_name
+        self.position = position
+        self.duration = duration
+        self.worker = worker
+        self.engine = engine or (None if worker else create_engine(model_name))
+    
+    def run(self):
+        """Separate the preview window."""
+        if self.worker is not None:
+            self._run_in_worker()
+            return
+        try:
+            warnings.filterwarnings("ignore")
+            audio_info = read_audio_info(self.input_file)
+            result = separate_preview(
+                self.engine,
+                self.input_file,
+                self.position,
+                self.duration,
+                total_duration=audio_info.duration
+            )
+            result.write_temp()
+            self.preview_ready.emit(result)
+        except Exception as e:
+            self.error.emit(str(e))
+    
+    def force_stop(self):
+        """Stop the preview immediately by restarting the worker process."""
+        if self.worker is not None:
+            self.worker.kill()
+    
+    def _run_in_worker(self):
+        """Run the preview in the worker process and relay its outcome."""
+        self.worker.submit(PreviewJob(self.input_file, self.model_name,
+                                      self.position, self.duration))
+        for event, value in self.worker.events():
+            if event == 'finished':
+                self.preview_ready.emit(value)
+            elif event == 'error':
+                self.error.emit(value)
+            elif event == 'cancelled':
+                self.error.emit("Preview cancelled")
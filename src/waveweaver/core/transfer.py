@@ -0,0 +1,95 @@
+"""
+Host <-> device transfers through pinned staging buffers on a copy stream.
+"""
+
+import time
+from typing import List, Optional, Tuple
+
+import torch
+
+
+class PendingTransfer:
+    """A copy that may still be in flight on the copy stream."""
+
+    def __init__(self, tensor: torch.Tensor, done: Optional["torch.cuda.Event"] = None,
+                 to_host: bool = False):
+        self.tensor = tensor
+        self.done = done
+        self.to_host = to_host
+
+
+class DeviceTransfer:
+    """
+    Moves chunks between host and device without blocking compute.
+
+    Uploads go through pinned host buffers and run on a dedicated CUDA
+    stream, so the next chunk is copied while the current one is separated,
+    and downloads of finished chunks overlap the following forward pass.
+    On the CPU every operation is a no-op.
+    """
+
+    def __init__(self, device: str):
+        self.device = device
+        self.enabled = device.startswith('cuda') and torch.cuda.is_available()
+        self._stream = torch.cuda.Stream(torch.device(device)) if self.enabled else None
+        self._timings: List[Tuple["torch.cuda.Event", "torch.cuda.Event"]] = []
+        self._staging_time = 0.0
+
+    def upload(self, tensor: torch.Tensor) -> PendingTransfer:
+        """Start copying a host tensor to the device."""
+        if not self.enabled:
+            return PendingTransfer(tensor)
+
+        start = time.perf_counter()
+        staging = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+        staging.copy_(tensor)
+        self._staging_time += time.perf_counter() - start
+
+        with torch.cuda.stream(self._stream):
+            begin, end = self._events()
+            begin.record()
+            result = staging.to(self.device, non_blocking=True)
+            end.record()
+        return PendingTransfer(result, end)
+
+    def download(self, tensor: torch.Tensor) -> PendingTransfer:
+        """Start copying a device tensor back to pinned host memory."""
+        if not self.enabled or not tensor.is_cuda:
+            return PendingTransfer(tensor, to_host=True)
+
+        # Wait for the kernels producing the tensor before copying it
+        self._stream.wait_stream(torch.cuda.current_stream(tensor.device))
+        with torch.cuda.stream(self._stream):
+            begin, end = self._events()
+            begin.record()
+            result = torch.empty(tensor.shape, dtype=tensor.dtype, pin_memory=True)
+            result.copy_(tensor, non_blocking=True)
+            end.record()
+        # Keep the device memory alive until the copy stream is done with it
+        tensor.record_stream(self._stream)
+        return PendingTransfer(result, end, to_host=True)
+
+    def wait(self, pending: PendingTransfer) -> torch.Tensor:
+        """Get the result of a transfer, waiting only as long as needed."""
+        if pending.done is None:
+            return pending.tensor
+        if pending.to_host:
+            pending.done.synchronize()
+        else:
+            compute_stream = torch.cuda.current_stream(pending.tensor.device)
+            compute_stream.wait_event(pending.done)
+            pending.tensor.record_stream(compute_stream)
+        return pending.tensor
+
+    def elapsed(self) -> float:
+        """Get the total time spent copying, in seconds."""
+        if self._timings:
+            self._timings[-1][1].synchronize()
+        copy_ms = sum(begin.elapsed_time(end) for begin, end in self._timings)
+        return self._staging_time + copy_ms / 1000
+
+    def _events(self) -> Tuple["torch.cuda.Event", "torch.cuda.Event"]:
+        """Create a timed pair of events for one copy."""
+        events = (torch.cuda.Event(enable_timing=True), torch.cuda.Event(enable_timing=True))
+        self._timings.append(events)
+        return events
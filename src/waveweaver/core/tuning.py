@@ -0,0 +1,160 @@
+"""
+Micro-benchmarks choosing the fastest engine configuration for this machine.
+"""
+
+import os
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Callable, Dict, List, Optional
+
+import torch
+
+from .engine import SeparationEngine
+from .memory import is_out_of_memory
+from .segment_cache import model_segment_seconds
+from ..config.defaults import DEFAULT_TUNE_SECONDS
+
+
+# Model segment lengths tried, as fractions of the model's own
+SEGMENT_FRACTIONS = (1.0, 0.75, 0.5)
+
+# Shortest segment worth trying, in seconds
+MIN_SEGMENT_SECONDS = 1.0
+
+BATCH_SIZES = (1, 2, 4, 8)
+
+
+@dataclass
+class TunedConfig:
+    """Engine configuration and its measured cost."""
+    device: str
+    cpu_threads: int = 0
+    segment: Optional[float] = None
+    batch_size: int = 1
+    # Seconds per second of audio, one pass
+    rtf: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Get the profile stored in the tuned settings file."""
+        return asdict(self)
+
+
+def candidate_devices() -> List[str]:
+    """Get the devices worth benchmarking."""
+    return ['cuda', 'cpu'] if torch.cuda.is_available() else ['cpu']
+
+
+def candidate_threads(cpu_count: Optional[int] = None) -> List[int]:
+    """Get the CPU thread counts worth benchmarking, most first."""
+    cpu_count = cpu_count or os.cpu_count() or 1
+    return sorted({cpu_count, max(1, cpu_count // 2), max(1, cpu_count // 4)}, reverse=True)
+
+
+class Tuner:
+    """
+    Searches device, CPU threads, segment length and batch size for a model.
+
+    Parameters are tuned one after the other, each keeping the best value
+    found for the previous ones, so a full run takes a dozen short trials
+    instead of the whole grid. A trial that runs out of device memory, or
+    falls back to the CPU, doesn't fit and is discarded.
+    """
+
+    def __init__(self, model_name: str, seconds: float = DEFAULT_TUNE_SECONDS,
+                 engine_factory: Callable[..., Any] = SeparationEngine,
+                 on_trial: Optional[Callable[[TunedConfig], None]] = None):
+        self.model_name = model_name
+        self.seconds = seconds
+        self.engine_factory = engine_factory
+        self.on_trial = on_trial
+
+    def tune(self, devices: Optional[List[str]] = None) -> TunedConfig:
+        """
+        Find the fastest configuration that fits on this machine.
+
+        Args:
+            devices: Devices to consider, all available ones if None
+
+        Returns:
+            The fastest configuration found
+
+        Raises:
+            RuntimeError: If no configuration could run
+        """
+        original_threads = torch.get_num_threads()
+        try:
+            trials = []
+            for device in devices or candidate_devices():
+                threads = candidate_threads() if device == 'cpu' else [0]
+                trials += [self._trial(TunedConfig(device, cpu_threads=count))
+                           for count in threads]
+            best = self._fastest(trials)
+            if best is None:
+                raise RuntimeError(f"Model {self.model_name} could not run on any device")
+
+            model_segment = self._model_segment(best)
+            segments = [model_segment * fraction for fraction in SEGMENT_FRACTIONS[1:]
+                        if model_segment * fraction >= MIN_SEGMENT_SECONDS]
+            best = self._fastest([best] + [
+                self._trial(TunedConfig(best.device, best.cpu_threads, round(segment, 2)))
+                for segment in segments
+            ])
+
+            for batch_size in BATCH_SIZES[1:]:
+                trial = self._trial(TunedConfig(best.device, best.cpu_threads,
+                                                best.segment, batch_size))
+                if trial.rtf <= 0 or trial.rtf >= best.rtf:
+                    # Larger batches won't fit or help either
+                    break
+                best = trial
+            return best
+        finally:
+            torch.set_num_threads(original_threads)
+
+    @staticmethod
+    def _fastest(trials: List[TunedConfig]) -> Optional[TunedConfig]:
+        """Get the trial with the lowest cost, ignoring those that didn't fit."""
+        fitting = [trial for trial in trials if trial.rtf > 0]
+        return min(fitting, key=lambda trial: trial.rtf) if fitting else None
+
+    def _create_engine(self, config: TunedConfig):
+        """Create a single-pass engine for a configuration."""
+        if config.cpu_threads:
+            torch.set_num_threads(config.cpu_threads)
+        return self.engine_factory(self.model_name, shifts=0, device=config.device,
+                                   segment=config.segment)
+
+    def _model_segment(self, config: TunedConfig) -> float:
+        """Get the segment length the model processes by default."""
+        return model_segment_seconds(self._create_engine(config).model)
+
+    def _trial(self, config: TunedConfig) -> TunedConfig:
+        """Measure a configuration, leaving its cost at 0 if it doesn't fit."""
+        config.rtf = self._measure(config) or 0.0
+        if self.on_trial:
+            self.on_trial(config)
+        return config
+
+    def _measure(self, config: TunedConfig) -> Optional[float]:
+        """Get the seconds a configuration takes per second of audio, None if it doesn't fit."""
+        engine = self._create_engine(config)
+        samplerate = int(getattr(engine.model, 'samplerate', 44100))
+        channels = int(getattr(engine.model, 'audio_channels', 2))
+        generator = torch.Generator().manual_seed(0)
+        clip = 0.1 * torch.randn(1, channels, int(self.seconds * samplerate), generator=generator)
+        try:
+            # Warm up kernels and allocator caches outside the timing
+            engine.separate(clip[..., :samplerate])
+            start = time.perf_counter()
+            if config.batch_size > 1:
+                engine.separate_batch([clip] * config.batch_size)
+            else:
+                engine.separate(clip)
+            elapsed = time.perf_counter() - start
+        except RuntimeError as error:
+            if is_out_of_memory(error):
+                return None
+            raise
+        if engine.fell_back_to_cpu:
+            return None
+        return elapsed / (self.seconds * config.batch_size)
@@ -0,0 +1,343 @@
+"""
+Watch-folder ingestion: separates audio files as they appear in directories.
+"""
+
+import ctypes
+import ctypes.util
+import json
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Set, Tuple
+
+from .models import ProcessingResult
+from ..config.defaults import DEFAULT_SETTLE_SECONDS
+from ..utils.file_handler import FileHandler
+
+
+# Seconds between checks of pending files and, when polling, of directories
+DEFAULT_POLL_INTERVAL = 1.0
+
+# inotify flags, see inotify(7)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_Q_OVERFLOW = 0x00004000
+_IN_ISDIR = 0x40000000
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_WATCH_MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+_EVENT_HEADER = struct.Struct('iIII')
+
+Signature = Tuple[int, int]
+
+
+def file_signature(path: str) -> Optional[Signature]:
+    """Get the (size, mtime in ns) of a file, or None if it is gone."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime_ns
+
+
+def scan_audio_files(root: str) -> Dict[str, Signature]:
+    """Get the signature of every supported audio file below a directory."""
+    files = {}
+    for dirpath, _, filenames in os.walk(root):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if FileHandler.is_audio_file(path):
+                signature = file_signature(path)
+                if signature is not None:
+                    files[path] = signature
+    return files
+
+
+class PollingWatcher:
+    """Detects new or changed audio files by rescanning directories."""
+
+    def __init__(self, roots: Iterable[str]):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self._snapshot: Dict[str, Signature] = {}
+
+    def changes(self, timeout: float) -> Set[str]:
+        """Wait up to timeout seconds and return paths that changed."""
+        time.sleep(timeout)
+        return self.scan()
+
+    def scan(self) -> Set[str]:
+        """Rescan every root and return paths that are new or changed."""
+        snapshot: Dict[str, Signature] = {}
+        for root in self.roots:
+            snapshot.update(scan_audio_files(root))
+        changed = {path for path, signature in snapshot.items()
+                   if self._snapshot.get(path) != signature}
+        self._snapshot = snapshot
+        return changed
+
+    def close(self):
+        """Release resources held by the watcher."""
+
+
+class InotifyWatcher:
+    """Detects new or changed audio files with Linux inotify."""
+
+    def __init__(self, roots: Iterable[str]):
+        self.roots = [os.path.abspath(root) for root in roots]
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self._fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._directories: Dict[int, str] = {}
+        for root in self.roots:
+            self._watch_tree(root)
+
+    def changes(self, timeout: float) -> Set[str]:
+        """Wait up to timeout seconds and return paths that changed."""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        try:
+            data = os.read(self._fd, 64 * 1024)
+        except BlockingIOError:
+            return set()
+
+        changed: Set[str] = set()
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].split(b'\0', 1)[0]
+            offset += length
+
+            if mask & _IN_Q_OVERFLOW:
+                changed.update(self.scan())
+                continue
+            directory = self._directories.get(wd)
+            if directory is None or not name:
+                continue
+            path = os.path.join(directory, os.fsdecode(name))
+            if mask & _IN_ISDIR:
+                # Files moved in together with a directory raise no events
+                try:
+                    self._watch_tree(path)
+                except OSError:
+                    pass
+                changed.update(scan_audio_files(path))
+            elif FileHandler.is_audio_file(path):
+                changed.add(path)
+        return changed
+
+    def scan(self) -> Set[str]:
+        """Get every audio file currently below the roots."""
+        changed: Set[str] = set()
+        for root in self.roots:
+            changed.update(scan_audio_files(root))
+        return changed
+
+    def close(self):
+        """Release the inotify descriptor."""
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+    def _watch_tree(self, root: str):
+        """Watch a directory and all of its subdirectories."""
+        for dirpath, _, _ in os.walk(root):
+            wd = self._libc.inotify_add_watch(self._fd, os.fsencode(dirpath), _WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f"Cannot watch {dirpath}")
+            self._directories[wd] = dirpath
+
+
+def create_watcher(roots: Iterable[str], polling: bool = False):
+    """Create an inotify watcher, falling back to polling where unavailable."""
+    roots = list(roots)
+    if not polling and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(roots)
+        except (OSError, AttributeError):
+            # No inotify support, or the watch limit is exhausted
+            pass
+    return PollingWatcher(roots)
+
+
+class WatchState:
+    """
+    Durable record of the files a watch job has already handled.
+
+    Entries are keyed by path and remember the file signature, so a file is
+    handled again only if it is replaced. The state is rewritten atomically
+    after every file.
+    """
+
+    VERSION = 1
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.files: Dict[str, Dict] = {}
+        self._lock = threading.Lock()
+        self._load()
+
+    def is_handled(self, path: str, signature: Signature) -> bool:
+        """Check whether a file with this signature was already handled."""
+        entry = self.files.get(path)
+        return entry is not None and (entry['size'], entry['mtime_ns']) == tuple(signature)
+
+    def record(self, path: str, signature: Signature, result: ProcessingResult):
+        """Remember the outcome of a file and persist the state."""
+        with self._lock:
+            self.files[path] = {
+                'size': signature[0],
+                'mtime_ns': signature[1],
+                'status': 'done' if result.success else 'failed',
+                'outputs': result.output_files,
+                'error': result.error_message,
+            }
+            self._save()
+
+    def _load(self):
+        """Load the state file if it exists."""
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        if data.get('version') == self.VERSION:
+            self.files = data.get('files', {})
+
+    def _save(self):
+        """Write the state file atomically."""
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(self.path.suffix + '.tmp')
+        with open(temp_path, 'w', encoding='utf-8') as f:
+            json.dump({'version': self.VERSION, 'files': self.files}, f, indent=1)
+        os.replace(temp_path, self.path)
+
+
+class WatchService:
+    """
+    Separates audio files dropped into watched directories.
+
+    New files are held back until their size and modification time have
+    been stable for ``settle_seconds``, so partially copied files are never
+    read. Stems are written to an output tree mirroring the watched one,
+    and the engine keeps its model loaded between files.
+    """
+
+    def __init__(self, engine, roots: Iterable[str], output_dir: str, stems: List[str],
+                 state: WatchState, watcher=None,
+                 settle_seconds: float = DEFAULT_SETTLE_SECONDS,
+                 poll_interval: float = DEFAULT_POLL_INTERVAL,
+                 on_result: Optional[Callable[[ProcessingResult], None]] = None):
+        self.engine = engine
+        self.roots = [os.path.abspath(root) for root in roots]
+        self.output_dir = os.path.abspath(output_dir)
+        self.stems = stems
+        self.state = state
+        self.watcher = watcher or create_watcher(self.roots)
+        self.settle_seconds = settle_seconds
+        self.poll_interval = poll_interval
+        self.on_result = on_result
+        self._pending: Dict[str, Tuple[Signature, float]] = {}
+        self._stop = threading.Event()
+
+        # Files already present when the service starts
+        for path in self.watcher.scan():
+            self._track(path, time.monotonic())
+
+    def run(self):
+        """Process files until stop() is called."""
+        try:
+            while not self._stop.is_set():
+                self.run_once(self.watcher.changes(self.poll_interval))
+        finally:
+            self.watcher.close()
+
+    def stop(self):
+        """Ask run() to return after the current step."""
+        self._stop.set()
+
+    def run_once(self, changed: Iterable[str] = (), now: Optional[float] = None) -> List[ProcessingResult]:
+        """
+        Track changed files and separate the ones that have settled.
+
+        Args:
+            changed: Paths reported by the watcher since the last step
+            now: Current monotonic time, for tests
+
+        Returns:
+            Results of the files separated in this step
+        """
+        now = time.monotonic() if now is None else now
+        for path in changed:
+            self._track(path, now)
+
+        ready = self._settled(now)
+        results = []
+        for output_dir, paths in self._group_by_output(ready).items():
+            Path(output_dir).mkdir(parents=True, exist_ok=True)
+            signatures = {path: self._pending[path][0] for path in paths}
+            for result in self.engine.separate_files(paths, output_dir, self.stems,
+                                                     is_cancelled=self._stop.is_set):
+                path = result.input_file
+                self.state.record(path, signatures[path], result)
+                # Files left without a result, e.g. when stopped, stay pending
+                if self._pending.get(path, (None,))[0] == signatures[path]:
+                    del self._pending[path]
+                results.append(result)
+                if self.on_result:
+                    self.on_result(result)
+        return results
+
+    def mirror_dir(self, path: str) -> str:
+        """Get the output directory mirroring an input file's directory."""
+        for root in self.roots:
+            if os.path.commonpath([root, path]) == root:
+                relative = os.path.relpath(os.path.dirname(path), root)
+                if len(self.roots) > 1:
+                    relative = os.path.join(os.path.basename(root), relative)
+                return os.path.normpath(os.path.join(self.output_dir, relative))
+        return self.output_dir
+
+    def _track(self, path: str, now: float):
+        """Start or restart the settle timer of a file."""
+        if not FileHandler.is_audio_file(path) or self._is_output(path):
+            return
+        signature = file_signature(path)
+        if signature is None or self.state.is_handled(path, signature):
+            self._pending.pop(path, None)
+            return
+        previous = self._pending.get(path)
+        if previous is None or previous[0] != signature:
+            self._pending[path] = (signature, now)
+
+    def _is_output(self, path: str) -> bool:
+        """Check whether a file was written by this service."""
+        return os.path.commonpath([self.output_dir, os.path.abspath(path)]) == self.output_dir
+
+    def _settled(self, now: float) -> List[str]:
+        """Get pending files whose signature has not changed for settle_seconds."""
+        ready = []
+        for path, (signature, since) in list(self._pending.items()):
+            current = file_signature(path)
+            if current is None:
+                del self._pending[path]
+            elif current != signature:
+                self._pending[path] = (current, now)
+            elif now - since >= self.settle_seconds:
+                ready.append(path)
+        return sorted(ready)
+
+    def _group_by_output(self, paths: List[str]) -> Dict[str, List[str]]:
+        """Group files by the output directory they are mirrored to."""
+        groups: Dict[str, List[str]] = {}
+        for path in paths:
+            groups.setdefault(self.mirror_dir(path), []).append(path)
+        return groups
@@ -0,0 +1,288 @@
+"""
+Separation in a persistent child process that can be killed and respawned.
+"""
+
+import multiprocessing
+import threading
+import time
+import warnings
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from .engine import SeparationEngine, read_audio_info
+from .models import AvailableModels, ProcessingResult, ProcessingStatus
+from .preview import DEFAULT_PREVIEW_SECONDS, separate_preview
+from ..config.settings import Settings
+
+
+# Events that end a job
+FINAL_EVENTS = ('finished', 'error', 'cancelled')
+
+# Seconds a worker gets to exit before it is killed on close
+STOP_TIMEOUT = 5.0
+
+Event = Tuple[str, Any]
+
+
+@dataclass
+class SeparationJob:
+    """A file to separate in the worker."""
+    input_file: str
+    output_dir: str
+    stems: List[str]
+    model_name: str
+
+
+@dataclass
+class PreviewJob:
+    """A short window of a file to separate with the preview profile."""
+    input_file: str
+    model_name: str
+    position: float
+    duration: float = DEFAULT_PREVIEW_SECONDS
+
+
+_registry_loaded = False
+
+
+def create_engine(model_name: str, **overrides) -> SeparationEngine:
+    """
+    Create an engine configured from the environment, loading the model registry once.
+
+    Raises:
+        ValueError: If the model is neither built in nor in the registry
+    """
+    global _registry_loaded
+    settings = Settings()
+    if not _registry_loaded:
+        from .registry import load_models
+        load_models(settings.model.registry_file)
+        _registry_loaded = True
+    if AvailableModels.get_model(model_name) is None:
+        raise ValueError(f"Unknown model: {model_name} "
+                         f"(known models: {', '.join(AvailableModels.get_model_keys())})")
+    return SeparationEngine.from_settings(settings, model_name, **overrides)
+
+
+def run_job(engine, job: SeparationJob, send: Callable[[str, Any], None],
+            is_cancelled: Callable[[], bool]):
+    """
+    Separate one file, reporting progress through send.
+
+    Args:
+        engine: Engine separating the file
+        job: File and options to separate
+        send: Called with each (event, value) pair
+        is_cancelled: Polled between steps and chunks
+    """
+    start_time = time.time()
+    try:
+        send('audio_info', read_audio_info(job.input_file))
+        send('progress', 5)
+
+        send('status', ProcessingStatus.LOADING_MODEL)
+        engine.load_model()
+        send('progress', 10)
+        device_name = engine.get_device_name()
+        send('device', device_name)
+
+        send('status', ProcessingStatus.PROCESSING)
+        wav, sample_rate = engine.load_audio(job.input_file)
+        send('progress', 15)
+        if is_cancelled():
+            send('cancelled', None)
+            return
+
+        output_files = engine.separate_to_files(wav, sample_rate, job.input_file,
+                                                job.output_dir, job.stems,
+                                                is_cancelled=is_cancelled)
+        del wav
+        if engine.fell_back_to_cpu:
+            send('device', f"{device_name} (CPU fallback, out of GPU memory)")
+        send('separated', None)
+        if is_cancelled():
+            send('cancelled', None)
+            return
+
+        send('progress', 100)
+        send('status', ProcessingStatus.COMPLETED)
+        send('finished', ProcessingResult(
+            success=True,
+            output_files=output_files,
+            processing_time=time.time() - start_time,
+            input_file=job.input_file,
+            transfer_time=engine.transfer_time,
+            compute_saved=engine.compute_saved
+        ))
+    except Exception as e:
+        send('error', str(e))
+
+
+def run_preview(engine, job: PreviewJob, send: Callable[[str, Any], None]):
+    """
+    Separate a preview window, writing its stems to temporary files.
+
+    Args:
+        engine: Engine separating the window
+        job: File and window to separate
+        send: Called with each (event, value) pair
+    """
+    try:
+        info = read_audio_info(job.input_file)
+        result = separate_preview(engine, job.input_file, job.position, job.duration,
+                                  total_duration=info.duration)
+        result.write_temp()
+        # The files are all the parent needs, don't pickle the tensors
+        result.stems = {}
+        send('finished', result)
+    except Exception as e:
+        send('error', str(e))
+
+
+def _worker_main(connection, cancel_event, engine_factory: Callable[[str], Any]):
+    """Serve jobs from the parent until told to stop or the pipe closes."""
+    warnings.filterwarnings("ignore")
+    engines: Dict[str, Any] = {}
+
+    def engine_for(model_name: str):
+        if model_name not in engines:
+            engines[model_name] = engine_factory(model_name)
+        return engines[model_name]
+
+    def send(event: str, value: Any):
+        connection.send((event, value))
+
+    while True:
+        try:
+            command, payload = connection.recv()
+        except (EOFError, OSError):
+            break
+        if command == 'stop':
+            break
+        try:
+            if command == 'warm':
+                engine_for(payload).load_model()
+            elif command == 'separate':
+                run_job(engine_for(payload.model_name), payload, send, cancel_event.is_set)
+            elif command == 'preview':
+                run_preview(engine_for(payload.model_name), payload, send)
+        except Exception as e:
+            if command in ('separate', 'preview'):
+                send('error', str(e))
+            # A model that fails to warm up is reported by the job using it
+
+
+class SeparationWorker:
+    """
+    Runs separation jobs in a long-lived child process.
+
+    The child keeps its models loaded between jobs and streams progress
+    events back over a pipe. A stuck job can't be interrupted inside the
+    model, so :meth:`kill` ends the whole child and spawns a fresh one,
+    which immediately loads the last used model again from the on-disk
+    weights cache.
+    """
+
+    def __init__(self, engine_factory: Callable[[str], Any] = create_engine):
+        self.engine_factory = engine_factory
+        self._context = multiprocessing.get_context('spawn')
+        self._cancel = self._context.Event()
+        self._lock = threading.Lock()
+        self._process = None
+        self._connection = None
+        self._model_name: Optional[str] = None
+        # Increased on every kill, so readers of the old pipe know why it closed
+        self._generation = 0
+
+    @property
+    def is_alive(self) -> bool:
+        """Check whether the child process is running."""
+        return self._process is not None and self._process.is_alive()
+
+    def warm(self, model_name: str):
+        """Load a model in the child ahead of the jobs using it."""
+        with self._lock:
+            self._model_name = model_name
+            self._send('warm', model_name)
+
+    def submit(self, job: Union[SeparationJob, PreviewJob]):
+        """Start a job or preview; read its progress with :meth:`events`."""
+        with self._lock:
+            self._cancel.clear()
+            self._model_name = job.model_name
+            self._send('preview' if isinstance(job, PreviewJob) else 'separate', job)
+
+    def events(self) -> Iterator[Event]:
+        """Yield the events of the current job until it ends."""
+        with self._lock:
+            connection, generation = self._connection, self._generation
+        if connection is None:
+            return
+        while True:
+            try:
+                event, value = connection.recv()
+            except (EOFError, OSError):
+                connection.close()
+                if generation != self._generation:
+                    yield 'cancelled', None
+                else:
+                    yield 'error', "The separation worker stopped unexpectedly"
+                return
+            yield event, value
+            if event in FINAL_EVENTS:
+                return
+
+    def cancel(self):
+        """Ask the current job to stop at the next chunk."""
+        self._cancel.set()
+
+    def kill(self, respawn: bool = True):
+        """Kill the child, ending the current job, and spawn a warm replacement."""
+        with self._lock:
+            self._generation += 1
+            self._stop_process(graceful=False)
+            if not respawn:
+                return
+            self._start()
+            if self._model_name:
+                self._connection.send(('warm', self._model_name))
+
+    def close(self):
+        """Stop the child process."""
+        with self._lock:
+            self._stop_process(graceful=True)
+
+    def _send(self, command: str, payload: Any):
+        """Send a command, spawning the child if it is not running."""
+        if not self.is_alive:
+            self._start()
+        self._connection.send((command, payload))
+
+    def _start(self):
+        """Spawn the child process."""
+        parent, child = self._context.Pipe()
+        self._process = self._context.Process(
+            target=_worker_main, args=(child, self._cancel, self.engine_factory),
+            name="waveweaver-worker", daemon=True
+        )
+        self._process.start()
+        child.close()
+        self._connection = parent
+
+    def _stop_process(self, graceful: bool):
+        """End the child process, asking it to exit first if graceful."""
+        process, self._process = self._process, None
+        if process is None:
+            return
+        if graceful and process.is_alive():
+            try:
+                self._connection.send(('stop', None))
+                process.join(STOP_TIMEOUT)
+            except OSError:
+                pass
+        if process.is_alive():
+            process.kill()
+            process.join()
+        if graceful and self._connection is not None:
+            self._connection.close()
+            self._connection = None
@@ -8,11 +8,13 @@ from .model_selection import ModelSelection
 from .stem_selection import StemSelection
 from .output_section import OutputSection
 from .progress_section import ProgressSection
+from .preview_section import PreviewSection
 
 __all__ = [
     'AudioSection',
     'ModelSelection', 
     'StemSelection',
     'OutputSection',
-    'ProgressSection'
+    'ProgressSection',
+    'PreviewSection'
 ]
\ No newline at end of file
@@ -3,7 +3,7 @@ Model selection component.
 """
 
 from PySide6.QtWidgets import QFrame, QVBoxLayout, QLabel, QComboBox, QSizePolicy
-from PySide6.QtCore import Signal
+from PySide6.QtCore import Qt, Signal
 
 from ...config.settings import Settings
 from ...core.models import AvailableModels
@@ -51,6 +51,7 @@ class ModelSelection(QFrame):
         
         for i, (key, model_info) in enumerate(models.items()):
             self.model_combo.addItem(model_info.display_name, key)
+            self.model_combo.setItemData(i, self.model_tooltip(model_info), Qt.ItemDataRole.ToolTipRole)
             
             # Set default model
             if key == self.settings.model.default_model:
@@ -58,6 +59,22 @@ class ModelSelection(QFrame):
         
         self.model_combo.setCurrentIndex(default_index)
     
+    @staticmethod
+    def model_tooltip(model_info) -> str:
+        """Describe the measured cost of a model."""
+        lines = [f"Stems: {', '.join(model_info.stems)}"]
+        if model_info.parameter_count:
+            lines.append(f"Parameters: {model_info.parameter_count / 1e6:.1f} M")
+        if model_info.weights_size:
+            lines.append(f"Weights: {model_info.weights_size / 2**20:.0f} MB")
+        if model_info.rtf_gpu:
+            lines.append(f"GPU: {model_info.rtf_gpu:.2f} s per second of audio")
+        if model_info.rtf_cpu:
+            lines.append(f"CPU: {model_info.rtf_cpu:.2f} s per second of audio")
+        if model_info.peak_memory_per_minute:
+            lines.append(f"Peak memory: {model_info.peak_memory_per_minute / 2**20:.0f} MB per minute")
+        return "\n".join(lines)
+    
     def on_model_changed(self):
         """Handle model selection change."""
         model_key = self.model_combo.currentData()
@@ -0,0 +1,99 @@
+"""
+Stem preview component.
+"""
+
+from typing import Dict
+from PySide6.QtWidgets import (QFrame, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
+                               QDoubleSpinBox, QComboBox, QSizePolicy)
+from PySide6.QtCore import Signal, QUrl
+from PySide6.QtGui import QDesktopServices
+
+from ...config.settings import Settings
+
+
+class PreviewSection(QFrame):
+    """Component for previewing a short separated window of the track."""
+
+    preview_requested = Signal(float)
+
+    def __init__(self, settings: Settings):
+        super().__init__()
+        self.settings = settings
+        self.preview_files: Dict[str, str] = {}
+        self.setup_ui()
+
+    def setup_ui(self):
+        """Setup the user interface."""
+        self.setSizePolicy(QSizePolicy.Policy.Expanding, QSizePolicy.Policy.Preferred)
+
+        layout = QVBoxLayout(self)
+        layout.setSpacing(10)
+
+        # Title
+        title_label = QLabel("Preview")
+        title_label.setStyleSheet("font-size: 16px; font-weight: bold; color: #7aa2f7;")
+
+        # Position selection
+        position_layout = QHBoxLayout()
+        position_label = QLabel("Around (s):")
+        self.position_spin = QDoubleSpinBox()
+        self.position_spin.setRange(0, 24 * 60 * 60)
+        self.position_spin.setDecimals(1)
+        self.position_spin.setValue(60.0)
+
+        self.preview_btn = QPushButton("Preview")
+        self.preview_btn.setEnabled(False)
+        self.preview_btn.clicked.connect(self.request_preview)
+
+        position_layout.addWidget(position_label)
+        position_layout.addWidget(self.position_spin)
+        position_layout.addWidget(self.preview_btn)
+
+        # Playback of preview stems
+        playback_layout = QHBoxLayout()
+        self.stem_combo = QComboBox()
+        self.stem_combo.setEnabled(False)
+        self.play_btn = QPushButton("Play")
+        self.play_btn.setEnabled(False)
+        self.play_btn.clicked.connect(self.play_selected_stem)
+
+        playback_layout.addWidget(self.stem_combo)
+        playback_layout.addWidget(self.play_btn)
+
+        # Add widgets to layout
+        layout.addWidget(title_label)
+        layout.addLayout(position_layout)
+        layout.addLayout(playback_layout)
+
+    def request_preview(self):
+        """Emit a preview request for the selected position."""
+        self.preview_requested.emit(self.position_spin.value())
+
+    def set_preview_enabled(self, enabled: bool):
+        """Enable or disable the preview button."""
+        self.preview_btn.setEnabled(enabled)
+
+    def set_duration(self, duration: float):
+        """Limit the position to the length of the selected file."""
+        if duration > 0:
+            self.position_spin.setMaximum(duration)
+
+    def set_preview_files(self, preview_files: Dict[str, str]):
+        """Show the stems available for playback."""
+        self.preview_files = preview_files
+        self.stem_combo.clear()
+        for stem in preview_files:
+            self.stem_combo.addItem(stem.capitalize(), stem)
+        has_files = bool(preview_files)
+        self.stem_combo.setEnabled(has_files)
+        self.play_btn.setEnabled(has_files)
+
+    def play_selected_stem(self):
+        """Play the selected preview stem with the system audio player."""
+        stem = self.stem_combo.currentData()
+        if stem in self.preview_files:
+            QDesktopServices.openUrl(QUrl.fromLocalFile(self.preview_files[stem]))
+
+    def clear_preview(self):
+        """Clear the current preview."""
+        self.set_preview_files({})
@@ -2,8 +2,7 @@
 Main application window.
 """
 
-import sys
-import subprocess
+import shutil
 from pathlib import Path
 from typing import Optional
 
@@ -14,7 +13,9 @@ from PySide6.QtGui import QIcon, QDesktopServices
 
 from ..config.settings import Settings
 from ..core.models import ProcessingStatus, ProcessingResult, AvailableModels
-from ..core.stem_separator import StemSeparatorThread
+from ..core.engine import read_audio_info
+from ..core.stem_separator import CANCELLED_MESSAGE, StemSeparatorThread, PreviewThread
+from ..core.worker import SeparationWorker
 from ..utils.helpers import truncate_middle
 from .styles.theme import ThemeManager
 from .components.audio_section import AudioSection
@@ -22,6 +23,7 @@ from .components.model_selection import ModelSelection
 from .components.stem_selection import StemSelection
 from .components.output_section import OutputSection
 from .components.progress_section import ProgressSection
+from .components.preview_section import PreviewSection
 
 
 class MainWindow(QMainWindow):
@@ -31,8 +33,13 @@ class MainWindow(QMainWindow):
         super().__init__()
         self.settings = settings
         self.separator_thread: Optional[StemSeparatorThread] = None
+        # Started on the first extraction, then kept with its model loaded
+        self.worker = SeparationWorker()
+        self.preview_thread: Optional[PreviewThread] = None
+        self._preview_dir: Optional[Path] = None
         self.artificial_progress_timer: Optional[QTimer] = None
         self.current_artificial_progress = 20
+        self.remember_error: Optional[str] = None
         
         # Window properties
         self.input_file: Optional[str] = None
@@ -84,6 +91,7 @@ class MainWindow(QMainWindow):
         self.progress_section = ProgressSection(self.settings)
         self.stem_selection = StemSelection(self.settings)
         self.output_section = OutputSection(self.settings)
+        self.preview_section = PreviewSection(self.settings)
         
         # Left column
         left_column = self._create_left_column()
@@ -116,8 +124,23 @@ class MainWindow(QMainWindow):
 
     def initialize_default_model(self):
         """Initialize the default model and update stems accordingly."""
+        ui = self.settings.ui
+        if ui.last_model:
+            self.model_selection.set_selected_model(ui.last_model)
         default_model = self.model_selection.get_selected_model()
         self.on_model_changed(default_model)
+        self.restore_last_choices()
+
+    def restore_last_choices(self):
+        """Select the stems and output folder of the previous session."""
+        ui = self.settings.ui
+        stems = self.stem_selection.stem_checkboxes
+        if ui.last_stems and set(ui.last_stems) & set(stems):
+            for stem in stems:
+                self.stem_selection.set_stem_selection(stem, stem in ui.last_stems)
+        if ui.last_output_dir and Path(ui.last_output_dir).is_dir():
+            self.output_section.set_selected_folder(ui.last_output_dir)
+            self.output_dir = ui.last_output_dir
     
     def _create_left_column(self) -> QVBoxLayout:
         """Create the left column layout."""
@@ -137,6 +160,7 @@ class MainWindow(QMainWindow):
         
         layout.addWidget(self.stem_selection)
         layout.addWidget(self.output_section)
+        layout.addWidget(self.preview_section)
         layout.addWidget(self._create_button_section())
         layout.addStretch()
         
@@ -219,6 +243,9 @@ class MainWindow(QMainWindow):
         # Output section  
         self.output_section.folder_selected.connect(self.on_output_folder_selected)
         
+        # Preview section
+        self.preview_section.preview_requested.connect(self.start_preview)
+        
         # Buttons
         self.extract_btn.clicked.connect(self.start_extraction)
         self.cancel_btn.clicked.connect(self.force_cancel)
@@ -226,12 +253,17 @@ class MainWindow(QMainWindow):
     def on_file_selected(self, file_path: str):
         """Handle file selection."""
         self.input_file = file_path
+        self.preview_section.clear_preview()
+        self.preview_section.set_duration(read_audio_info(file_path).duration)
         self.update_extract_button_state()
     
     def on_model_changed(self, model_key: str):
         """Handle model selection change."""
         model_info = AvailableModels.get_model(model_key)
         self.stem_selection.update_stems(model_info.stems)
+        if self.worker.is_alive and not self.separator_thread:
+            # Load the new model while the user picks stems
+            self.worker.warm(model_key)
     
     def on_output_folder_selected(self, folder_path: str):
         """Handle output folder selection."""
@@ -240,12 +272,14 @@ class MainWindow(QMainWindow):
     
     def update_extract_button_state(self):
         """Update the extract button enabled state."""
+        idle = self.separator_thread is None and self.preview_thread is None
         can_extract = bool(
             self.input_file and 
             self.output_dir and 
-            self.separator_thread is None
+            idle
         )
         self.extract_btn.setEnabled(can_extract)
+        self.preview_section.set_preview_enabled(bool(self.input_file and idle))
     
     def start_extraction(self):
         """Start the stem extraction process."""
@@ -260,15 +294,24 @@ class MainWindow(QMainWindow):
         # Setup UI for processing
         self.progress_section.start_processing()
         self.extract_btn.setEnabled(False)
+        self.preview_section.set_preview_enabled(False)
         self.cancel_btn.setVisible(True)
         
         # Create and start processing thread
         model_key = self.model_selection.get_selected_model()
+        # Shown with the outcome, the status is overwritten while processing
+        self.remember_error = None
+        try:
+            self.settings.remember(last_model=model_key, last_stems=selected_stems,
+                                   last_output_dir=self.output_dir)
+        except (OSError, ValueError) as e:
+            self.remember_error = f"Selected options were not saved: {e}"
         self.separator_thread = StemSeparatorThread(
             self.input_file,
             self.output_dir,
             selected_stems,
-            model_key
+            model_key,
+            worker=self.worker
         )
         
         # Connect thread signals
@@ -287,18 +330,73 @@ class MainWindow(QMainWindow):
         # Start artificial progress after delay
         QTimer.singleShot(1500, self.progress_section.start_artificial_progress)
     
+    def start_preview(self, position: float):
+        """Start separating a short preview window around a position."""
+        if not self.input_file or self.preview_thread or self.separator_thread:
+            return
+        
+        model_key = self.model_selection.get_selected_model()
+        self.preview_thread = PreviewThread(
+            self.input_file,
+            model_key,
+            position,
+            self.settings.ui.preview_seconds,
+            worker=self.worker
+        )
+        self.preview_thread.preview_ready.connect(self.on_preview_ready)
+        self.preview_thread.error.connect(self.on_preview_error)
+        
+        self.progress_section.show_completion_message("Separating preview...")
+        self.update_extract_button_state()
+        self.cancel_btn.setVisible(True)
+        self.preview_thread.start()
+    
+    def on_preview_ready(self, result):
+        """Handle a finished preview."""
+        self._remove_preview_files()
+        preview_files = result.files
+        if preview_files:
+            self._preview_dir = Path(next(iter(preview_files.values()))).parent
+        self.preview_section.set_preview_files(preview_files)
+        self.progress_section.show_completion_message(
+            f"Preview ready! ({result.processing_time:.1f}s)"
+        )
+        self._finish_preview()
+    
+    def on_preview_error(self, error_msg: str):
+        """Handle preview errors."""
+        self.progress_section.show_error_message(f"Preview failed: {error_msg}")
+        self._finish_preview()
+    
+    def _finish_preview(self):
+        """Release the preview thread."""
+        if self.preview_thread:
+            self.preview_thread.wait()
+            self.preview_thread = None
+        self.cancel_btn.setVisible(False)
+        self.update_extract_button_state()
+    
+    def _remove_preview_files(self):
+        """Delete temporary files of the previous preview."""
+        if self._preview_dir:
+            shutil.rmtree(self._preview_dir, ignore_errors=True)
+            self._preview_dir = None
+    
     def force_cancel(self):
         """Force cancel the current operation."""
         if self.separator_thread:
             reply = QMessageBox.warning(
                 self,
                 "Warning",
-                "The application will restart after canceling.\nDo you want to proceed?",
+                "The separation will be stopped and partial stems discarded.\n"
+                "Do you want to proceed?",
                 QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
             )
             
             if reply == QMessageBox.StandardButton.Yes:
-                self._restart_application()
+                self.separator_thread.force_stop()
+        elif self.preview_thread:
+            self.preview_thread.force_stop()
     
     def handle_error(self, error_msg: str):
         """Handle processing errors."""
@@ -312,46 +410,23 @@ class MainWindow(QMainWindow):
         self.cancel_btn.setVisible(False)
         
         if result.success:
-            self.progress_section.show_completion_message(
-                f"Extraction complete! ({result.processing_time:.1f}s)"
-            )
+            message = f"Extraction complete! ({result.processing_time:.1f}s)"
+        elif result.error_message == CANCELLED_MESSAGE:
+            message = "Extraction cancelled"
         else:
-            self.progress_section.show_error_message("Extraction failed!")
+            message = "Extraction failed!"
+        if self.remember_error:
+            message += f"\n{self.remember_error}"
+            self.remember_error = None
+        if result.success:
+            self.progress_section.show_completion_message(message)
+        else:
+            self.progress_section.show_error_message(message)
         
         if self.separator_thread:
             self.separator_thread.wait()
             self.separator_thread = None
-    
-    def _restart_application(self):
-        """Restart the application."""
-        if getattr(sys, 'frozen', False):
-            app_path = sys.executable
-        else:
-            app_path = sys.argv[0]
-        
-        restart_script = """
-import os
-import sys
-import time
-import subprocess
-
-time.sleep(0.5)
-if sys.argv[1].endswith('.exe'):
-    os.startfile(sys.argv[1])
-else:
-    subprocess.Popen([sys.executable, sys.argv[1]])
-os.remove(sys.argv[0])
-        """
-        
-        temp_script = Path(app_path).parent / "_restart.py"
-        with open(temp_script, "w") as f:
-            f.write(restart_script)
-        
-        subprocess.Popen([sys.executable, str(temp_script), app_path], 
-                        creationflags=subprocess.CREATE_NO_WINDOW)
-        
-        from PySide6.QtWidgets import QApplication
-        QApplication.quit()
+        self.preview_section.set_preview_enabled(bool(self.input_file))
     
     def closeEvent(self, event):
         """Handle window close event."""
@@ -364,10 +439,21 @@ os.remove(sys.argv[0])
             )
             
             if reply == QMessageBox.StandardButton.Yes:
+                self.worker.kill(respawn=False)
+                self.separator_thread.wait()
+                self._remove_preview_files()
                 event.accept()
             else:
                 event.ignore()
+        elif self.preview_thread:
+            # A preview is not worth asking about, stop it with the worker
+            self.worker.kill(respawn=False)
+            self.preview_thread.wait()
+            self._remove_preview_files()
+            event.accept()
         else:
+            self._remove_preview_files()
+            self.worker.close()
             event.accept()
     
     def resizeEvent(self, event):
@@ -4,6 +4,7 @@ Utilities module.
 """
 
 from .file_handler import FileHandler
+from .naming import OutputNamer
 from .helpers import (
     truncate_middle,
     truncate_filename, 
@@ -13,11 +14,13 @@ from .helpers import (
     validate_audio_file,
     get_output_folder_name,
     clamp,
-    lerp
+    lerp,
+    load_toml
 )
 
 __all__ = [
     'FileHandler',
+    'OutputNamer',
     'truncate_middle',
     'truncate_filename',
     'create_safe_filename', 
@@ -26,5 +29,6 @@ __all__ = [
     'validate_audio_file',
     'get_output_folder_name',
     'clamp',
-    'lerp'
+    'lerp',
+    'load_toml'
 ]
\ No newline at end of file
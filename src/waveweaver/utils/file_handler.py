@@ -81,6 +81,12 @@ class FileHandler:
         
         return f"{base_name} - {stem}.wav"
     
+    @classmethod
+    def partial_path(cls, file_path: str) -> str:
+        """Get the hidden temporary path a file is written to before being renamed."""
+        path = Path(file_path)
+        return str(path.with_name(f".{path.stem}.partial{path.suffix}"))
+    
     @classmethod
     def get_available_filename(cls, file_path: str) -> str:
         """Get an available filename by adding numbers if needed."""
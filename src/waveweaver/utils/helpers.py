@@ -4,7 +4,7 @@ General helper functions and utilities.
 
 import string
 from pathlib import Path
-from typing import Union
+from typing import Any, Dict, Union
 
 
 def truncate_middle(text: str, max_length: int) -> str:
@@ -172,4 +172,22 @@ def lerp(start: float, end: float, t: float) -> float:
     Returns:
         Interpolated value
     """
-    return start + t * (end - start)
\ No newline at end of file
+    return start + t * (end - start)
+
+
+def load_toml(path: Union[str, Path]) -> Dict[str, Any]:
+    """
+    Parse a TOML file with tomllib, or tomli on older Pythons.
+
+    Raises:
+        ValueError: If no TOML parser is installed or the file is not valid TOML
+    """
+    try:
+        import tomllib
+    except ImportError:
+        try:
+            import tomli as tomllib
+        except ImportError:
+            raise ValueError("TOML files need Python 3.11+ or the tomli package")
+    with open(path, 'rb') as f:
+        return tomllib.load(f)
@@ -0,0 +1,174 @@
+"""
+Collision-free naming of output files.
+"""
+
+import os
+import threading
+from pathlib import Path
+from typing import Dict, Iterable, Optional, Sequence, Set
+
+from .helpers import truncate_filename
+
+
+# Stem folder named after the input, holding one file per stem
+DEFAULT_NAME_TEMPLATE = "{name}/{short_name} - {stem}.wav"
+
+# Longest input name used in the {short_name} field
+SHORT_NAME_LENGTH = 25
+
+
+def check_template(template: str, fields: Sequence[str] = ('model',)):
+    """Raise ValueError if a name template uses unknown fields or bad syntax."""
+    values = {field: field for field in fields}
+    try:
+        relative = template.format(name='name', short_name='name', stem='stem', **values)
+    except (KeyError, IndexError, ValueError) as e:
+        raise ValueError(f"Invalid name template {template!r}: {e}") from None
+    if '{stem}' not in template:
+        raise ValueError(f"Name template {template!r} must contain {{stem}}")
+    if Path(relative).is_absolute() or '..' in Path(relative).parts:
+        raise ValueError(f"Name template {template!r} must stay inside the output directory")
+
+
+def release_claims(paths: Iterable[str]):
+    """Delete placeholder files that were claimed but never written."""
+    for path in paths:
+        try:
+            if os.path.getsize(path) == 0:
+                os.unlink(path)
+        except OSError:
+            pass
+
+
+class OutputNamer:
+    """
+    Allocates output paths for the stems of every input of a batch.
+
+    Paths are rendered from a template with the fields ``{name}`` (input
+    file name without extension), ``{short_name}`` (the same, truncated),
+    ``{stem}`` and any extra fields given. When two inputs of the batch
+    would share a path, the later one is numbered ``name (1)``, ``name (2)``
+    and so on.
+
+    Directories are listed once and names handed out are kept in memory,
+    so finding a free name costs no filesystem round-trip per attempt.
+    With ``keep_existing`` files from earlier runs are never replaced, and
+    every path is claimed with an exclusive create so concurrent writers
+    can't pick the same name; otherwise earlier outputs are overwritten.
+    """
+
+    def __init__(self, output_dir: str, template: str = DEFAULT_NAME_TEMPLATE,
+                 keep_existing: bool = False, fields: Optional[Dict[str, str]] = None):
+        self.output_dir = Path(output_dir)
+        self.template = template or DEFAULT_NAME_TEMPLATE
+        self.keep_existing = keep_existing
+        self.fields = dict(fields or {})
+        self._lock = threading.Lock()
+        self._allocated: Dict[str, Dict[str, str]] = {}
+        self._reserved: Set[str] = set()
+        self._listings: Dict[str, Set[str]] = {}
+        self._next_counter: Dict[str, int] = {}
+
+    def allocate(self, input_file: str, stems: Sequence[str]) -> Dict[str, str]:
+        """
+        Get the output path of each stem of an input.
+
+        Repeated calls for the same input return the same paths. Parent
+        folders are created.
+
+        Args:
+            input_file: Input the stems are named after
+            stems: Stems to name
+
+        Returns:
+            Output path of each stem
+        """
+        with self._lock:
+            paths = self._allocated.get(input_file)
+            if paths is not None and all(stem in paths for stem in stems):
+                return {stem: paths[stem] for stem in stems}
+
+            base_name = Path(input_file).stem
+            counter = self._next_counter.get(base_name, 0)
+            while True:
+                paths = self._render(base_name, counter, stems)
+                counter += 1
+                if any(self._is_taken(path) for path in paths.values()):
+                    continue
+                for path in paths.values():
+                    Path(path).parent.mkdir(parents=True, exist_ok=True)
+                if self.keep_existing and not self._claim(paths.values()):
+                    continue
+                break
+
+            self._next_counter[base_name] = counter
+            self._reserved.update(paths.values())
+            self._allocated[input_file] = paths
+            return dict(paths)
+
+    def assign(self, input_file: str, paths: Dict[str, str]):
+        """
+        Hand out given paths for an input instead of allocating them.
+
+        Used when the paths were allocated elsewhere, such as by the
+        coordinator of a distributed batch. Parent folders are created.
+
+        Args:
+            input_file: Input the stems belong to
+            paths: Output path of each stem
+        """
+        with self._lock:
+            for path in paths.values():
+                Path(path).parent.mkdir(parents=True, exist_ok=True)
+            self._reserved.update(paths.values())
+            self._allocated[input_file] = dict(paths)
+
+    def _render(self, base_name: str, counter: int, stems: Sequence[str]) -> Dict[str, str]:
+        """Render the paths of every stem for the counter-th candidate name."""
+        short_name = truncate_filename(base_name, SHORT_NAME_LENGTH)
+        if counter:
+            base_name = f"{base_name} ({counter})"
+            short_name = f"{short_name} ({counter})"
+        paths = {}
+        for stem in stems:
+            relative = self.template.format(name=base_name, short_name=short_name, stem=stem,
+                                            **self.fields)
+            paths[stem] = str(self.output_dir / relative)
+        return paths
+
+    def _is_taken(self, path: str) -> bool:
+        """Check whether a path was handed out or, when keeping files, exists."""
+        if path in self._reserved:
+            return True
+        if not self.keep_existing:
+            return False
+        directory, name = os.path.split(path)
+        return name in self._listing(directory)
+
+    def _listing(self, directory: str) -> Set[str]:
+        """Get the names in a directory, listing it only the first time."""
+        names = self._listings.get(directory)
+        if names is None:
+            try:
+                with os.scandir(directory) as entries:
+                    names = {entry.name for entry in entries}
+            except FileNotFoundError:
+                names = set()
+            self._listings[directory] = names
+        return names
+
+    def _claim(self, paths: Iterable[str]) -> bool:
+        """Create every path exclusively, undoing the claims if one already exists."""
+        claimed = []
+        for path in paths:
+            try:
+                os.close(os.open(path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o644))
+                claimed.append(path)
+            except FileExistsError:
+                # Written by someone else since the directory was listed
+                directory, name = os.path.split(path)
+                self._listing(directory).add(name)
+                for done in claimed:
+                    os.unlink(done)
+                return False
+        return True
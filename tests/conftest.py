@@ -26,6 +26,16 @@ def qapp():
         app.quit()
 
 
+@pytest.fixture(autouse=True)
+def config_home(tmp_path, monkeypatch):
+    """Keep tests away from the user's config, state and tuned settings files."""
+    home = tmp_path / "waveweaver-home"
+    monkeypatch.setenv("WAVEWEAVER_HOME", str(home))
+    for variable in ("WAVEWEAVER_CONFIG", "WAVEWEAVER_PROFILE"):
+        monkeypatch.delenv(variable, raising=False)
+    return home
+
+
 @pytest.fixture
 def settings():
     """Create test settings instance."""
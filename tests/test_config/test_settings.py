@@ -0,0 +1,195 @@
+"""
+Tests for layered settings.
+"""
+
+import socket
+import subprocess
+import sys
+from pathlib import Path
+from types import SimpleNamespace
+
+import pytest
+
+from src.waveweaver import app
+from src.waveweaver.cli import main
+from src.waveweaver.config.settings import ConfigError, Settings
+
+
+def write_config(path, text):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text, encoding='utf-8')
+    return str(path)
+
+
+class TestSettings:
+    """Test Settings class."""
+
+    def test_defaults(self, config_home):
+        """Test settings without a config file keep their defaults."""
+        settings = Settings()
+
+        assert settings.performance.queue_depth == 2
+        assert settings.config_file == ""
+        assert settings.model.tuned_file == str(config_home / "tuned.json")
+
+    def test_layers_override_in_order(self, config_home, monkeypatch):
+        """Test the config file, host, profile, environment and command line apply in turn."""
+        host = socket.gethostname().split(".")[0]
+        write_config(config_home / "config.toml", f"""
+[performance]
+queue_depth = 3
+decoder_workers = 3
+encoder_workers = 3
+cpu_threads = 3
+
+[hosts."{host}".performance]
+decoder_workers = 4
+encoder_workers = 4
+cpu_threads = 4
+
+[profiles.fast.performance]
+encoder_workers = 5
+cpu_threads = 5
+""")
+        monkeypatch.setenv("WAVEWEAVER_CPU_THREADS", "6")
+
+        settings = Settings(profile="fast", overrides={"performance.skip_silence": "yes"})
+
+        performance = settings.performance
+        assert (performance.queue_depth, performance.decoder_workers,
+                performance.encoder_workers, performance.cpu_threads) == (3, 4, 5, 6)
+        assert performance.skip_silence is True
+        assert settings.config_file == str(config_home / "config.toml")
+
+    def test_profile_selected_by_file(self, tmp_path):
+        """Test the config file can choose its own profile."""
+        path = write_config(tmp_path / "waveweaver.toml", """
+profile = "gpu"
+
+[profiles.gpu.performance]
+device = "cuda:1"
+""")
+        assert Settings(config_file=path).performance.device == "cuda:1"
+        assert Settings(config_file=path, profile="gpu").profile == "gpu"
+
+    @pytest.mark.parametrize('text', [
+        "[performance]\nqueue_depth = \"many\"\n",
+        "[performance]\nqueue_dpeth = 2\n",
+        "[speed]\nqueue_depth = 2\n",
+        "[performance]\nbuffer_dtype = \"int8\"\n",
+        "[performance]\nencoder_workers = 0\n",
+        "[output]\nkeep_existing = 1\n",
+        "[performance\n",
+    ])
+    def test_invalid_config_rejected(self, tmp_path, text):
+        """Test unknown settings, wrong types and out of range values are errors."""
+        path = write_config(tmp_path / "bad.toml", text)
+
+        with pytest.raises(ConfigError):
+            Settings(config_file=path)
+
+    def test_missing_profile_rejected(self, tmp_path):
+        """Test selecting a profile the config file lacks is an error."""
+        path = write_config(tmp_path / "config.toml", "[ui]\ntheme = \"dark\"\n")
+
+        with pytest.raises(ConfigError):
+            Settings(config_file=path, profile="laptop")
+        with pytest.raises(ConfigError):
+            Settings(config_file=str(tmp_path / "missing.toml"))
+
+    def test_invalid_environment_rejected(self, monkeypatch):
+        """Test environment variables are validated like the config file."""
+        monkeypatch.setenv("WAVEWEAVER_QUEUE_DEPTH", "deep")
+
+        with pytest.raises(ConfigError):
+            Settings()
+
+    def test_remembered_choices(self, config_home):
+        """Test remembered interface choices load in later sessions, below the config file."""
+        Settings().remember(last_model="mdx", last_stems=["vocals", "bass"],
+                            last_output_dir="/tmp/out \"stems\"")
+        write_config(config_home / "config.toml", "[ui]\nlast_model = \"htdemucs\"\n")
+
+        ui = Settings().ui
+        assert ui.last_model == "htdemucs"
+        assert ui.last_stems == ["vocals", "bass"]
+        assert ui.last_output_dir == "/tmp/out \"stems\""
+        with pytest.raises(ConfigError):
+            Settings().remember(theme="light")
+
+    def test_remembered_choices_need_no_toml_parser(self, monkeypatch):
+        """Test the state file loads on Pythons without tomllib or tomli."""
+        Settings().remember(last_model="mdx")
+        monkeypatch.setitem(sys.modules, 'tomllib', None)
+        monkeypatch.setitem(sys.modules, 'tomli', None)
+
+        assert Settings().ui.last_model == "mdx"
+
+
+def test_cli_config_options(tmp_path, capsys):
+    """Test the command line loads a config file and profile and applies --set."""
+    path = write_config(tmp_path / "config.toml", """
+[profiles.batch.performance]
+queue_depth = 8
+""")
+
+    assert main(['--config', path, '--profile', 'batch',
+                 '--set', 'performance.probe_workers=3', 'config']) == 0
+    output = capsys.readouterr().out
+    assert "queue_depth = 8" in output
+    assert "probe_workers = 3" in output
+
+    assert main(['--set', 'performance.probe_workers=none', 'config']) == 2
+
+
+def test_interface_applies_config_options(tmp_path, monkeypatch):
+    """Test the interface starts from the settings chosen by the config options."""
+    path = write_config(tmp_path / "config.toml", """
+[profiles.fast.model]
+shifts = 0
+""")
+    windows = []
+    monkeypatch.setattr('src.waveweaver.gui.main_window.MainWindow',
+                        lambda settings: windows.append(settings) or SimpleNamespace(show=lambda: None))
+    monkeypatch.setattr(app, 'setup_application', lambda: SimpleNamespace(exec=lambda: 0))
+    monkeypatch.setattr(sys, 'argv', ['waveweaver', '--config', path, '--profile', 'fast',
+                                      '--set', 'ui.theme=light'])
+
+    assert app.main() == 0
+    assert (windows[0].model.shifts, windows[0].ui.theme) == (0, "light")
+
+    monkeypatch.setattr(sys, 'argv', ['waveweaver', '--profile', 'missing'])
+    assert app.main() == 2
+
+
+def test_cli_config_hides_authkey(capsys, monkeypatch):
+    """Test the config command never prints the distributed shared secret."""
+    monkeypatch.setenv('WAVEWEAVER_AUTHKEY', 's3cret')
+
+    assert main(['config']) == 0
+    output = capsys.readouterr().out
+    assert "s3cret" not in output
+    assert 'authkey = "***"' in output
+
+
+def test_settings_load_without_torch():
+    """Test loading settings doesn't import the heavy dependencies."""
+    code = ("import sys; from waveweaver.config.settings import Settings; Settings(); "
+            "print(sorted({'torch', 'numpy'} & set(sys.modules)))")
+    src = Path(__file__).parent.parent.parent / "src"
+    result = subprocess.run([sys.executable, "-c", code], cwd=src,
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip() == "[]"
+
+
+def test_cli_config_without_torch():
+    """Test the config command, started like the application, imports neither torch nor Qt."""
+    code = ("import sys; sys.argv = ['waveweaver', 'config']; "
+            "from waveweaver.app import main; main(); "
+            "print(sorted({'torch', 'PySide6'} & set(sys.modules)))")
+    src = Path(__file__).parent.parent.parent / "src"
+    result = subprocess.run([sys.executable, "-c", code], cwd=src,
+                            capture_output=True, text=True, check=True)
+
+    assert result.stdout.strip().splitlines()[-1] == "[]"
@@ -0,0 +1,97 @@
+"""
+Tests for the in-process separation API.
+"""
+
+import asyncio
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+import src.waveweaver as waveweaver
+from src.waveweaver.core import api
+from src.waveweaver.core.engine import SeparationEngine
+
+
+SAMPLE_RATE = 1000
+
+
+@pytest.fixture
+def created(monkeypatch):
+    """Replace model loading with a model scaling the mix, recording created engines."""
+    engines = []
+
+    def create_engine(model_name, **overrides):
+        engine = SeparationEngine(model_name, shifts=0, device='cpu')
+        engine._model = SimpleNamespace(samplerate=SAMPLE_RATE, segment=1.0, audio_channels=2)
+        engine._run_model = lambda mix, device, shifts, overlap: \
+            mix.unsqueeze(1).repeat(1, 4, 1, 1) * torch.arange(1, 5).view(1, 4, 1, 1)
+        engines.append(engine)
+        return engine
+
+    monkeypatch.setattr(api, 'create_engine', create_engine)
+    monkeypatch.setattr(api, '_engines', {})
+    monkeypatch.setattr(api, '_engine_locks', {})
+    return engines
+
+
+def test_numpy_input(created):
+    """Test an array comes back as in-memory arrays of the selected stems."""
+    audio = np.random.rand(2, 3 * SAMPLE_RATE).astype(np.float32)
+
+    result = api.separate(audio, model='htdemucs', stems=['vocals', 'drums'])
+
+    assert list(result.stems) == ['vocals', 'drums']
+    assert result.sample_rate == SAMPLE_RATE
+    assert isinstance(result['vocals'], np.ndarray)
+    np.testing.assert_allclose(result['vocals'], audio * 4, rtol=1e-5)
+    np.testing.assert_allclose(result['drums'], audio, rtol=1e-5)
+
+
+def test_tensor_input_converted_to_model_format(created):
+    """Test mono audio at another rate is converted to the model's rate and channels."""
+    audio = torch.rand(2 * SAMPLE_RATE)
+
+    result = api.separate(audio, model='htdemucs', sample_rate=2 * SAMPLE_RATE)
+
+    assert set(result.stems) == {'drums', 'bass', 'other', 'vocals'}
+    assert isinstance(result['bass'], torch.Tensor)
+    assert result['bass'].shape == (2, SAMPLE_RATE)
+
+
+def test_unknown_stem(created):
+    """Test asking for a stem the model doesn't produce fails."""
+    with pytest.raises(ValueError, match="piano"):
+        api.separate(np.zeros((2, 100), dtype=np.float32), model='htdemucs', stems=['piano'])
+
+
+def test_unknown_model(monkeypatch):
+    """Test an unknown model fails with the models that exist."""
+    monkeypatch.setattr(api, '_engines', {})
+
+    with pytest.raises(ValueError, match="htdemucs"):
+        api.separate(np.zeros((2, 100), dtype=np.float32), model='nonexistent')
+    assert not api._engines
+
+
+def test_async_reuses_resident_engine(created):
+    """Test concurrent asynchronous calls share one loaded engine."""
+    async def run():
+        audio = np.random.rand(2, SAMPLE_RATE).astype(np.float32)
+        return await asyncio.gather(*[
+            api.separate_async(audio, model='htdemucs', stems=['vocals']) for _ in range(3)
+        ])
+
+    results = asyncio.run(run())
+
+    assert len(created) == 1
+    assert all(result['vocals'].shape == (2, SAMPLE_RATE) for result in results)
+
+
+def test_package_exports():
+    """Test the API is reachable from the package itself."""
+    assert waveweaver.separate is api.separate
+    assert waveweaver.separate_async is api.separate_async
+    with pytest.raises(AttributeError):
+        waveweaver.missing
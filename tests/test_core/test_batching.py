@@ -0,0 +1,89 @@
+"""
+Tests for short clip batching.
+"""
+
+import pytest
+import torch
+
+from src.waveweaver.core.batching import pack_batch, plan_batches, unpack_batch
+from src.waveweaver.core.models import AudioFileInfo
+
+
+def make_info(duration, sample_rate=44100, channels=2, fmt="WAV"):
+    """Create audio info for a clip."""
+    return AudioFileInfo(
+        path=f"clip_{duration}.wav",
+        duration=duration,
+        sample_rate=sample_rate,
+        channels=channels,
+        format=fmt
+    )
+
+
+class TestPlanBatches:
+    """Test batch planning."""
+    
+    def test_groups_by_format(self):
+        """Test clips are only batched with the same rate and channels."""
+        infos = [
+            make_info(2.0),
+            make_info(1.0, sample_rate=48000),
+            make_info(3.0),
+            make_info(1.5, sample_rate=48000),
+        ]
+        
+        batches, singles = plan_batches(infos)
+        
+        assert sorted(sorted(batch) for batch in batches) == [[0, 2], [1, 3]]
+        assert singles == []
+    
+    def test_long_and_unknown_files_are_single(self):
+        """Test long or unreadable files are not batched."""
+        infos = [
+            make_info(600.0),
+            make_info(0, fmt="unknown"),
+            make_info(2.0),
+        ]
+        
+        batches, singles = plan_batches(infos, max_clip_seconds=30.0)
+        
+        assert batches == []
+        assert singles == [0, 1, 2]
+    
+    def test_batches_sorted_and_limited(self):
+        """Test batches are sorted by duration and respect the size limit."""
+        infos = [make_info(d) for d in (5.0, 1.0, 4.0, 2.0, 3.0)]
+        
+        batches, singles = plan_batches(infos, max_batch_size=2)
+        
+        assert batches == [[1, 3], [4, 2]]
+        assert singles == [0]
+
+
+class TestPackBatch:
+    """Test packing and scattering of batched tensors."""
+    
+    def test_pack_pads_to_longest(self):
+        """Test clips are zero padded to the longest clip."""
+        wavs = [torch.ones(2, 3), torch.ones(1, 2, 5)]
+        
+        batch, lengths = pack_batch(wavs)
+        
+        assert batch.shape == (2, 2, 5)
+        assert lengths == [3, 5]
+        assert batch[0, :, 3:].abs().sum() == 0
+    
+    def test_pack_rejects_mixed_channels(self):
+        """Test clips with different channel counts are rejected."""
+        with pytest.raises(ValueError):
+            pack_batch([torch.ones(1, 4), torch.ones(2, 4)])
+    
+    def test_unpack_trims_padding(self):
+        """Test outputs are trimmed back to each clip length."""
+        sources = torch.randn(2, 4, 2, 5)
+        
+        outputs = unpack_batch(sources, [3, 5])
+        
+        assert outputs[0].shape == (1, 4, 2, 3)
+        assert outputs[1].shape == (1, 4, 2, 5)
+        assert torch.equal(outputs[0][0], sources[0, ..., :3])
@@ -0,0 +1,75 @@
+"""
+Tests for single-file stem containers.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import torch
+
+from src.waveweaver.core.buffers import StemBuffer
+from src.waveweaver.core.container import StemContainerSink, read_container, write_container
+from src.waveweaver.core.engine import SeparationEngine
+
+STEMS = ['drums', 'bass', 'other', 'vocals']
+
+
+def test_sink_writes_channel_groups(tmp_path):
+    """Test streamed blocks land in each stem's channel group."""
+    path = str(tmp_path / "song.flac")
+    sources = torch.rand(4, 2, 1000) - 0.5
+    sink = StemContainerSink(path, ['vocals', 'bass'], STEMS, 44100, 2, subtype='PCM_24')
+    sink.write(sources[..., :600])
+    sink.write(sources[..., 600:])
+
+    assert sink.close() == [path]
+    stems = read_container(path)
+    assert list(stems) == ['vocals', 'bass']
+    assert np.allclose(stems['vocals'], sources[3].T.numpy(), atol=1e-5)
+    assert np.allclose(stems['bass'], sources[1].T.numpy(), atol=1e-5)
+
+
+def test_flac_channel_limit(tmp_path):
+    """Test stems needing more than eight channels are refused for FLAC but fit a WAV."""
+    buffer = StemBuffer.from_sources(torch.zeros(5, 2, 100), STEMS + ['no_vocals'])
+
+    with pytest.raises(ValueError, match="FLAC"):
+        write_container(buffer, list(buffer.stems), str(tmp_path / "song.flac"), 44100)
+    write_container(buffer, list(buffer.stems), str(tmp_path / "song.wav"), 44100)
+
+    assert len(read_container(str(tmp_path / "song.wav"))) == 5
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["song.wav"]
+
+
+class TestSingleFileEngine:
+    """Test single-file output of the engine."""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        engine = SeparationEngine('htdemucs', shifts=0, device='cpu', single_file=True,
+                                  name_template="{name}.wav")
+        engine._model = SimpleNamespace(samplerate=1000, segment=1.0)
+        monkeypatch.setattr(engine, '_run_model', lambda mix, device, shifts, overlap:
+                            mix.unsqueeze(1) * torch.arange(1, 5).view(1, 4, 1, 1) / 4)
+        return engine
+
+    def test_streamed_output(self, engine, tmp_path):
+        """Test a streamed separation writes one file holding the selected stems."""
+        wav = torch.rand(1, 2, 3000) - 0.5
+
+        files = engine.separate_to_files(wav, 1000, "song.mp3", str(tmp_path), ['vocals', 'drums'])
+
+        assert files == [str(tmp_path / "song.wav")]
+        stems = read_container(files[0])
+        assert np.allclose(stems['vocals'], wav[0].T.numpy(), atol=1e-4)
+        assert np.allclose(stems['drums'], wav[0].T.numpy() / 4, atol=1e-4)
+
+    def test_buffered_output(self, engine, tmp_path):
+        """Test saving a buffer writes one file instead of one per stem."""
+        buffer = engine.to_buffer(engine.separate(torch.rand(1, 2, 500) - 0.5), ['bass', 'other'])
+
+        files = engine.save_stems(buffer, 1000, "song.mp3", str(tmp_path), ['bass', 'other'])
+
+        assert files == [str(tmp_path / "song.wav")]
+        assert list(read_container(files[0])) == ['bass', 'other']
@@ -0,0 +1,234 @@
+"""
+Tests for distributed separation over local connections.
+"""
+
+import threading
+from multiprocessing.connection import Client
+from pathlib import Path
+
+import pytest
+
+from src.waveweaver.core.distributed import (STREAM, Coordinator, DistributedWorker,
+                                             parse_address)
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.journal import DONE, JobJournal
+from src.waveweaver.core.models import AudioFileInfo, ProcessingResult
+from src.waveweaver.utils.naming import OutputNamer
+
+AUTHKEY = b'secret'
+NAME_TEMPLATE = "{name}/{stem}.wav"
+
+
+class FakeEngine:
+    """Engine stand-in writing each stem as a text file."""
+
+    def __init__(self, name):
+        self.name = name
+        self.inputs = []
+
+    def create_namer(self, output_dir):
+        return OutputNamer(output_dir, NAME_TEMPLATE)
+
+    def separate_files(self, input_files, output_dir, stems, namer=None, **kwargs):
+        namer = namer or self.create_namer(output_dir)
+        results = []
+        for input_file in input_files:
+            self.inputs.append(Path(input_file).name)
+            if Path(input_file).read_text() == "broken":
+                results.append(ProcessingResult(success=False, output_files=[],
+                                                error_message="cannot decode",
+                                                input_file=input_file))
+                continue
+            paths = []
+            for stem, path in namer.allocate(input_file, stems).items():
+                Path(path).write_text(f"{stem} of {Path(input_file).read_text()}")
+                paths.append(path)
+            results.append(ProcessingResult(success=True, output_files=paths,
+                                            input_file=input_file))
+        return results
+
+
+def make_inputs(directory, durations):
+    """Write one input per duration, named after its position."""
+    directory.mkdir()
+    infos = []
+    for index, duration in enumerate(durations):
+        path = directory / f"track{index}.wav"
+        path.write_text(f"track {index}")
+        infos.append(AudioFileInfo(path=str(path), duration=duration, sample_rate=44100,
+                                   channels=2, format="WAV"))
+    return infos
+
+
+def start_workers(coordinator, count, **kwargs):
+    """Run workers in threads, returning their engines."""
+    engines = [FakeEngine(f"worker{index}") for index in range(count)]
+    for engine in engines:
+        worker = DistributedWorker(coordinator.address, AUTHKEY, lambda model, engine=engine: engine,
+                                   name=engine.name, heartbeat_interval=0.05, **kwargs)
+        threading.Thread(target=worker.serve, args=(5.0,), daemon=True).start()
+    return engines
+
+
+@pytest.mark.parametrize('transfer', ['shared', STREAM])
+def test_workers_share_batch(tmp_path, transfer):
+    """Test every input is separated once across workers, with stems in the output directory."""
+    infos = make_inputs(tmp_path / "inputs", [5, 30, 10, 20, 1, 3])
+    output = tmp_path / "output"
+    coordinator = Coordinator(('localhost', 0), AUTHKEY, 'htdemucs', str(output),
+                              ['vocals', 'drums'], transfer=transfer, heartbeat_timeout=5.0,
+                              engine=SeparationEngine('htdemucs', name_template=NAME_TEMPLATE))
+    engines = start_workers(coordinator, 2)
+
+    results = coordinator.run(infos)
+
+    assert sorted(result.input_file for result in results) == sorted(info.path for info in infos)
+    assert all(result.success for result in results)
+    handled = sorted(name for engine in engines for name in engine.inputs)
+    assert handled == sorted(f"track{index}.wav" for index in range(6))
+    assert (output / "track3" / "vocals.wav").read_text() == "vocals of track 3"
+    assert str(output / "track3" / "drums.wav") in [
+        path for result in results for path in result.output_files]
+
+
+@pytest.mark.parametrize('transfer', ['shared', STREAM])
+def test_inputs_sharing_name_kept_apart(tmp_path, transfer):
+    """Test inputs with the same file name in different folders get their own stems."""
+    infos = []
+    for folder in ("a", "b"):
+        path = tmp_path / folder / "song.wav"
+        path.parent.mkdir()
+        path.write_text(f"song in {folder}")
+        infos.append(AudioFileInfo(path=str(path), duration=5, sample_rate=44100,
+                                   channels=2, format="WAV"))
+    output = tmp_path / "output"
+    coordinator = Coordinator(('localhost', 0), AUTHKEY, 'htdemucs', str(output), ['vocals'],
+                              transfer=transfer, heartbeat_timeout=5.0,
+                              engine=SeparationEngine('htdemucs', name_template=NAME_TEMPLATE))
+    start_workers(coordinator, 2)
+
+    results = coordinator.run(infos)
+
+    assert sorted((output / name / "vocals.wav").read_text()
+                  for name in ("song", "song (1)")) == ["vocals of song in a", "vocals of song in b"]
+    assert len({path for result in results for path in result.output_files}) == 2
+
+
+def test_lost_worker_jobs_dispatched_again(tmp_path):
+    """Test the job of a worker that disappears goes to another worker."""
+    infos = make_inputs(tmp_path / "inputs", [60, 1])
+    coordinator = Coordinator(('localhost', 0), AUTHKEY, 'htdemucs', str(tmp_path / "output"),
+                              ['vocals'], heartbeat_timeout=5.0)
+    lost_events = []
+    coordinator.on_worker = lambda name, event: lost_events.append((name, event))
+    received = threading.Event()
+
+    def vanishing_worker():
+        connection = Client(coordinator.address, authkey=AUTHKEY)
+        connection.send(('hello', {'name': 'vanishing'}))
+        connection.recv()
+        kind, job = connection.recv()
+        assert kind == 'job' and job.input_file == infos[0].path
+        connection.close()
+        received.set()
+
+    threading.Thread(target=vanishing_worker, daemon=True).start()
+    threading.Thread(target=lambda: received.wait(5.0) and start_workers(coordinator, 1),
+                     daemon=True).start()
+
+    results = coordinator.run(infos)
+
+    assert all(result.success for result in results)
+    assert len(results) == 2
+    assert ('vanishing', 'lost, 1 jobs queued again') in lost_events
+
+
+def test_silent_worker_times_out(tmp_path):
+    """Test a worker that stops sending heartbeats is dropped after the timeout."""
+    infos = make_inputs(tmp_path / "inputs", [10])
+    coordinator = Coordinator(('localhost', 0), AUTHKEY, 'htdemucs', str(tmp_path / "output"),
+                              ['vocals'], heartbeat_timeout=0.3, max_attempts=1)
+    connections = []
+
+    def silent_worker():
+        connection = Client(coordinator.address, authkey=AUTHKEY)
+        connection.send(('hello', {'name': 'silent'}))
+        connections.append(connection)
+
+    threading.Thread(target=silent_worker, daemon=True).start()
+    results = coordinator.run(infos)
+    for connection in connections:
+        connection.close()
+
+    assert not results[0].success
+    assert "Lost 1 workers" in results[0].error_message
+
+
+def test_journal_skips_finished_inputs(tmp_path):
+    """Test a coordinator with a journal resumes a batch and records failures."""
+    infos = make_inputs(tmp_path / "inputs", [5, 5, 5])
+    Path(infos[2].path).write_text("broken")
+    output = str(tmp_path / "output")
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    parameters = {'model': 'htdemucs'}
+
+    def run():
+        coordinator = Coordinator(('localhost', 0), AUTHKEY, 'htdemucs', output, ['vocals'],
+                                  transfer=STREAM, journal=journal, parameters=parameters,
+                                  heartbeat_timeout=5.0)
+        start_workers(coordinator, 1)
+        return coordinator.run(infos)
+
+    first = run()
+    second = run()
+
+    assert [result.success for result in first].count(True) == 2
+    assert [result.input_file for result in second] == [infos[2].path]
+    assert journal.stage(infos[0].path, parameters) == DONE
+
+
+def test_shared_interruption_recovered(tmp_path):
+    """Test stems a worker left half written in the shared output are removed on resume."""
+    infos = make_inputs(tmp_path / "inputs", [5])
+    output = tmp_path / "output"
+    journal = JobJournal(str(tmp_path / "jobs.db"))
+    parameters = {'model': 'htdemucs'}
+    coordinator = Coordinator(('localhost', 0), AUTHKEY, 'htdemucs', str(output), ['vocals'],
+                              journal=journal, parameters=parameters, heartbeat_timeout=5.0,
+                              max_attempts=1,
+                              engine=SeparationEngine('htdemucs', name_template=NAME_TEMPLATE))
+
+    def interrupted_worker():
+        connection = Client(coordinator.address, authkey=AUTHKEY)
+        connection.send(('hello', {'name': 'interrupted'}))
+        kind, config = connection.recv()
+        kind, job = connection.recv()
+        Path(config['output_dir'], job.outputs['vocals']).write_text("half a stem")
+        connection.close()
+
+    threading.Thread(target=interrupted_worker, daemon=True).start()
+    results = coordinator.run(infos)
+
+    assert not results[0].success
+    assert (output / "track0" / "vocals.wav").exists()
+    journal.recover()
+    assert not (output / "track0" / "vocals.wav").exists()
+
+
+def test_wrong_authkey_rejected(tmp_path):
+    """Test workers without the coordinator's key can't connect."""
+    coordinator = Coordinator(('localhost', 0), AUTHKEY, 'htdemucs', str(tmp_path), ['vocals'])
+    try:
+        threading.Thread(target=coordinator._accept, daemon=True).start()
+        with pytest.raises(Exception):
+            DistributedWorker(coordinator.address, b'guess', FakeEngine).serve()
+    finally:
+        coordinator.close()
+
+
+def test_parse_address():
+    """Test coordinator addresses are split into host and port."""
+    assert parse_address("gpu-box:7360") == ("gpu-box", 7360)
+    assert parse_address(":9000") == ("localhost", 9000)
+    with pytest.raises(ValueError):
+        parse_address("gpu-box")
@@ -0,0 +1,100 @@
+"""
+Tests for ensemble separation.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from src.waveweaver.core.engine import ModelCache, default_model_cache
+from src.waveweaver.core.ensemble import (
+    EnsembleEngine,
+    EnsembleMember,
+    common_stems,
+    parse_ensemble,
+)
+
+
+def make_ensemble(members, scales):
+    """Create an ensemble whose member models scale the mixture per stem."""
+    ensemble = EnsembleEngine(members, shifts=0, device='cpu', model_cache=ModelCache())
+    for engine, scale in zip(ensemble.engines, scales):
+        stem_count = len(engine.stem_names)
+        engine._model = SimpleNamespace(samplerate=10, segment=1.0)
+
+        def run_model(mix, device, shifts, overlap, scale=scale, stem_count=stem_count):
+            return torch.stack([mix * scale * (index + 1) for index in range(stem_count)], dim=1)
+
+        engine._run_model = run_model
+    return ensemble
+
+
+class TestParseEnsemble:
+    """Test ensemble descriptions."""
+
+    def test_weights_and_devices(self):
+        """Test weights and devices are optional per model."""
+        members = parse_ensemble("htdemucs_ft:2,mdx_extra@cuda:1")
+
+        assert members == [
+            EnsembleMember('htdemucs_ft', 2.0, None),
+            EnsembleMember('mdx_extra', 1.0, 'cuda:1'),
+        ]
+
+    def test_invalid_weight(self):
+        """Test a non-numeric weight is rejected."""
+        with pytest.raises(ValueError):
+            parse_ensemble("htdemucs:heavy")
+
+    def test_common_stems(self):
+        """Test only stems every model produces are kept."""
+        assert common_stems(['htdemucs_6s', 'htdemucs']) == ["drums", "bass", "other", "vocals"]
+
+
+class TestEnsembleEngine:
+    """Test EnsembleEngine class."""
+
+    def test_weighted_average(self):
+        """Test member outputs are averaged with normalized weights."""
+        ensemble = make_ensemble(parse_ensemble("htdemucs_ft:3,mdx_extra:1"), [1.0, 5.0])
+        wav = torch.rand(1, 2, 40)
+
+        sources = ensemble.separate(wav)
+
+        # Stem i of member m is wav * scale_m * (i + 1)
+        expected_scale = 0.75 * 1.0 + 0.25 * 5.0
+        assert sources.shape == (1, 4, 2, 40)
+        assert torch.allclose(sources[0, 1], wav[0] * expected_scale * 2)
+
+    def test_stems_mapped_by_name(self):
+        """Test members with different stem layouts are matched by stem name."""
+        ensemble = make_ensemble(parse_ensemble("htdemucs_6s,htdemucs"), [1.0, 1.0])
+
+        sources = ensemble.separate(torch.ones(1, 2, 10))
+
+        assert ensemble.stem_names == ["drums", "bass", "other", "vocals"]
+        assert torch.allclose(sources[0, 3], torch.full((2, 10), 4.0))
+
+    def test_batch_and_cache_reservation(self):
+        """Test batches are unpacked per clip and all members stay cached."""
+        cache = ModelCache()
+        EnsembleEngine(parse_ensemble("htdemucs,mdx_extra"), device='cpu', model_cache=cache)
+        ensemble = make_ensemble(parse_ensemble("htdemucs,mdx_extra"), [1.0, 3.0])
+
+        results = ensemble.separate_batch([torch.ones(1, 2, 10), torch.ones(1, 2, 6)])
+
+        assert cache.max_models == 2
+        assert [r.shape[-1] for r in results] == [10, 6]
+        assert torch.allclose(results[1][0, 0], torch.full((2, 6), 2.0))
+
+    def test_own_cache_by_default(self):
+        """Test an ensemble doesn't raise the limit of the process-wide cache."""
+        limit = default_model_cache.max_models
+
+        ensemble = EnsembleEngine(parse_ensemble("htdemucs,mdx_extra"), device='cpu')
+
+        assert default_model_cache.max_models == limit
+        assert ensemble.model_cache is not default_model_cache
+        assert ensemble.model_cache.max_models == 2
+        assert all(engine.model_cache is ensemble.model_cache for engine in ensemble.engines)
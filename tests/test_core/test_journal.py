@@ -0,0 +1,96 @@
+"""
+Tests for the job journal and resumable batches.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.journal import DONE, FAILED, WRITING, JobJournal, file_hash
+from src.waveweaver.core.models import ProcessingResult
+from src.waveweaver.utils.file_handler import FileHandler
+
+
+PARAMETERS = {'model': 'htdemucs', 'stems': ['vocals']}
+
+
+class TestJobJournal:
+    """Test JobJournal class."""
+
+    def test_stages_persisted(self, tmp_path):
+        """Test stage changes survive reopening the journal."""
+        output = tmp_path / "song - vocals.wav"
+        journal = JobJournal(str(tmp_path / "jobs.db"))
+        journal.queue("song.wav", PARAMETERS, "abc")
+        journal.start_writing("song.wav", PARAMETERS, [str(output)])
+        journal.close()
+
+        reopened = JobJournal(str(tmp_path / "jobs.db"))
+        assert reopened.stage("song.wav", PARAMETERS) == WRITING
+
+        output.write_bytes(b"RIFF")
+        reopened.finish("song.wav", PARAMETERS,
+                        ProcessingResult(success=True, output_files=[str(output)]))
+
+        assert reopened.is_done("song.wav", PARAMETERS, "abc")
+        assert not reopened.is_done("song.wav", PARAMETERS, "changed")
+        assert not reopened.is_done("song.wav", {**PARAMETERS, 'shifts': 1}, "abc")
+        output.unlink()
+        assert not reopened.is_done("song.wav", PARAMETERS, "abc")
+
+    def test_recover_removes_partial_outputs(self, tmp_path):
+        """Test outputs of interrupted and failed jobs are deleted."""
+        written = tmp_path / "a - vocals.wav"
+        partial = tmp_path / FileHandler.partial_path(str(tmp_path / "b - vocals.wav"))
+        written.write_bytes(b"RIFF")
+        partial.write_bytes(b"RIFF")
+        journal = JobJournal(str(tmp_path / "jobs.db"))
+        for name, output in (("a.wav", written), ("b.wav", tmp_path / "b - vocals.wav")):
+            journal.queue(name, PARAMETERS, "hash")
+            journal.start_writing(name, PARAMETERS, [str(output)])
+        journal.finish("b.wav", PARAMETERS,
+                       ProcessingResult(success=False, output_files=[], error_message="disk full"))
+
+        removed = journal.recover()
+
+        assert sorted(removed) == sorted([str(written), str(partial)])
+        assert journal.stage("b.wav", PARAMETERS) == FAILED
+        assert list(tmp_path.glob("*.wav")) == []
+
+
+class TestResumableBatch:
+    """Test resuming batches in the engine."""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        """Engine with a fake model and decoder."""
+        engine = SeparationEngine('htdemucs', shifts=0, device='cpu')
+        engine._model = SimpleNamespace(samplerate=10, segment=1.0)
+        monkeypatch.setattr(engine, 'load_audio', lambda path: (torch.rand(1, 2, 40) - 0.5, 10))
+        monkeypatch.setattr(engine, '_run_model',
+                            lambda mix, *args: mix.unsqueeze(1).repeat(1, 4, 1, 1) * 0.25)
+        return engine
+
+    def test_completed_files_skipped(self, engine, tmp_path):
+        """Test a re-run only separates files that are new or changed."""
+        inputs = []
+        for name in ("one.wav", "two.wav"):
+            path = tmp_path / name
+            path.write_bytes(name.encode())
+            inputs.append(str(path))
+        (tmp_path / "out").mkdir()
+        journal = JobJournal(str(tmp_path / "jobs.db"))
+
+        first = engine.separate_files(inputs, str(tmp_path / "out"), ["vocals"], journal=journal)
+        (tmp_path / "two.wav").write_bytes(b"new take")
+        second = engine.separate_files(inputs, str(tmp_path / "out"), ["vocals"], journal=journal)
+
+        assert sorted(result.input_file for result in first) == inputs
+        assert all(result.success for result in first + second)
+        assert [result.input_file for result in second] == [inputs[1]]
+        parameters = engine.job_parameters(str(tmp_path / "out"), ["vocals"])
+        assert journal.stage(inputs[1], parameters) == DONE
+        assert journal.is_done(inputs[1], parameters, file_hash(inputs[1]))
+        assert not list((tmp_path / "out").rglob(".*.partial.wav"))
@@ -0,0 +1,150 @@
+"""
+Tests for memory-aware chunking and out-of-memory recovery.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from src.waveweaver.core.chunking import plan_chunks, stitch
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.memory import choose_chunk_frames, estimate_memory, is_out_of_memory
+
+
+# Model with 10-frame segments and two sources
+FAKE_MODEL = SimpleNamespace(samplerate=10, segment=1.0, sources=['a', 'b'])
+
+
+def fake_sources(mix):
+    """Separation stand-in returning the mixture and its negation."""
+    return torch.stack([mix, -mix], dim=1)
+
+
+class TestChunking:
+    """Test chunk planning and stitching."""
+
+    def test_single_chunk_without_limit(self):
+        """Test no chunk size gives one chunk over the whole signal."""
+        chunks = plan_chunks(100, None, 10)
+
+        assert [(c.start, c.end) for c in chunks] == [(0, 100)]
+
+    def test_stitch_reproduces_signal(self):
+        """Test crossfading identical overlaps leaves the signal unchanged."""
+        signal = torch.randn(1, 2, 2, 95)
+        chunks = plan_chunks(95, 30, 8)
+        outputs = [signal[..., c.start:c.end] for c in chunks]
+
+        assert len(chunks) == 4
+        assert torch.allclose(stitch(chunks, outputs), signal, atol=1e-6)
+
+
+class TestMemoryEstimate:
+    """Test device memory estimation."""
+
+    def test_unlimited_device(self):
+        """Test devices without a memory limit are not chunked."""
+        assert choose_chunk_frames(FAKE_MODEL, None, channels=2, shifts=1) is None
+
+    def test_chunk_fits_budget(self):
+        """Test the chosen chunk fits the usable memory."""
+        free = 10 ** 7
+        frames = choose_chunk_frames(FAKE_MODEL, free, channels=2, shifts=1, safety=0.5)
+
+        assert frames > 0
+        assert estimate_memory(FAKE_MODEL, frames, channels=2, shifts=1) <= free * 0.5
+
+    def test_too_little_memory(self):
+        """Test 0 is returned when not even a minimal chunk fits."""
+        assert choose_chunk_frames(FAKE_MODEL, 1000, channels=2, shifts=1) == 0
+
+    def test_out_of_memory_detection(self):
+        """Test out-of-memory errors are told apart from other runtime errors."""
+        assert is_out_of_memory(RuntimeError("CUDA out of memory. Tried to allocate 2 GiB"))
+        assert not is_out_of_memory(RuntimeError("shape mismatch"))
+        assert not is_out_of_memory(ValueError("out of memory"))
+
+
+class TestOutOfMemoryRecovery:
+    """Test the engine retries smaller chunks and falls back to the CPU."""
+
+    def make_engine(self, monkeypatch, max_frames):
+        """Create an engine whose device fails on chunks above max_frames."""
+        engine = SeparationEngine('htdemucs', shifts=0, device='cuda:0', overlap=0.2)
+        engine._model = FAKE_MODEL
+        engine.calls = []
+
+        def run_model(mix, device, shifts, overlap):
+            engine.calls.append((device, mix.shape[-1]))
+            if device != 'cpu' and mix.shape[-1] > max_frames:
+                raise RuntimeError("CUDA out of memory")
+            return fake_sources(mix)
+
+        monkeypatch.setattr(engine, '_run_model', run_model)
+        monkeypatch.setattr('src.waveweaver.core.engine.free_device_memory', lambda device: None)
+        return engine
+
+    def test_retries_with_smaller_chunks(self, monkeypatch):
+        """Test an OOM chunk is split until the pieces fit on the device."""
+        engine = self.make_engine(monkeypatch, max_frames=40)
+        wav = torch.randn(1, 2, 100)
+
+        sources = engine.separate(wav, use_cache=False)
+
+        assert torch.allclose(sources, fake_sources(wav), atol=1e-6)
+        assert not engine.fell_back_to_cpu
+        assert all(device == 'cuda:0' for device, _ in engine.calls)
+
+    def test_falls_back_to_cpu(self, monkeypatch):
+        """Test separation finishes on the CPU when even small chunks fail."""
+        engine = self.make_engine(monkeypatch, max_frames=0)
+        wav = torch.randn(1, 2, 100)
+
+        sources = engine.separate(wav, use_cache=False)
+
+        assert torch.allclose(sources, fake_sources(wav), atol=1e-6)
+        assert engine.fell_back_to_cpu
+        assert engine.calls[-1][0] == 'cpu'
+
+    def test_other_errors_propagate(self, monkeypatch):
+        """Test errors other than OOM are not retried."""
+        engine = self.make_engine(monkeypatch, max_frames=100)
+        monkeypatch.setattr(engine, '_run_model',
+                            lambda *args: (_ for _ in ()).throw(RuntimeError("bad input")))
+
+        with pytest.raises(RuntimeError, match="bad input"):
+            engine.separate(torch.randn(1, 2, 50), use_cache=False)
+
+    def test_batch_is_halved(self, monkeypatch):
+        """Test a batch that runs out of memory is split into smaller batches."""
+        engine = self.make_engine(monkeypatch, max_frames=100)
+
+        def run_model(mix, device, shifts, overlap):
+            engine.calls.append(mix.shape[0])
+            if mix.shape[0] > 2:
+                raise RuntimeError("CUDA out of memory")
+            return fake_sources(mix)
+
+        monkeypatch.setattr(engine, '_run_model', run_model)
+        wavs = [torch.randn(1, 2, 30) for _ in range(4)]
+
+        results = engine.separate_batch(wavs)
+
+        assert engine.calls == [4, 2, 2]
+        for wav, sources in zip(wavs, results):
+            assert torch.allclose(sources, fake_sources(wav))
+
+    def test_chunked_output_matches_whole(self, monkeypatch):
+        """Test separating in memory-sized chunks gives the unchunked result."""
+        engine = self.make_engine(monkeypatch, max_frames=1000)
+        monkeypatch.setattr('src.waveweaver.core.engine.choose_chunk_frames',
+                            lambda *args, **kwargs: 25)
+        wav = torch.randn(1, 2, 100)
+
+        blocks = list(engine.iter_apply(wav))
+
+        assert [start for start, _ in blocks][0] == 0
+        assert len(engine.calls) == 4
+        assert torch.allclose(torch.cat([b for _, b in blocks], dim=-1),
+                              fake_sources(wav), atol=1e-6)
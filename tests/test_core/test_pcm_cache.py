@@ -0,0 +1,106 @@
+"""
+Tests for the decoded audio cache.
+"""
+
+import os
+
+import torch
+
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.pcm_cache import PcmCache
+
+
+class CountingDecoder:
+    """Decoder stand-in counting how often it runs."""
+
+    def __init__(self, frames=1000):
+        self.frames = frames
+        self.calls = 0
+
+    def __call__(self, input_file):
+        self.calls += 1
+        return torch.rand(2, self.frames), 48000
+
+
+def audio_file(tmp_path, name="song.mp3"):
+    """Create an input file; only its path, size and mtime matter."""
+    path = tmp_path / name
+    path.write_bytes(b"compressed audio")
+    return str(path)
+
+
+class TestPcmCache:
+    """Test PcmCache class."""
+
+    def test_repeat_read_maps_cached_samples(self, tmp_path):
+        """Test a second read returns the stored samples without decoding."""
+        cache = PcmCache(str(tmp_path / "cache"))
+        decode = CountingDecoder()
+        path = audio_file(tmp_path)
+
+        wav, sample_rate = cache.read(path, decode)
+        cached, cached_rate = cache.read(path, decode)
+
+        assert decode.calls == 1
+        assert (cache.hits, cache.misses) == (1, 1)
+        assert cached_rate == sample_rate == 48000
+        assert torch.equal(cached, wav)
+
+    def test_changed_file_decoded_again(self, tmp_path):
+        """Test modifying the input invalidates its entry."""
+        cache = PcmCache(str(tmp_path / "cache"))
+        decode = CountingDecoder()
+        path = audio_file(tmp_path)
+        cache.read(path, decode)
+
+        with open(path, 'ab') as f:
+            f.write(b"more")
+        cache.read(path, decode)
+
+        assert decode.calls == 2
+
+    def test_uncompressed_not_cached(self, tmp_path):
+        """Test WAV inputs are read directly."""
+        cache = PcmCache(str(tmp_path / "cache"))
+        decode = CountingDecoder()
+        path = audio_file(tmp_path, "song.wav")
+
+        cache.read(path, decode)
+        cache.read(path, decode)
+
+        assert decode.calls == 2
+        assert not list((tmp_path / "cache").iterdir())
+
+    def test_least_recently_used_evicted(self, tmp_path):
+        """Test the cache stays under its size limit by dropping the oldest entry."""
+        # Room for two entries of 2 x 1000 float32 samples and their header
+        cache = PcmCache(str(tmp_path / "cache"), max_bytes=2 * 8100)
+        decode = CountingDecoder()
+        paths = [audio_file(tmp_path, f"{i}.mp3") for i in range(3)]
+
+        cache.read(paths[0], decode)
+        cache.read(paths[1], decode)
+        entries = sorted((tmp_path / "cache").glob('*.pcm'))
+        for age, entry in enumerate(entries):
+            os.utime(entry, (1000 + age, 1000 + age))
+        # Reading the first file again makes the other one the oldest
+        cache.read(paths[0], decode)
+        cache.read(paths[2], decode)
+
+        assert len(list((tmp_path / "cache").glob('*.pcm'))) == 2
+        cache.read(paths[0], decode)
+        assert decode.calls == 3
+
+
+def test_engine_reads_through_cache(tmp_path, monkeypatch):
+    """Test the engine decodes a compressed input once across runs."""
+    decode = CountingDecoder()
+    monkeypatch.setattr(SeparationEngine, '_decode_audio', staticmethod(decode))
+    engine = SeparationEngine('htdemucs', device='cpu', pcm_cache=PcmCache(str(tmp_path / "cache")))
+    path = audio_file(tmp_path)
+
+    first, _ = engine.load_audio(path)
+    second, _ = engine.load_audio(path)
+
+    assert decode.calls == 1
+    assert torch.equal(first, second)
@@ -0,0 +1,111 @@
+"""
+Tests for the decode -> infer -> encode pipeline.
+"""
+
+import threading
+
+import pytest
+import torch
+
+from src.waveweaver.core.batching import pack_batch, unpack_batch
+from src.waveweaver.core.pipeline import SeparationPipeline, plan_units
+
+
+class FakeEngine:
+    """Engine stand-in that records which thread ran each stage."""
+    
+    def __init__(self, fail_on=()):
+        self.fail_on = set(fail_on)
+        self.infer_threads = set()
+        self.batches = []
+        self.saved = []
+        self.lock = threading.Lock()
+        self.transfer_time = 0.0
+        self.compute_saved = 0.0
+    
+    def load_audio(self, path):
+        if path in self.fail_on:
+            raise RuntimeError("decode failed")
+        return torch.ones(1, 2, 10), 44100
+    
+    def separate(self, wav, sample_rate=None):
+        self.infer_threads.add(threading.get_ident())
+        return wav.unsqueeze(1).repeat(1, 4, 1, 1)
+    
+    def separate_batch(self, wavs, sample_rate=None):
+        batch, lengths = pack_batch(wavs)
+        self.batches.append(len(wavs))
+        return unpack_batch(self.separate(batch), lengths)
+    
+    def to_buffer(self, sources, stems):
+        return sources
+    
+    def save_stems(self, buffer, sample_rate, input_file, output_dir, stems,
+                   is_cancelled=None):
+        with self.lock:
+            self.saved.append(input_file)
+        return [f"{input_file}-{stem}" for stem in stems]
+
+
+class TestSeparationPipeline:
+    """Test SeparationPipeline class."""
+    
+    def test_all_units_processed(self):
+        """Test every input produces a result and batches stay together."""
+        engine = FakeEngine()
+        pipeline = SeparationPipeline(engine, decoder_workers=2,
+                                      encoder_workers=2, queue_depth=1)
+        units = [["a", "b"], ["c"], ["d"]]
+        
+        results = pipeline.run(units, "out", ["vocals"])
+        
+        assert sorted(result.input_file for result in results) == ["a", "b", "c", "d"]
+        assert all(result.success for result in results)
+        assert engine.batches == [2]
+        assert len(engine.infer_threads) == 1
+    
+    def test_decode_error_reported_per_file(self):
+        """Test a bad file fails alone and splits its batch."""
+        engine = FakeEngine(fail_on={"b"})
+        pipeline = SeparationPipeline(engine)
+        
+        results = pipeline.run([["a", "b"], ["c"]], "out", ["vocals"])
+        by_file = {result.input_file: result for result in results}
+        
+        assert by_file["a"].success
+        assert by_file["c"].success
+        assert not by_file["b"].success
+        assert "decode failed" in by_file["b"].error_message
+        assert engine.batches == []
+    
+    def test_decoders_released_when_inference_fails(self):
+        """Test decoders blocked on a full queue exit when inference raises."""
+        engine = FakeEngine()
+        engine.to_buffer = lambda sources, stems: 1 / 0
+        pipeline = SeparationPipeline(engine, decoder_workers=2, queue_depth=1)
+        
+        with pytest.raises(ZeroDivisionError):
+            pipeline.run([[str(index)] for index in range(10)], "out", ["vocals"])
+        
+        for thread in threading.enumerate():
+            if thread.name.startswith("decoder"):
+                thread.join(5.0)
+                assert not thread.is_alive()
+    
+    def test_cancelled_before_start(self):
+        """Test nothing is processed once cancelled."""
+        engine = FakeEngine()
+        pipeline = SeparationPipeline(engine)
+        
+        results = pipeline.run([["a"], ["b"]], "out", ["vocals"],
+                               is_cancelled=lambda: True)
+        
+        assert results == []
+        assert engine.saved == []
+
+
+def test_plan_units_keeps_job_order():
+    """Test units follow the position of their first input."""
+    units = plan_units([[1, 3]], [0, 2], ["w", "x", "y", "z"])
+    
+    assert units == [["w"], ["x", "z"], ["y"]]
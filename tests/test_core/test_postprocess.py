@@ -0,0 +1,90 @@
+"""
+Tests for stem post-processing.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+import soundfile as sf
+import torch
+
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.postprocess import PostProcessor, db_to_gain, soft_limit
+
+
+STEM_NAMES = ["drums", "bass", "other", "vocals"]
+
+
+class TestPostProcessor:
+    """Test PostProcessor class."""
+
+    def test_residual_appended(self):
+        """Test the residual is the mix minus the chosen stem."""
+        processor = PostProcessor(residual="vocals")
+        mix = torch.rand(1, 2, 50)
+        sources = torch.rand(1, 4, 2, 50)
+
+        output = processor.process_chunk(mix, sources, STEM_NAMES)
+
+        assert processor.extra_stems == ["no_vocals"]
+        assert output.shape == (1, 5, 2, 50)
+        assert torch.allclose(output[:, 4], mix - sources[:, 3])
+
+    def test_unknown_residual_stem(self):
+        """Test a residual of a stem the model lacks is rejected."""
+        with pytest.raises(ValueError):
+            PostProcessor(residual="piano").process_chunk(
+                torch.rand(1, 2, 5), torch.rand(1, 4, 2, 5), STEM_NAMES)
+
+    def test_peak_normalize_per_stem(self):
+        """Test each stem is scaled to the peak target and silence is kept."""
+        processor = PostProcessor(normalize="peak", target_db=-6.0)
+        sources = torch.zeros(1, 2, 2, 100)
+        sources[0, 0, 0, 10] = 0.25
+
+        output = processor.process_track(sources)
+
+        assert output[0, 0].abs().max().item() == pytest.approx(db_to_gain(-6.0))
+        assert torch.count_nonzero(output[0, 1]) == 0
+
+    def test_rms_normalize(self):
+        """Test RMS normalization reaches the target level."""
+        processor = PostProcessor(normalize="rms", target_db=-20.0)
+        output = processor.process_track(torch.randn(1, 1, 2, 1000) * 0.5)
+
+        rms = output.pow(2).mean().sqrt().item()
+        assert rms == pytest.approx(db_to_gain(-20.0), rel=1e-4)
+
+    def test_soft_limit(self):
+        """Test the limiter keeps quiet samples and caps loud ones."""
+        audio = torch.tensor([0.1, -0.5, 1.5, -3.0])
+
+        limited = soft_limit(audio, ceiling_db=0.0)
+
+        assert torch.equal(limited[:2], audio[:2])
+        assert limited.abs().max() < 1.0
+        assert limited[2] > 0 > limited[3]
+
+    def test_invalid_mode(self):
+        """Test unknown normalization modes are rejected."""
+        with pytest.raises(ValueError):
+            PostProcessor(normalize="lufs")
+
+
+class TestEnginePostProcessing:
+    """Test post-processing inside the engine."""
+
+    def test_residual_written_with_selection(self, tmp_path, monkeypatch):
+        """Test the residual stem is saved next to the selected stems."""
+        engine = SeparationEngine('htdemucs', shifts=0, device='cpu',
+                                  postprocess=PostProcessor(residual="vocals", normalize="peak"))
+        engine._model = SimpleNamespace(samplerate=10, segment=1.0)
+        monkeypatch.setattr(engine, '_run_model',
+                            lambda mix, *args: mix.unsqueeze(1).repeat(1, 4, 1, 1) * 0.25)
+        wav = torch.rand(1, 2, 40) * 0.5
+
+        output_files = engine.separate_to_files(wav, 10, "song.wav", str(tmp_path), ["drums"])
+
+        assert [f.rsplit(" - ", 1)[1] for f in output_files] == ["drums.wav", "no_vocals.wav"]
+        data, _ = sf.read(output_files[1], dtype='float32')
+        assert abs(data).max() == pytest.approx(db_to_gain(-1.0), abs=1e-3)
@@ -0,0 +1,98 @@
+"""
+Tests for stem preview mode.
+"""
+
+from pathlib import Path
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.preview import (
+    PREVIEW_SHIFTS,
+    PreviewResult,
+    preview_window,
+    separate_preview,
+)
+
+
+class FakeEngine:
+    """Engine stand-in recording the separation profile it was asked for."""
+    
+    model_name = "htdemucs"
+    stem_names = ["drums", "bass", "other", "vocals"]
+    
+    def __init__(self):
+        self.calls = []
+    
+    def load_audio_range(self, input_file, start, duration):
+        self.calls.append(("range", start, duration))
+        return torch.ones(1, 2, int(duration * 100)), 100
+    
+    def separate(self, wav, shifts=None, overlap=None, use_cache=True, sample_rate=None):
+        self.calls.append(("separate", shifts, use_cache))
+        return wav.unsqueeze(1).repeat(1, 4, 1, 1)
+
+
+class TestPreviewWindow:
+    """Test preview window placement."""
+    
+    def test_centered(self):
+        """Test the window is centred on the position."""
+        assert preview_window(60.0, 20.0, 300.0) == (50.0, 20.0)
+    
+    def test_clamped_to_start(self):
+        """Test the window never starts before the file."""
+        assert preview_window(3.0, 20.0, 300.0) == (0.0, 20.0)
+    
+    def test_clamped_to_end(self):
+        """Test the window never runs past the end of the file."""
+        assert preview_window(295.0, 20.0, 300.0) == (280.0, 20.0)
+    
+    def test_short_file(self):
+        """Test files shorter than the window are previewed whole."""
+        assert preview_window(5.0, 20.0, 8.0) == (0.0, 8.0)
+
+
+def test_separate_preview_uses_fast_profile():
+    """Test preview decodes only its range and skips the segment cache."""
+    engine = FakeEngine()
+    
+    result = separate_preview(engine, "song.wav", 60.0, 20.0, total_duration=300.0)
+    
+    assert engine.calls[0] == ("range", 50.0, 20.0)
+    assert engine.calls[1] == ("separate", PREVIEW_SHIFTS, False)
+    assert set(result.stems) == {"drums", "bass", "other", "vocals"}
+    assert result.stems["vocals"].shape == (2, 2000)
+    assert result.start == 50.0
+
+
+def test_write_temp(tmp_path):
+    """Test preview stems are written as WAV files."""
+    result = PreviewResult(
+        input_file="song.mp3",
+        start=0.0,
+        duration=1.0,
+        sample_rate=100,
+        stems={"vocals": torch.zeros(2, 100)}
+    )
+    
+    paths = result.write_temp(str(tmp_path))
+    
+    assert Path(paths["vocals"]).exists()
+    assert sf.info(paths["vocals"]).frames == 100
+
+
+def test_load_audio_range_reads_only_window(tmp_path):
+    """Test a range load returns exactly the requested frames."""
+    audio_file = tmp_path / "ramp.wav"
+    data = np.arange(1000, dtype=np.float32).repeat(2).reshape(-1, 2) / 1000
+    sf.write(str(audio_file), data, 100, subtype="FLOAT")
+    engine = SeparationEngine("htdemucs", device="cpu")
+    
+    wav, sample_rate = engine.load_audio_range(str(audio_file), 2.0, 3.0)
+    
+    assert sample_rate == 100
+    assert wav.shape == (1, 2, 300)
+    assert torch.allclose(wav[0, 0, 0], torch.tensor(0.2))
@@ -0,0 +1,92 @@
+"""
+Tests for pre-flight probing.
+"""
+
+import json
+import subprocess
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.probe import ProbeError, probe_file, probe_files
+
+
+def write_wav(path, frames=4410, sample_rate=44100):
+    """Write a short stereo WAV file."""
+    sf.write(str(path), np.zeros((frames, 2), dtype=np.float32), sample_rate)
+    return str(path)
+
+
+class TestProbe:
+    """Test probing functions."""
+
+    def test_valid_file(self, tmp_path):
+        """Test a readable file reports its real format."""
+        info = probe_file(write_wav(tmp_path / "song.wav", 22050, 22050))
+
+        assert info.duration == pytest.approx(1.0)
+        assert info.sample_rate == 22050
+        assert info.channels == 2
+
+    def test_empty_audio_rejected(self, tmp_path):
+        """Test a file without samples is rejected."""
+        with pytest.raises(ProbeError, match="empty"):
+            probe_file(write_wav(tmp_path / "empty.wav", 0))
+
+    def test_unreadable_without_ffprobe(self, tmp_path, monkeypatch):
+        """Test a corrupt file is rejected when ffprobe is not installed."""
+        path = tmp_path / "broken.mp3"
+        path.write_bytes(b"not audio")
+        monkeypatch.setattr('shutil.which', lambda name: None)
+
+        with pytest.raises(ProbeError):
+            probe_file(str(path))
+
+    def test_ffprobe_fallback(self, tmp_path, monkeypatch):
+        """Test formats libsndfile can't read are probed with ffprobe."""
+        path = tmp_path / "song.m4a"
+        path.write_bytes(b"m4a data")
+        output = json.dumps({
+            'streams': [{'sample_rate': '48000', 'channels': 2}],
+            'format': {'duration': '181.5', 'format_name': 'mov,mp4,m4a'},
+        })
+        monkeypatch.setattr('shutil.which', lambda name: '/usr/bin/ffprobe')
+        monkeypatch.setattr(subprocess, 'run',
+                            lambda *args, **kwargs: SimpleNamespace(stdout=output))
+
+        info = probe_file(str(path))
+
+        assert info.duration == 181.5
+        assert info.sample_rate == 48000
+
+    def test_batch_report(self, tmp_path, monkeypatch):
+        """Test a batch keeps valid files in order and lists rejected ones."""
+        monkeypatch.setattr('shutil.which', lambda name: None)
+        paths = [write_wav(tmp_path / f"{i}.wav") for i in range(5)]
+        paths.insert(2, str(tmp_path / "missing.wav"))
+
+        report = probe_files(paths, workers=3)
+
+        assert report.paths == paths[:2] + paths[3:]
+        assert list(report.errors) == [str(tmp_path / "missing.wav")]
+        assert report.total_duration == pytest.approx(0.5)
+
+
+def test_engine_estimate(monkeypatch):
+    """Test the time estimate uses the model's per-pass cost and shifts."""
+    engine = SeparationEngine('htdemucs', shifts=2, device='cpu')
+    monkeypatch.setattr('src.waveweaver.core.models.AvailableModels.get_model',
+                        lambda name: SimpleNamespace(real_time_factor=lambda device: 0.5))
+
+    assert engine.estimate_seconds(60) == 60.0
+
+
+@pytest.mark.parametrize('model', ['htdemucs', 'htdemucs_ft', 'mdx_extra', 'mdx_extra_q',
+                                   'htdemucs_6s'])
+@pytest.mark.parametrize('device', ['cpu', 'cuda'])
+def test_builtin_models_have_estimate(model, device):
+    """Test built-in models estimate a time without a registry file."""
+    assert SeparationEngine(model, shifts=1, device=device).estimate_seconds(60) > 0
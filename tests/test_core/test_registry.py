@@ -0,0 +1,89 @@
+"""
+Tests for the model registry.
+"""
+
+import json
+import sys
+from types import SimpleNamespace
+
+import pytest
+
+from src.waveweaver.core import registry
+from src.waveweaver.core.models import AvailableModels, ModelInfo
+
+
+@pytest.fixture(autouse=True)
+def isolated_models(monkeypatch):
+    """Keep registered models from leaking into other tests."""
+    monkeypatch.setattr(AvailableModels, 'MODELS', dict(AvailableModels.MODELS))
+
+
+class TestRegistryFiles:
+    """Test loading registry files."""
+
+    def test_json_registry(self, tmp_path):
+        """Test JSON entries become models with metadata and local repos."""
+        path = tmp_path / "models.json"
+        path.write_text(json.dumps({"models": {"karaoke": {
+            "name": "Karaoke",
+            "stems": ["vocals", "accompaniment"],
+            "parameter_count": 42000000,
+            "rtf_gpu": 0.05,
+            "repo": "weights",
+        }}}))
+
+        models = registry.load_models(str(path), use_entry_points=False)
+
+        info = AvailableModels.get_model("karaoke")
+        assert models == [info]
+        assert info.parameter_count == 42000000
+        assert info.real_time_factor("cuda:0") == 0.05
+        assert info.sample_rate == 44100
+        assert info.repo == str(tmp_path / "weights")
+
+    @pytest.mark.skipif(sys.version_info < (3, 11), reason="tomllib not available")
+    def test_toml_overrides_builtin(self, tmp_path):
+        """Test registry entries replace built-in models with the same key."""
+        path = tmp_path / "models.toml"
+        path.write_text(
+            '[models.htdemucs]\n'
+            'name = "HTDemucs"\n'
+            'stems = ["drums", "bass", "other", "vocals"]\n'
+            'rtf_cpu = 0.8\n'
+            'peak_memory_per_minute = 1000000\n'
+        )
+
+        registry.load_models(str(path), use_entry_points=False)
+
+        assert AvailableModels.get_model("htdemucs").rtf_cpu == 0.8
+        assert AvailableModels.get_model("htdemucs").peak_memory_per_minute == 1000000
+
+    def test_entry_without_stems(self, tmp_path):
+        """Test entries must list their stems."""
+        path = tmp_path / "models.json"
+        path.write_text(json.dumps({"broken": {"name": "Broken"}}))
+
+        with pytest.raises(ValueError):
+            registry.load_registry_file(str(path))
+
+
+class TestEntryPoints:
+    """Test models contributed by plugins."""
+
+    def test_plugins_loaded_and_broken_skipped(self, monkeypatch):
+        """Test plugin models are registered and failing plugins ignored."""
+        custom = ModelInfo(key="custom", name="Custom", description="", stems=["vocals"])
+
+        def broken():
+            raise RuntimeError("missing weights")
+
+        points = [
+            SimpleNamespace(name="good", load=lambda: (lambda: [custom])),
+            SimpleNamespace(name="bad", load=lambda: broken),
+        ]
+        monkeypatch.setattr(registry, '_entry_points', lambda group: points)
+
+        with pytest.warns(UserWarning, match="bad"):
+            registry.load_models()
+
+        assert AvailableModels.get_model("custom") is custom
@@ -0,0 +1,98 @@
+"""
+Tests for the incremental segment cache.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from src.waveweaver.core.segment_cache import SegmentCache, plan_segments
+
+
+# Model with 10-frame segments: cached segments are 40 frames with 10-frame margins
+FAKE_MODEL = SimpleNamespace(samplerate=10, segment=1.0)
+
+
+class CountingSeparator:
+    """Separation stand-in that records how many frames it processed."""
+    
+    def __init__(self):
+        self.frames = 0
+        self.calls = 0
+    
+    def __call__(self, wav):
+        self.calls += 1
+        self.frames += wav.shape[-1]
+        return torch.stack([wav[0], -wav[0]]).unsqueeze(0)
+
+
+class TestPlanSegments:
+    """Test segment planning."""
+    
+    def test_cores_cover_signal(self):
+        """Test cores tile the signal and margins are clipped at the edges."""
+        segments = plan_segments(100, 40, 10)
+        
+        assert [(s.core_start, s.core_end) for s in segments] == [(0, 40), (40, 80), (80, 100)]
+        assert [(s.start, s.end) for s in segments] == [(0, 50), (30, 90), (70, 100)]
+    
+    def test_invalid_segment_size(self):
+        """Test zero-length segments are rejected."""
+        with pytest.raises(ValueError):
+            plan_segments(100, 0, 10)
+
+
+class TestSegmentCache:
+    """Test SegmentCache class."""
+    
+    def test_rerun_is_fully_cached(self, tmp_path):
+        """Test an unchanged input is not separated again."""
+        cache = SegmentCache(str(tmp_path))
+        separator = CountingSeparator()
+        wav = torch.randn(1, 2, 200)
+        
+        first = cache.separate(wav, separator, FAKE_MODEL, "model")
+        second = cache.separate(wav, separator, FAKE_MODEL, "model")
+        
+        assert separator.calls == 1
+        assert torch.equal(first, second)
+        assert first.shape == (1, 2, 2, 200)
+        assert cache.hits == 5
+    
+    def test_edit_recomputes_neighbourhood(self, tmp_path):
+        """Test an edit only recomputes the touched segment and its neighbours."""
+        cache = SegmentCache(str(tmp_path))
+        separator = CountingSeparator()
+        wav = torch.randn(1, 2, 400)
+        cache.separate(wav, separator, FAKE_MODEL, "model")
+        
+        edited = wav.clone()
+        edited[..., 205] += 1.0
+        separator.frames = 0
+        result = cache.separate(edited, separator, FAKE_MODEL, "model")
+        
+        # Segment 5 owns frame 205, segment 4 sees it through its margin
+        assert separator.frames == 100
+        assert torch.equal(result[0, 0], edited[0])
+    
+    def test_params_change_invalidates(self, tmp_path):
+        """Test different job parameters never share entries."""
+        cache = SegmentCache(str(tmp_path))
+        separator = CountingSeparator()
+        wav = torch.randn(1, 2, 100)
+        
+        cache.separate(wav, separator, FAKE_MODEL, "model-a")
+        cache.separate(wav, separator, FAKE_MODEL, "model-b")
+        
+        assert separator.calls == 2
+    
+    def test_prune(self, tmp_path):
+        """Test pruning evicts entries down to the size budget."""
+        cache = SegmentCache(str(tmp_path))
+        cache.separate(torch.randn(1, 2, 200), CountingSeparator(), FAKE_MODEL, "model")
+        
+        removed = cache.prune(0)
+        
+        assert removed == 5
+        assert list(tmp_path.glob("*.npy")) == []
@@ -0,0 +1,110 @@
+"""
+Tests for the sharded dataset export.
+"""
+
+import numpy as np
+import pytest
+import torch
+
+from src.waveweaver.core.buffers import StemBuffer
+from src.waveweaver.core.pipeline import SeparationPipeline
+from src.waveweaver.core.shards import ShardDataset, ShardWriter
+
+STEMS = ['drums', 'bass', 'other', 'vocals']
+
+
+def buffer(frames, channels=2, dtype='int16'):
+    """Build a buffer of random separated stems."""
+    sources = torch.rand(len(STEMS), channels, frames) - 0.5
+    return StemBuffer.from_sources(sources, STEMS, ['vocals', 'drums'], dtype)
+
+
+class TestShardWriter:
+    """Test ShardWriter class."""
+
+    def test_clips_split_into_shards(self, tmp_path):
+        """Test clips fill shards of the configured size and read back unchanged."""
+        # Two stems x 2 channels x int16: 8 bytes per frame, shards close past 1000 frames
+        writer = ShardWriter(str(tmp_path), ['vocals', 'drums'], shard_bytes=8000)
+        buffers = [buffer(frames) for frames in (600, 500, 300, 700)]
+        for index, stems in enumerate(buffers):
+            writer.add(f"{index}.wav", stems, 44100)
+        writer.close()
+
+        dataset = ShardDataset(str(tmp_path))
+        assert len(dataset) == 4
+        assert [clip['shard'] for clip in dataset.clips] == [0, 0, 1, 1]
+        assert [clip['offset'] for clip in dataset.clips] == [0, 600, 0, 300]
+        for clip, stems in enumerate(buffers):
+            assert np.array_equal(dataset[clip]['vocals'], stems.stems['vocals'])
+            assert np.array_equal(dataset[clip]['drums'], stems.stems['drums'])
+        assert isinstance(dataset[0]['vocals'], np.memmap)
+        assert sorted(path.name for path in tmp_path.iterdir()) == [
+            'index.json',
+            'shard-00000.drums.npy', 'shard-00000.vocals.npy',
+            'shard-00001.drums.npy', 'shard-00001.vocals.npy',
+        ]
+
+    def test_int24_stored_as_float(self, tmp_path):
+        """Test packed 24-bit stems are exported as float32 arrays."""
+        writer = ShardWriter(str(tmp_path), ['vocals', 'drums'])
+        stems = buffer(100, dtype='int24')
+        writer.add("a.wav", stems, 48000)
+        writer.close()
+
+        vocals = ShardDataset(str(tmp_path))[0]['vocals']
+        assert vocals.dtype == np.float32
+        assert np.allclose(vocals, stems.to_float('vocals'))
+
+    def test_mismatched_clip_rejected(self, tmp_path):
+        """Test a clip with another channel count fails without shifting later clips."""
+        writer = ShardWriter(str(tmp_path), ['vocals', 'drums'])
+        writer.add("a.wav", buffer(100), 44100)
+        with pytest.raises(ValueError):
+            writer.add("mono.wav", buffer(100, channels=1), 44100)
+        last = buffer(50)
+        writer.add("b.wav", last, 44100)
+        writer.close()
+
+        dataset = ShardDataset(str(tmp_path))
+        assert [clip['input'] for clip in dataset.clips] == ["a.wav", "b.wav"]
+        assert np.array_equal(dataset[1]['drums'], last.stems['drums'])
+
+    def test_existing_export_refused(self, tmp_path):
+        """Test a directory holding a dataset is not overwritten."""
+        ShardWriter(str(tmp_path), ['vocals']).close()
+
+        with pytest.raises(ValueError):
+            ShardWriter(str(tmp_path), ['vocals'])
+
+
+class ExportEngine:
+    """Engine stand-in producing real stem buffers."""
+
+    transfer_time = 0.0
+    compute_saved = 0.0
+
+    def load_audio(self, path):
+        return torch.rand(1, 2, 10) - 0.5, 44100
+
+    def separate(self, wav, sample_rate=None):
+        return wav.unsqueeze(1).repeat(1, 4, 1, 1)
+
+    def to_buffer(self, sources, stems):
+        return StemBuffer.from_sources(sources[0], STEMS, stems)
+
+    def save_stems(self, *args, **kwargs):
+        raise AssertionError("Dataset exports must not write stem files")
+
+
+def test_pipeline_exports_to_dataset(tmp_path):
+    """Test the pipeline hands separated stems to the shard writer."""
+    writer = ShardWriter(str(tmp_path), ['vocals'])
+
+    results = SeparationPipeline(ExportEngine()).run(
+        [["a.wav"], ["b.wav"]], str(tmp_path), ['vocals'], dataset=writer)
+    writer.close()
+
+    assert all(result.success for result in results)
+    assert results[0].output_files == [str(tmp_path / 'shard-00000.vocals.npy')]
+    assert sorted(clip['input'] for clip in ShardDataset(str(tmp_path)).clips) == ["a.wav", "b.wav"]
@@ -0,0 +1,66 @@
+"""
+Tests for model weights shared between processes.
+"""
+
+import os
+
+import pytest
+import torch
+
+from src.waveweaver.core.engine import ModelCache
+from src.waveweaver.core.shared_weights import SharedWeights
+
+
+def small_model(seed=0):
+    """Build a model with parameters and buffers, including a scalar one."""
+    torch.manual_seed(seed)
+    return torch.nn.Sequential(torch.nn.Linear(8, 4), torch.nn.BatchNorm1d(4)).eval()
+
+
+class TestSharedWeights:
+    """Test SharedWeights class."""
+
+    def test_attach_keeps_outputs(self, tmp_path):
+        """Test a model reads its weights from the file and still computes the same output."""
+        model = small_model()
+        inputs = torch.randn(3, 8)
+        expected = model(inputs)
+
+        SharedWeights(str(tmp_path)).attach('small', model)
+
+        assert torch.equal(model(inputs), expected)
+        assert len(list(tmp_path.glob('*.bin'))) == 1
+        assert len(list(tmp_path.glob('*.json'))) == 1
+
+    @pytest.mark.skipif(not os.path.exists('/proc/self/maps'), reason="needs /proc")
+    def test_same_weights_map_one_file(self, tmp_path):
+        """Test copies of a model map the same file and different weights get their own."""
+        store = SharedWeights(str(tmp_path))
+        first = store.attach('small', small_model())
+        second = store.attach('small', small_model())
+        other = store.attach('small', small_model(seed=1))
+
+        assert len(list(tmp_path.glob('*.bin'))) == 2
+        assert torch.equal(first[0].weight, second[0].weight)
+        assert not torch.equal(first[0].weight, other[0].weight)
+        with open('/proc/self/maps') as f:
+            mapped = f.read()
+        assert sum(str(path) in mapped for path in tmp_path.glob('*.bin')) == 2
+
+    def test_writes_stay_private(self, tmp_path):
+        """Test changing an attached tensor does not alter the shared file."""
+        store = SharedWeights(str(tmp_path))
+        original = small_model()[0].weight.clone()
+        store.attach('small', small_model())[0].weight.data.zero_()
+
+        assert torch.equal(store.attach('small', small_model())[0].weight, original)
+
+
+def test_model_cache_attaches_cpu_models(tmp_path, monkeypatch):
+    """Test the model cache attaches models loaded on the CPU."""
+    monkeypatch.setattr('src.waveweaver.core.engine.get_model', lambda name, **kwargs: small_model())
+    cache = ModelCache(shared_weights=SharedWeights(str(tmp_path)))
+
+    cache.get('htdemucs', 'cpu')
+
+    assert len(list(tmp_path.glob('*.bin'))) == 1
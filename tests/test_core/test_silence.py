@@ -0,0 +1,105 @@
+"""
+Tests for silence-aware inference.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+import torch
+
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.postprocess import PostProcessor
+from src.waveweaver.core.silence import SilenceGate
+
+
+SAMPLE_RATE = 1024
+
+
+def mixture(*regions):
+    """Build a [1, 2, T] mixture from (seconds, loud) regions."""
+    parts = [torch.rand(1, 2, int(seconds * SAMPLE_RATE)) * (0.5 if loud else 0.0)
+             for seconds, loud in regions]
+    return torch.cat(parts, dim=-1)
+
+
+class TestSilenceGate:
+    """Test SilenceGate class."""
+
+    def test_long_silence_gated_with_padding(self):
+        """Test a long silent region is removed except for the padding."""
+        gate = SilenceGate(min_silence=2.0, padding=0.5)
+        wav = mixture((3, True), (5, False), (2, True))
+
+        spans = gate.active_spans(wav, SAMPLE_RATE)
+
+        assert spans == [(0, int(3.5 * SAMPLE_RATE)), (int(7.5 * SAMPLE_RATE), 10 * SAMPLE_RATE)]
+
+    def test_short_silence_kept(self):
+        """Test pauses shorter than the minimum are separated."""
+        gate = SilenceGate(min_silence=2.0)
+        wav = mixture((3, True), (1, False), (3, True))
+
+        assert gate.active_spans(wav, SAMPLE_RATE) == [(0, wav.shape[-1])]
+
+    def test_silent_edges_and_quiet_noise(self):
+        """Test silence at the track edges needs no padding and noise below the threshold is silent."""
+        gate = SilenceGate(threshold_db=-60.0, min_silence=1.0, padding=0.5)
+        wav = mixture((2, False), (2, True), (2, False))
+        wav[..., :2 * SAMPLE_RATE] += 1e-4 * torch.randn(1, 2, 2 * SAMPLE_RATE)
+
+        spans = gate.active_spans(wav, SAMPLE_RATE)
+
+        assert spans == [(int(1.5 * SAMPLE_RATE), int(4.5 * SAMPLE_RATE))]
+
+    def test_all_silent(self):
+        """Test a silent track has no active span."""
+        assert SilenceGate().active_spans(torch.zeros(1, 2, 5 * SAMPLE_RATE), SAMPLE_RATE) == []
+
+
+class TestGatedEngine:
+    """Test silence gating inside the engine."""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        """Engine recording the length of every chunk given to the model."""
+        engine = SeparationEngine('htdemucs', shifts=0, device='cpu',
+                                  silence_gate=SilenceGate(min_silence=2.0, padding=0.5))
+        engine._model = SimpleNamespace(samplerate=SAMPLE_RATE, segment=1.0)
+        engine.chunk_lengths = []
+
+        def run_model(mix, device, shifts, overlap):
+            engine.chunk_lengths.append(mix.shape[-1])
+            return mix.unsqueeze(1).repeat(1, 4, 1, 1) * 0.25
+
+        monkeypatch.setattr(engine, '_run_model', run_model)
+        return engine
+
+    def test_only_active_spans_separated(self, engine):
+        """Test silent regions skip the model and come out as zeros."""
+        wav = mixture((3, True), (6, False), (1, True))
+
+        sources = engine.separate(wav)
+
+        assert sum(engine.chunk_lengths) == 5 * SAMPLE_RATE
+        assert engine.compute_saved == pytest.approx(0.5)
+        assert sources.shape == (1, 4, 2, 10 * SAMPLE_RATE)
+        assert torch.allclose(sources, wav.unsqueeze(1) * 0.25)
+
+    def test_residual_of_silence(self, engine):
+        """Test post-processing still covers the skipped regions."""
+        engine.postprocess = PostProcessor(residual="vocals")
+        wav = mixture((3, True), (6, False), (1, True))
+
+        sources = engine.separate(wav)
+
+        assert sources.shape[1] == 5
+        assert torch.allclose(sources[:, 4], wav * 0.75)
+
+    def test_gate_timed_at_input_rate(self, engine):
+        """Test silence lengths are measured at the input's sample rate, not the model's."""
+        engine._model.samplerate = 4 * SAMPLE_RATE
+        wav = mixture((3, True), (6, False), (1, True))
+
+        engine.separate(wav, sample_rate=SAMPLE_RATE)
+
+        assert sum(engine.chunk_lengths) == 5 * SAMPLE_RATE
@@ -0,0 +1,97 @@
+"""
+Tests for streaming stem output.
+"""
+
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+import soundfile as sf
+import torch
+
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.sinks import StemFileSink
+
+
+STEM_NAMES = ["drums", "bass", "other", "vocals"]
+
+
+def fake_sources(mix):
+    """Separation stand-in scaling the mixture differently for each stem."""
+    return torch.stack([mix * scale for scale in (0.1, 0.2, 0.3, 0.4)], dim=1)
+
+
+class TestStemFileSink:
+    """Test StemFileSink class."""
+
+    def test_blocks_are_appended(self, tmp_path):
+        """Test consecutive blocks end up in order in each stem file."""
+        paths = {stem: str(tmp_path / f"{stem}.wav") for stem in ["bass", "vocals"]}
+        sink = StemFileSink(paths, STEM_NAMES, 100, 2, subtype='FLOAT')
+        sources = fake_sources(torch.rand(1, 2, 250) - 0.5)[0]
+
+        for start in range(0, 250, 100):
+            sink.write(sources[..., start:start + 100])
+        output_files = sink.close()
+
+        assert output_files == list(paths.values())
+        data, sample_rate = sf.read(paths["vocals"], dtype='float32')
+        assert sample_rate == 100
+        assert np.allclose(data, sources[3].numpy().T)
+
+    def test_abort_deletes_partial_files(self, tmp_path):
+        """Test aborting removes every file the sink started."""
+        paths = {stem: str(tmp_path / f"{stem}.wav") for stem in STEM_NAMES}
+        sink = StemFileSink(paths, STEM_NAMES, 100, 2)
+        sink.write(torch.zeros(4, 2, 50))
+
+        sink.abort()
+
+        assert list(tmp_path.iterdir()) == []
+
+
+class TestSeparateToFiles:
+    """Test streaming separation in the engine."""
+
+    @pytest.fixture
+    def engine(self, monkeypatch):
+        """Engine with a fake model that separates in 25-frame chunks."""
+        engine = SeparationEngine('htdemucs', shifts=0, device='cpu',
+                                  overlap=0.2, buffer_dtype='float32')
+        engine._model = SimpleNamespace(samplerate=10, segment=1.0, sources=STEM_NAMES)
+        engine.chunks = 0
+
+        def run_model(mix, device, shifts, overlap):
+            engine.chunks += 1
+            return fake_sources(mix)
+
+        monkeypatch.setattr(engine, '_run_model', run_model)
+        monkeypatch.setattr('src.waveweaver.core.engine.STREAM_CHUNK_SECONDS', 0.25)
+        return engine
+
+    def test_stems_written_in_chunks(self, engine, tmp_path):
+        """Test streamed files match the separation of the whole track."""
+        wav = torch.rand(1, 2, 100) - 0.5
+
+        output_files = engine.separate_to_files(wav, 100, "song.wav", str(tmp_path),
+                                                ["drums", "vocals"])
+
+        assert engine.chunks == 4
+        assert [f.rsplit(" - ", 1)[1] for f in output_files] == ["drums.wav", "vocals.wav"]
+        data, _ = sf.read(output_files[1], dtype='float32')
+        assert np.allclose(data, fake_sources(wav)[0, 3].numpy().T, atol=1e-4)
+
+    def test_cancel_removes_partial_files(self, engine, tmp_path):
+        """Test cancelling mid-track leaves no partial stem files behind."""
+        wav = torch.rand(1, 2, 100) - 0.5
+        calls = []
+
+        def is_cancelled():
+            calls.append(None)
+            return len(calls) > 2
+
+        output_files = engine.separate_to_files(wav, 100, "song.wav", str(tmp_path),
+                                                ["vocals"], is_cancelled=is_cancelled)
+
+        assert output_files == []
+        assert list((tmp_path / "song").iterdir()) == []
@@ -36,7 +36,7 @@ class TestStemSeparatorThread:
         separator_thread.cancel()
         assert separator_thread._is_cancelled is True
     
-    @patch('src.waveweaver.core.stem_separator.sf.info')
+    @patch('src.waveweaver.core.engine.sf.info')
     def test_get_audio_info_success(self, mock_sf_info, separator_thread):
         """Test audio info retrieval."""
         # Mock soundfile info
@@ -54,7 +54,7 @@ class TestStemSeparatorThread:
         assert audio_info.channels == 2
         assert audio_info.format == "WAV"
     
-    @patch('src.waveweaver.core.stem_separator.sf.info')
+    @patch('src.waveweaver.core.engine.sf.info')
     def test_get_audio_info_error(self, mock_sf_info, separator_thread):
         """Test audio info retrieval with error."""
         mock_sf_info.side_effect = Exception("File error")
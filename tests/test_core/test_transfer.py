@@ -0,0 +1,40 @@
+"""
+Tests for host <-> device transfers.
+"""
+
+import pytest
+import torch
+
+from src.waveweaver.core.transfer import DeviceTransfer
+
+
+class TestCpuTransfer:
+    """Test transfers are no-ops on the CPU."""
+
+    def test_upload_and_download_pass_through(self):
+        """Test tensors are returned unchanged without copies."""
+        transfer = DeviceTransfer('cpu')
+        tensor = torch.randn(2, 100)
+
+        assert not transfer.enabled
+        assert transfer.wait(transfer.upload(tensor)) is tensor
+        assert transfer.wait(transfer.download(tensor)) is tensor
+        assert transfer.elapsed() == 0.0
+
+
+@pytest.mark.skipif(not torch.cuda.is_available(), reason="CUDA not available")
+class TestCudaTransfer:
+    """Test pinned, asynchronous transfers on a GPU."""
+
+    def test_round_trip(self):
+        """Test a tensor survives an upload and download with timing recorded."""
+        transfer = DeviceTransfer('cuda')
+        tensor = torch.randn(2, 4096)
+
+        on_device = transfer.wait(transfer.upload(tensor))
+        back = transfer.wait(transfer.download(on_device * 2))
+
+        assert on_device.is_cuda
+        assert back.is_pinned()
+        assert torch.allclose(back, tensor * 2)
+        assert transfer.elapsed() > 0
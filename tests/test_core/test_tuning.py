@@ -0,0 +1,112 @@
+"""
+Tests for hardware auto-tuning.
+"""
+
+from types import SimpleNamespace
+
+import pytest
+
+from src.waveweaver.config.settings import Settings, save_tuned_profile
+from src.waveweaver.core.engine import SeparationEngine
+from src.waveweaver.core.ensemble import EnsembleEngine, parse_ensemble
+from src.waveweaver.core.tuning import TunedConfig, Tuner
+
+
+class CostTuner(Tuner):
+    """Tuner whose trials cost a fixed function of the configuration."""
+
+    def __init__(self, cost):
+        super().__init__('htdemucs', on_trial=self.record)
+        self.cost = cost
+        self.trials = []
+
+    def record(self, config):
+        self.trials.append(config)
+
+    def _model_segment(self, config):
+        return 8.0
+
+    def _measure(self, config):
+        return self.cost(config)
+
+
+class TestTuner:
+    """Test Tuner class."""
+
+    def test_parameters_tuned_in_turn(self, monkeypatch):
+        """Test each parameter keeps the best value found for the previous ones."""
+        monkeypatch.setattr('src.waveweaver.core.tuning.candidate_threads', lambda: [8, 4, 2])
+
+        def cost(config):
+            if config.device == 'cuda':
+                return None
+            return (abs(config.cpu_threads - 4) + 1
+                    - (0.5 if config.segment == 6.0 else 0)
+                    - 0.1 * min(config.batch_size, 2))
+
+        tuner = CostTuner(cost)
+        best = tuner.tune(['cuda', 'cpu'])
+
+        assert (best.device, best.cpu_threads, best.segment, best.batch_size) == ('cpu', 4, 6.0, 2)
+        # Batch size 4 brings nothing, so 8 is never tried
+        assert [trial.batch_size for trial in tuner.trials][-2:] == [2, 4]
+
+    def test_nothing_fits(self):
+        """Test tuning fails when no device can run the model."""
+        with pytest.raises(RuntimeError):
+            CostTuner(lambda config: None).tune(['cuda'])
+
+
+class FakeEngine:
+    """Engine stand-in failing the way a full device does."""
+
+    def __init__(self, error=None, fall_back=False):
+        self.model = SimpleNamespace(samplerate=100, audio_channels=2)
+        self.error = error
+        self.fell_back_to_cpu = fall_back
+        self.calls = 0
+
+    def separate(self, wav):
+        self.calls += 1
+        if self.error and self.calls > 1:
+            raise self.error
+        return wav.unsqueeze(1)
+
+
+@pytest.mark.parametrize('engine, fits', [
+    (FakeEngine(), True),
+    (FakeEngine(RuntimeError("CUDA out of memory")), False),
+    (FakeEngine(fall_back=True), False),
+])
+def test_measure(engine, fits):
+    """Test a trial is timed unless it runs out of memory or leaves the device."""
+    tuner = Tuner('htdemucs', seconds=1.0, engine_factory=lambda *args, **kwargs: engine)
+
+    assert (tuner._measure(TunedConfig('cpu')) is not None) == fits
+
+
+def test_engine_uses_tuned_profile(tmp_path, monkeypatch):
+    """Test settings load the tuned profile and engines apply it."""
+    tuned_file = str(tmp_path / "tuned.json")
+    save_tuned_profile(tuned_file, 'htdemucs', TunedConfig('cpu', segment=6.0, batch_size=4).to_dict())
+    monkeypatch.setenv('WAVEWEAVER_TUNED_FILE', tuned_file)
+
+    settings = Settings()
+    engine = SeparationEngine.from_settings(settings, 'htdemucs')
+
+    assert settings.tuned_profile('htdemucs')['batch_size'] == 4
+    assert settings.tuned_profile('mdx') == {}
+    assert engine.device == 'cpu'
+    assert engine.segment == 6.0
+
+
+def test_ensemble_members_use_own_tuned_profile(tmp_path, monkeypatch):
+    """Test each ensemble member gets the segment and device tuned for its model."""
+    tuned_file = str(tmp_path / "tuned.json")
+    save_tuned_profile(tuned_file, 'htdemucs', TunedConfig('cpu', segment=6.0).to_dict())
+    monkeypatch.setenv('WAVEWEAVER_TUNED_FILE', tuned_file)
+
+    engine = EnsembleEngine.from_settings(Settings(), parse_ensemble('htdemucs,htdemucs_ft@cpu'))
+
+    assert [member.segment for member in engine.engines] == [6.0, None]
+    assert [member.device for member in engine.engines] == ['cpu', 'cpu']
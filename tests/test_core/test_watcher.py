@@ -0,0 +1,169 @@
+"""
+Tests for watch-folder ingestion.
+"""
+
+import os
+import sys
+import time
+
+import pytest
+
+from src.waveweaver.core.models import ProcessingResult
+from src.waveweaver.core.watcher import (
+    InotifyWatcher,
+    PollingWatcher,
+    WatchService,
+    WatchState,
+    file_signature,
+)
+
+
+class FakeEngine:
+    """Engine stand-in recording the files it was asked to separate."""
+
+    def __init__(self, limit=None):
+        self.jobs = []
+        # Files separated per call at most, as when stopped mid-batch
+        self.limit = limit
+
+    def separate_files(self, input_files, output_dir, stems, is_cancelled=None):
+        self.jobs.append((list(input_files), output_dir))
+        return [
+            ProcessingResult(success=True, output_files=[f"{output_dir}/{os.path.basename(path)}"],
+                             input_file=path)
+            for path in input_files[:self.limit]
+        ]
+
+
+def write(path, data=b"RIFF"):
+    """Create a file and its parent directories."""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(data)
+    return str(path)
+
+
+@pytest.fixture
+def service_factory(tmp_path):
+    """Build watch services over tmp_path/in writing to tmp_path/out."""
+    source = tmp_path / "in"
+    source.mkdir()
+
+    def make(engine, settle_seconds=5.0):
+        state = WatchState(str(tmp_path / "state.json"))
+        return WatchService(engine, [str(source)], str(tmp_path / "out"), ["vocals"], state,
+                            watcher=PollingWatcher([str(source)]),
+                            settle_seconds=settle_seconds)
+    return source, make
+
+
+class TestWatchService:
+    """Test WatchService class."""
+
+    def test_waits_for_file_to_settle(self, service_factory):
+        """Test files are separated only after they stop changing."""
+        source, make = service_factory
+        song = write(source / "song.wav")
+        engine = FakeEngine()
+        service = make(engine)
+        start = time.monotonic()
+
+        assert service.run_once(now=start + 1) == []
+        # Still being copied: the signature changes and the timer restarts
+        write(source / "song.wav", b"RIFF-more-data")
+        assert service.run_once([song], now=start + 4) == []
+        assert service.run_once(now=start + 8) == []
+        results = service.run_once(now=start + 10)
+
+        assert [r.input_file for r in results] == [song]
+
+    def test_mirrored_output_and_restart(self, service_factory, tmp_path):
+        """Test outputs mirror the input tree and restarts skip handled files."""
+        source, make = service_factory
+        song = write(source / "album" / "song.mp3")
+        write(source / "notes.txt", b"not audio")
+        engine = FakeEngine()
+        service = make(engine, settle_seconds=0)
+
+        service.run_once()
+
+        assert engine.jobs == [([song], str(tmp_path / "out" / "album"))]
+
+        restarted_engine = FakeEngine()
+        restarted = make(restarted_engine, settle_seconds=0)
+        restarted.run_once()
+
+        assert restarted_engine.jobs == []
+
+    def test_replaced_file_processed_again(self, service_factory):
+        """Test a file replaced after separation is handled again."""
+        source, make = service_factory
+        song = write(source / "song.flac")
+        engine = FakeEngine()
+        service = make(engine, settle_seconds=0)
+        service.run_once()
+
+        write(source / "song.flac", b"fLaC-new-take")
+        os.utime(song, ns=(1, 1))
+        service.run_once([song])
+
+        assert len(engine.jobs) == 2
+
+    def test_files_without_result_retried(self, service_factory):
+        """Test files a batch stopped before are separated in the next step."""
+        source, make = service_factory
+        songs = sorted(write(source / name) for name in ("a.wav", "b.wav", "c.wav"))
+        engine = FakeEngine(limit=1)
+        service = make(engine, settle_seconds=0)
+
+        handled = [result.input_file for _ in range(3) for result in service.run_once()]
+
+        assert sorted(handled) == songs
+        assert service.run_once() == []
+
+    def test_output_tree_ignored(self, tmp_path):
+        """Test stems written inside a watched directory are not re-ingested."""
+        write(tmp_path / "out" / "song" / "song - vocals.wav")
+        engine = FakeEngine()
+        service = WatchService(engine, [str(tmp_path)], str(tmp_path / "out"), ["vocals"],
+                               WatchState(str(tmp_path / "state.json")),
+                               watcher=PollingWatcher([str(tmp_path)]), settle_seconds=0)
+
+        service.run_once()
+
+        assert engine.jobs == []
+
+
+class TestWatchState:
+    """Test WatchState class."""
+
+    def test_persisted(self, tmp_path):
+        """Test handled files survive reloading the state file."""
+        song = write(tmp_path / "song.wav")
+        signature = file_signature(song)
+        state = WatchState(str(tmp_path / "state.json"))
+        state.record(song, signature, ProcessingResult(success=False, output_files=[],
+                                                       error_message="bad file"))
+
+        reloaded = WatchState(str(tmp_path / "state.json"))
+
+        assert reloaded.is_handled(song, signature)
+        assert reloaded.files[song]['status'] == 'failed'
+        assert not reloaded.is_handled(song, (signature[0] + 1, signature[1]))
+
+
+@pytest.mark.skipif(not sys.platform.startswith('linux'), reason="inotify is Linux only")
+class TestInotifyWatcher:
+    """Test InotifyWatcher class."""
+
+    def test_reports_new_files(self, tmp_path):
+        """Test files created in watched and new subdirectories are reported."""
+        watcher = InotifyWatcher([str(tmp_path)])
+        try:
+            song = write(tmp_path / "song.wav")
+            assert song in watcher.changes(1.0)
+
+            nested = write(tmp_path / "new" / "song.ogg")
+            changed = watcher.changes(1.0)
+            assert nested in changed or nested in watcher.changes(1.0)
+        finally:
+            watcher.close()
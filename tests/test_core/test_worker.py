@@ -0,0 +1,112 @@
+"""
+Tests for the separation worker process.
+"""
+
+import os
+import shutil
+import time
+
+import numpy as np
+import soundfile as sf
+import torch
+
+from src.waveweaver.core.models import ProcessingStatus
+from src.waveweaver.core.worker import PreviewJob, SeparationJob, SeparationWorker, run_job
+
+
+class FakeEngine:
+    """Engine stand-in; inputs named hang.wav never finish separating."""
+
+    def __init__(self, model_name):
+        self.model_name = model_name
+        self.fell_back_to_cpu = False
+        self.transfer_time = 0.0
+        self.compute_saved = 0.0
+
+    def load_model(self):
+        return self.model_name
+
+    def get_device_name(self):
+        return f"CPU (pid {os.getpid()})"
+
+    def load_audio(self, input_file):
+        return torch.zeros(1, 2, 10), 44100
+
+    def separate_to_files(self, wav, sample_rate, input_file, output_dir, stems,
+                          is_cancelled=None):
+        if os.path.basename(input_file) == "hang.wav":
+            while True:
+                time.sleep(1)
+        return [os.path.join(output_dir, f"{stem}.wav") for stem in stems]
+
+    stem_names = ['vocals', 'drums']
+
+    def load_audio_range(self, input_file, start, duration):
+        return torch.rand(1, 2, int(duration * 100)) - 0.5, 100
+
+    def separate(self, wav, shifts=None, overlap=None, use_cache=True, sample_rate=None):
+        return wav.unsqueeze(1).repeat(1, 2, 1, 1)
+
+
+def create_fake_engine(model_name):
+    """Engine factory importable by the worker process."""
+    return FakeEngine(model_name)
+
+
+def test_run_job_events():
+    """Test a job reports its steps and ends with a result."""
+    events = []
+
+    run_job(FakeEngine('htdemucs'), SeparationJob("song.wav", "out", ["vocals"], 'htdemucs'),
+            lambda event, value: events.append((event, value)), lambda: False)
+
+    names = [event for event, _ in events]
+    assert names[0] == 'audio_info'
+    assert ('status', ProcessingStatus.COMPLETED) in events
+    assert names[-1] == 'finished'
+    assert events[-1][1].output_files == [os.path.join("out", "vocals.wav")]
+
+
+def test_kill_respawns_worker():
+    """Test a stuck job is ended by killing the worker, which keeps serving jobs."""
+    worker = SeparationWorker(engine_factory=create_fake_engine)
+    try:
+        worker.submit(SeparationJob("hang.wav", "out", ["vocals"], 'htdemucs'))
+        events = worker.events()
+        devices = []
+        for event, value in events:
+            if event == 'device':
+                devices.append(value)
+            if event == 'progress' and value == 15:
+                break
+
+        worker.kill()
+        assert list(events) == [('cancelled', None)]
+        assert worker.is_alive
+
+        worker.submit(SeparationJob("song.wav", "out", ["vocals"], 'htdemucs'))
+        final = list(worker.events())
+        assert final[-1][0] == 'finished'
+        assert final[-1][1].success
+        assert ('device', devices[0]) not in final
+    finally:
+        worker.close()
+    assert not worker.is_alive
+
+
+def test_preview_in_worker(tmp_path):
+    """Test previews run in the worker process and come back as temporary files."""
+    song = str(tmp_path / "song.wav")
+    sf.write(song, np.zeros((1000, 2), dtype=np.float32), 100)
+    worker = SeparationWorker(engine_factory=create_fake_engine)
+    try:
+        worker.submit(PreviewJob(song, 'htdemucs', position=5.0, duration=4.0))
+        event, result = list(worker.events())[-1]
+    finally:
+        worker.close()
+
+    assert event == 'finished'
+    assert result.stems == {}
+    assert sorted(result.files) == ['drums', 'vocals']
+    assert sf.info(result.files['vocals']).frames == 400
+    shutil.rmtree(os.path.dirname(result.files['vocals']))
@@ -151,6 +151,39 @@ class TestMainWindow:
             assert main_window.separator_thread == mock_thread
             mock_thread.start.assert_called_once()
     
+    @patch('waveweaver.gui.main_window.StemSeparatorThread')
+    def test_choices_restored_next_session(self, mock_thread_class, qapp, tmp_path):
+        """Test the model, stems and output folder of an extraction are restored."""
+        window = MainWindow(Settings())
+        window.input_file = "/path/to/test.mp3"
+        window.output_dir = str(tmp_path)
+        window.model_selection.set_selected_model('htdemucs_6s')
+        window.stem_selection.deselect_all_stems()
+        window.stem_selection.set_stem_selection('guitar', True)
+        window.progress_section.start_processing = Mock()
+        window.start_extraction()
+
+        restored = MainWindow(Settings())
+
+        assert restored.model_selection.get_selected_model() == 'htdemucs_6s'
+        assert restored.stem_selection.get_selected_stems() == ['guitar']
+        assert restored.output_dir == str(tmp_path)
+
+    @patch('waveweaver.gui.main_window.StemSeparatorThread')
+    def test_unsaved_choices_reported(self, mock_thread_class, main_window):
+        """Test a failure to remember the choices is shown with the outcome."""
+        main_window.input_file = "/path/to/test.mp3"
+        main_window.output_dir = "/path/to/output"
+        main_window.progress_section.start_processing = Mock()
+        main_window.progress_section.show_completion_message = Mock()
+        main_window.settings.remember = Mock(side_effect=OSError("read-only"))
+
+        main_window.start_extraction()
+        main_window.on_extraction_complete(ProcessingResult(True, [], processing_time=1.0))
+
+        message = main_window.progress_section.show_completion_message.call_args[0][0]
+        assert message.endswith("Selected options were not saved: read-only")
+
     @patch('waveweaver.gui.main_window.QMessageBox')
     def test_start_extraction_no_stems_selected(self, mock_msg_box, main_window):
         """Test extraction start with no stems selected."""
@@ -215,6 +248,18 @@ class TestMainWindow:
         assert main_window.extract_btn.isEnabled() is True
         assert main_window.cancel_btn.isVisible() is False
     
+    def test_on_extraction_complete_cancelled(self, main_window):
+        """Test a cancelled extraction is not reported as a failure."""
+        main_window.progress_section.show_error_message = Mock()
+        main_window.separator_thread = Mock()
+        
+        main_window.on_extraction_complete(
+            ProcessingResult(success=False, output_files=[], error_message="Cancelled"))
+        
+        main_window.progress_section.show_error_message.assert_called_once_with(
+            "Extraction cancelled"
+        )
+    
     def test_on_extraction_complete_failure(self, main_window):
         """Test failed extraction completion."""
         # Setup
@@ -390,13 +435,12 @@ class TestMainWindow:
         main_window.separator_thread = Mock()
         mock_msg_box.warning.return_value = mock_msg_box.StandardButton.Yes
         
-        with patch.object(main_window, '_restart_application') as mock_restart:
-            # Execute
-            main_window.force_cancel()
-            
-            # Verify
-            mock_msg_box.warning.assert_called_once()
-            mock_restart.assert_called_once()
+        # Execute
+        main_window.force_cancel()
+        
+        # Verify
+        mock_msg_box.warning.assert_called_once()
+        main_window.separator_thread.force_stop.assert_called_once()
     
     @patch('waveweaver.gui.main_window.QMessageBox')
     def test_force_cancel_user_rejects(self, mock_msg_box, main_window):
@@ -405,18 +449,52 @@ class TestMainWindow:
         main_window.separator_thread = Mock()
         mock_msg_box.warning.return_value = mock_msg_box.StandardButton.No
         
-        with patch.object(main_window, '_restart_application') as mock_restart:
-            # Execute
-            main_window.force_cancel()
-            
-            # Verify
-            mock_msg_box.warning.assert_called_once()
-            mock_restart.assert_not_called()
+        # Execute
+        main_window.force_cancel()
+        
+        # Verify
+        mock_msg_box.warning.assert_called_once()
+        main_window.separator_thread.force_stop.assert_not_called()
     
     def test_force_cancel_no_thread(self, main_window):
         """Test force cancel with no running thread."""
         main_window.separator_thread = None
         
-        with patch.object(main_window, '_restart_application') as mock_restart:
+        with patch.object(main_window.worker, 'kill') as mock_kill:
             main_window.force_cancel()
-            mock_restart.assert_not_called()
\ No newline at end of file
+            mock_kill.assert_not_called()
+    
+
+    @patch('waveweaver.gui.main_window.PreviewThread')
+    def test_start_preview(self, mock_thread_class, main_window):
+        """Test preview start creates a preview thread."""
+        main_window.input_file = "/path/to/test.mp3"
+        main_window.model_selection.get_selected_model = Mock(return_value='htdemucs')
+        mock_thread = Mock()
+        mock_thread_class.return_value = mock_thread
+        
+        main_window.start_preview(42.0)
+        
+        mock_thread_class.assert_called_once_with(
+            "/path/to/test.mp3", 'htdemucs', 42.0, main_window.settings.ui.preview_seconds,
+            worker=main_window.worker
+        )
+        mock_thread.start.assert_called_once()
+        assert main_window.extract_btn.isEnabled() is False
+
+    def test_force_cancel_preview(self, main_window):
+        """Test force cancel stops a running preview through its thread."""
+        main_window.separator_thread = None
+        main_window.preview_thread = Mock()
+
+        main_window.force_cancel()
+
+        main_window.preview_thread.force_stop.assert_called_once()
+    
+    def test_start_preview_no_input_file(self, main_window):
+        """Test preview does nothing without an input file."""
+        main_window.input_file = None
+        
+        main_window.start_preview(10.0)
+        
+        assert main_window.preview_thread is None
@@ -0,0 +1,97 @@
+"""
+Tests for output naming.
+"""
+
+import os
+
+import pytest
+
+from src.waveweaver.utils.naming import OutputNamer, check_template, release_claims
+
+
+class TestOutputNamer:
+    """Test OutputNamer class."""
+
+    def test_default_layout(self, tmp_path):
+        """Test the default template keeps the stem folder layout."""
+        namer = OutputNamer(str(tmp_path))
+
+        paths = namer.allocate("/music/A very long song title indeed.mp3", ["vocals"])
+
+        assert paths["vocals"] == str(
+            tmp_path / "A very long song title indeed" / "A very long song title - vocals.wav")
+        assert (tmp_path / "A very long song title indeed").is_dir()
+
+    def test_same_name_in_batch_numbered(self, tmp_path):
+        """Test inputs sharing a name get separate folders, stably per input."""
+        namer = OutputNamer(str(tmp_path))
+
+        first = namer.allocate("a/song.mp3", ["vocals", "drums"])
+        second = namer.allocate("b/song.wav", ["vocals", "drums"])
+
+        assert os.path.dirname(first["vocals"]) == str(tmp_path / "song")
+        assert os.path.dirname(second["drums"]) == str(tmp_path / "song (1)")
+        assert namer.allocate("a/song.mp3", ["vocals"]) == {"vocals": first["vocals"]}
+
+    def test_existing_outputs_replaced_by_default(self, tmp_path):
+        """Test earlier outputs are reused unless asked to keep them."""
+        (tmp_path / "song").mkdir()
+        (tmp_path / "song" / "song - vocals.wav").write_bytes(b"RIFF")
+
+        paths = OutputNamer(str(tmp_path)).allocate("song.mp3", ["vocals"])
+
+        assert paths["vocals"] == str(tmp_path / "song" / "song - vocals.wav")
+
+    def test_keep_existing_lists_once_and_claims(self, tmp_path, monkeypatch):
+        """Test earlier outputs are skipped with one listing per directory."""
+        for name in ["song - vocals.wav"] + [f"song ({i}) - vocals.wav" for i in range(1, 50)]:
+            (tmp_path / name).write_bytes(b"RIFF")
+        listings = []
+        scandir = os.scandir
+        monkeypatch.setattr(os, 'scandir', lambda path: listings.append(path) or scandir(path))
+        namer = OutputNamer(str(tmp_path), "{short_name} - {stem}.wav", keep_existing=True)
+
+        paths = namer.allocate("song.flac", ["vocals"])
+
+        assert paths["vocals"] == str(tmp_path / "song (50) - vocals.wav")
+        assert os.path.getsize(paths["vocals"]) == 0
+        assert listings == [str(tmp_path)]
+        release_claims(paths.values())
+        assert not os.path.exists(paths["vocals"])
+
+    def test_claim_lost_to_another_writer(self, tmp_path):
+        """Test a name created after the listing is not handed out."""
+        namer = OutputNamer(str(tmp_path), "{name} - {stem}.wav", keep_existing=True)
+        namer.allocate("first.wav", ["vocals"])
+        (tmp_path / "song - vocals.wav").write_bytes(b"RIFF")
+
+        paths = namer.allocate("song.wav", ["vocals"])
+
+        assert paths["vocals"] == str(tmp_path / "song (1) - vocals.wav")
+        assert (tmp_path / "song - vocals.wav").read_bytes() == b"RIFF"
+
+    def test_assigned_paths_handed_out(self, tmp_path):
+        """Test paths allocated elsewhere are used as given and never handed out again."""
+        namer = OutputNamer(str(tmp_path))
+        assigned = {"vocals": str(tmp_path / "song (1)" / "song (1) - vocals.wav")}
+
+        namer.assign("b/song.wav", assigned)
+
+        assert namer.allocate("b/song.wav", ["vocals"]) == assigned
+        assert (tmp_path / "song (1)").is_dir()
+        assert namer.allocate("c/song (1).wav", ["vocals"]) != assigned
+
+    def test_template_fields(self, tmp_path):
+        """Test extra fields are available to templates."""
+        namer = OutputNamer(str(tmp_path), "{model}/{stem}/{name}.flac",
+                            fields={'model': 'htdemucs'})
+
+        paths = namer.allocate("song.mp3", ["bass"])
+
+        assert paths["bass"] == str(tmp_path / "htdemucs" / "bass" / "song.flac")
+
+    @pytest.mark.parametrize("template", ["{name}.wav", "{nme}/{stem}.wav", "../{stem}.wav"])
+    def test_invalid_templates(self, template):
+        """Test templates that can't name stems inside the output are rejected."""
+        with pytest.raises(ValueError):
+            check_template(template)